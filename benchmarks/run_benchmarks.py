@@ -0,0 +1,337 @@
+"""
+End-to-end benchmark of the pipeline stages on synthetic market data.
+
+Generates coins x ticks of /coins/markets payloads (benchmarks/synthetic.py)
+and runs them through every stage in order, each stage's output being the
+next one's input:
+
+    extract_serialize   encode_records + gzip, the Lambda/raw-zone write path
+    transform_parse     NDJSON -> Arrow with the raw read schema
+    transform           staging_transform.transform_arrow (the Glue job's mapping)
+    transform_spark     the same via transform_spark in local Spark (only if pyspark is installed)
+    prepare             prepare_data_for_insert on the decoded Parquet frame
+    insert_<method>     load into a scratch table on the Postgres from DB_* env vars
+                        (execute_batch = insert_data_in_batches; skipped without DB_PASSWORD)
+
+Each stage is timed over --repeat runs on fresh copies of its input, then run
+once with RSS sampled throughout (peak_rss_delta_mb: its peak RSS above the
+RSS it started at, so earlier stages' peaks don't carry over) and once under
+tracemalloc for its peak Python allocation (Arrow buffers are not traced;
+they show up in the RSS delta). Results (median and min latency, rows/sec,
+MB/sec, peak allocation and RSS delta, plus the git commit and library
+versions) are written to a JSON file; --compare prints the change against an
+earlier results file.
+
+Usage:
+    python benchmarks/run_benchmarks.py --coins 250 --ticks 200
+    python benchmarks/run_benchmarks.py --stages prepare insert_copy --compare benchmarks/results/baseline.json
+"""
+import argparse
+import gc
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.json as pajson
+import pyarrow.parquet as pq
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic import market_snapshots
+from src.common.instrumentation import RunMetrics, current_rss_mb
+from src.extract.raw_writer import compress, decompress, encode_records
+from src.loading.prepare import prepare_data_for_insert
+from src.transformation.staging_transform import raw_arrow_schema, transform_arrow
+
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+BENCH_TABLE = 'bench_fact_market_data'
+LOAD_METHODS = ['execute_batch', 'copy', 'upsert']
+STAGES = ['extract_serialize', 'transform_parse', 'transform', 'transform_spark', 'prepare'] + \
+    [f'insert_{method}' for method in LOAD_METHODS]
+
+
+# ==============================================================================
+# MEASUREMENT
+# ==============================================================================
+
+# Seconds between RSS samples during the memory run of a stage
+RSS_SAMPLE_INTERVAL = 0.01
+
+def measure(func, make_input, repeat, trace_memory=True):
+    """
+    Time func(input) `repeat` times (fresh input each run, built untimed), then
+    once sampling RSS and once under tracemalloc.
+
+    Returns:
+        (dict of timings/memory, output of the last timed run)
+    """
+    seconds = []
+    output = None
+    for _ in range(repeat):
+        data = make_input()
+        gc.collect()
+        start = time.perf_counter()
+        output = func(data)
+        seconds.append(time.perf_counter() - start)
+
+    result = {
+        'runs_s': [round(s, 6) for s in seconds],
+        'median_s': round(statistics.median(seconds), 6),
+        'min_s': round(min(seconds), 6),
+    }
+    if trace_memory:
+        data = make_input()
+        gc.collect()
+        metrics = RunMetrics('benchmark', rss_sample_interval=RSS_SAMPLE_INTERVAL)
+        rss_before = current_rss_mb()
+        with metrics.stage('run'):
+            func(data)
+        peak = metrics.as_dict()['stages']['run'].get('peak_rss_mb')
+        if rss_before is not None and peak is not None:
+            result['peak_rss_delta_mb'] = round(peak - rss_before, 1)
+
+        data = make_input()
+        gc.collect()
+        tracemalloc.start()
+        func(data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_alloc_mib'] = round(peak / 2**20, 1)
+    return result, output
+
+
+def throughput(result, rows, nbytes=0):
+    result['rows'] = rows
+    result['rows_per_sec'] = round(rows / result['median_s']) if result['median_s'] > 0 else None
+    if nbytes:
+        result['bytes'] = nbytes
+        result['mb_per_sec'] = round(nbytes / 2**20 / result['median_s'], 2) if result['median_s'] > 0 else None
+    return result
+
+
+# ==============================================================================
+# STAGES
+# ==============================================================================
+
+def bench_extract_serialize(snapshots, repeat, trace_memory):
+    def serialize(snapshots):
+        return [compress(encode_records(records, fetched_at.isoformat()), 'gzip') for fetched_at, records in snapshots]
+
+    result, objects = measure(serialize, lambda: snapshots, repeat, trace_memory)
+    rows = sum(len(records) for _, records in snapshots)
+    ndjson = b''.join(decompress(obj, '.json.gz') for obj in objects)
+    result['compressed_bytes'] = sum(len(obj) for obj in objects)
+    return throughput(result, rows, len(ndjson)), ndjson
+
+
+def bench_transform_parse(ndjson, repeat, trace_memory):
+    parse_options = pajson.ParseOptions(explicit_schema=raw_arrow_schema(), unexpected_field_behavior='ignore')
+
+    def parse(data):
+        return pajson.read_json(io.BytesIO(data), parse_options=parse_options)
+
+    result, table = measure(parse, lambda: ndjson, repeat, trace_memory)
+    return throughput(result, table.num_rows, len(ndjson)), table
+
+
+def bench_transform(raw_table, repeat, trace_memory):
+    result, fact = measure(transform_arrow, lambda: raw_table, repeat, trace_memory)
+    return throughput(result, raw_table.num_rows, raw_table.nbytes), fact
+
+
+def bench_transform_spark(raw_table, repeat, trace_memory):
+    try:
+        from pyspark.sql import SparkSession
+    except ImportError:
+        return None
+    from src.transformation.staging_transform import PARTITION_COLUMN, transform_spark
+
+    spark = SparkSession.builder.master('local[*]').appName('bench').config(
+        'spark.sql.session.timeZone', 'UTC').getOrCreate()
+    raw = raw_table.append_column(PARTITION_COLUMN, pa.array(['2025-01-01'] * raw_table.num_rows))
+    raw_df = spark.createDataFrame(raw.to_pandas()).cache()
+    raw_df.count()
+    try:
+        # Spark is lazy: count() forces the transform (JVM memory is not traced)
+        result, _ = measure(lambda df: transform_spark(df).count(), lambda: raw_df, repeat, trace_memory=False)
+    finally:
+        spark.stop()
+    return throughput(result, raw_table.num_rows)
+
+
+def bench_prepare(fact_table, repeat, trace_memory):
+    # Round-trip through Parquet so the frame has the dtypes the loader decodes
+    buffer = io.BytesIO()
+    pq.write_table(fact_table.drop_columns(['dt']), buffer)
+    frame = pd.read_parquet(io.BytesIO(buffer.getvalue()))
+    result, prepared = measure(prepare_data_for_insert, frame.copy, repeat, trace_memory)
+    return throughput(result, len(frame), int(frame.memory_usage(deep=True).sum())), prepared
+
+
+def bench_insert(prepared, method, repeat, trace_memory):
+    from database.connection import close_pool, get_connection, release_connection
+    from database.schema import ensure_schema
+    from src.loading import load_fact_market_data_to_rds as loader
+
+    conn = get_connection()
+    try:
+        ensure_schema(conn, table_name=BENCH_TABLE)
+
+        def make_input():
+            cursor = conn.cursor()
+            cursor.execute(f"TRUNCATE {BENCH_TABLE}")
+            conn.commit()
+            cursor.close()
+            return prepared
+
+        def insert(df):
+            if method == 'execute_batch':
+                return loader.insert_data_in_batches(conn, df, BENCH_TABLE, loader.BATCH_SIZE)
+            return loader.load_dataframe(conn, df, BENCH_TABLE, method=method)
+
+        result, _ = measure(insert, make_input, repeat, trace_memory)
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE {BENCH_TABLE}")
+        conn.commit()
+        cursor.close()
+    finally:
+        release_connection(conn)
+        close_pool()
+    return throughput(result, len(prepared))
+
+
+# ==============================================================================
+# RESULTS
+# ==============================================================================
+
+def environment():
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=REPO_ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    import numpy
+    versions = {'python': platform.python_version(), 'numpy': numpy.__version__,
+                'pandas': pd.__version__, 'pyarrow': pa.__version__}
+    try:
+        import psycopg2
+        versions['psycopg2'] = psycopg2.__version__.split()[0]
+    except ImportError:
+        pass
+    return {
+        'commit': git('rev-parse', '--short', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': versions,
+    }
+
+
+def _optional(value):
+    return '-' if value is None else f"{value:.1f}"
+
+
+def print_results(stages, baseline=None):
+    header = f"{'stage':<20}{'rows':>10}{'median':>11}{'min':>11}{'rows/s':>13}{'MB/s':>9}{'peak MiB':>10}{'RSS +MB':>9}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, r in stages.items():
+        if r is None:
+            print(f"{name:<20}{'skipped':>10}")
+            continue
+        line = (
+            f"{name:<20}{r['rows']:>10,}{r['median_s'] * 1000:>9.1f}ms{r['min_s'] * 1000:>9.1f}ms"
+            f"{r['rows_per_sec'] or 0:>13,}{_optional(r.get('mb_per_sec')):>9}{_optional(r.get('peak_alloc_mib')):>10}"
+            f"{_optional(r.get('peak_rss_delta_mb')):>9}"
+        )
+        base = (baseline or {}).get(name)
+        if base and base.get('rows_per_sec') and r.get('rows_per_sec'):
+            # Compare throughput so runs at different scales stay comparable
+            change = (r['rows_per_sec'] / base['rows_per_sec'] - 1) * 100
+            line += f"{change:>+9.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--coins', type=int, default=250)
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--stages', nargs='*', choices=STAGES, help='stages to run (default: all)')
+    parser.add_argument('--no-trace-memory', action='store_true', help='skip the RSS and tracemalloc runs of each stage')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<UTC time>-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare throughput against')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    selected = set(args.stages or STAGES)
+    trace_memory = not args.no_trace_memory
+    run_db = any(name.startswith('insert_') for name in selected)
+    if run_db and not os.getenv('DB_PASSWORD'):
+        print("DB_PASSWORD is not set; skipping the insert stages")
+        run_db = False
+
+    print(f"Generating {args.coins} coins x {args.ticks} ticks of /coins/markets payloads...")
+    snapshots = list(market_snapshots(args.coins, args.ticks))
+
+    # Every stage's output feeds the next, so upstream stages always run; only selected ones are recorded
+    results = {}
+    result, ndjson = bench_extract_serialize(snapshots, args.repeat, trace_memory)
+    results['extract_serialize'] = result
+    result, raw_table = bench_transform_parse(ndjson, args.repeat, trace_memory)
+    results['transform_parse'] = result
+    result, fact_table = bench_transform(raw_table, args.repeat, trace_memory)
+    results['transform'] = result
+    if 'transform_spark' in selected:
+        results['transform_spark'] = bench_transform_spark(raw_table, args.repeat, trace_memory)
+    result, prepared = bench_prepare(fact_table, args.repeat, trace_memory)
+    results['prepare'] = result
+    for method in LOAD_METHODS:
+        name = f'insert_{method}'
+        if name in selected:
+            results[name] = bench_insert(prepared, method, args.repeat, trace_memory) if run_db else None
+
+    results = {name: results[name] for name in STAGES if name in selected and name in results}
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'environment': environment(),
+        'params': {'coins': args.coins, 'ticks': args.ticks, 'rows': args.coins * args.ticks,
+                   'repeat': args.repeat},
+        'stages': results,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['stages']
+    print()
+    print_results(results, baseline)
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['environment']['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Synthetic CoinGecko market data at configurable scale (coins x ticks).
+
+* market_snapshots(): /coins/markets payloads, one list of records per poll
+  tick, with the API's full field set. Prices follow a geometric random walk
+  per coin, market caps fall off with rank like the real top-N list, and the
+  optional fields are NULL about as often as in real responses.
+* fact_frame() / write_processed_parquet(): rows in the processed-zone layout
+  the loader reads (fact_market_data columns), written as
+  <output>/dt=YYYY-MM-DD/part-*.parquet.
+
+Everything is seeded, so the same arguments always give the same data.
+
+Usage:
+    python benchmarks/synthetic.py --coins 250 --ticks 1440 --output ./bench_data/processed
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+TICK_SECONDS = 60
+# Fraction of market_cap / total_volume values missing (illiquid or unlisted coins)
+NULL_FRACTION = 0.01
+
+
+def _coin_universe(coins, rng):
+    """Static per-coin attributes; market caps follow a power law over rank."""
+    ranks = np.arange(1, coins + 1)
+    market_cap = 1.5e12 * ranks ** -1.3 * rng.lognormal(0, 0.2, coins)
+    price = rng.lognormal(1.5, 2.5, coins)
+    price[0] = 60000.0  # rank 1 trades like bitcoin
+    letters = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+    symbols = [''.join(rng.choice(letters, rng.integers(3, 6))) for _ in range(coins)]
+    return {
+        'id': [f"coin-{rank:05d}" for rank in ranks],
+        'symbol': symbols,
+        'name': [f"Coin {rank}" for rank in ranks],
+        'rank': ranks,
+        'price': price,
+        'supply': market_cap / price,
+        'volume_ratio': rng.lognormal(-3, 0.7, coins),
+        'has_max_supply': rng.random(coins) < 0.6,
+    }
+
+
+def _price_paths(coins, ticks, start_prices, rng, tick_seconds=TICK_SECONDS):
+    """(ticks, coins) geometric random walk with ~80% annualized volatility."""
+    sigma = 0.8 * np.sqrt(tick_seconds / (365 * 86400))
+    steps = rng.normal(-0.5 * sigma ** 2, sigma, (ticks, coins))
+    steps[0] = 0.0
+    return start_prices * np.exp(np.cumsum(steps, axis=0))
+
+
+def market_snapshots(coins=250, ticks=60, start=START, tick_seconds=TICK_SECONDS, seed=42):
+    """
+    Yield (fetched_at, records) per poll tick, shaped like /coins/markets.
+
+    Records carry no ingestion_timestamp; the extract stamps it, as in the
+    Lambda and the stream pipeline.
+    """
+    rng = np.random.default_rng(seed)
+    universe = _coin_universe(coins, rng)
+    prices = _price_paths(coins, ticks, universe['price'], rng, tick_seconds)
+    day_open = prices[0]
+    for tick in range(ticks):
+        fetched_at = start + timedelta(seconds=tick * tick_seconds)
+        price = prices[tick]
+        market_cap = price * universe['supply']
+        volume = market_cap * universe['volume_ratio'] * rng.lognormal(0, 0.1, coins)
+        missing = rng.random(coins) < NULL_FRACTION
+        window = prices[max(0, tick - 1440):tick + 1]
+        high, low = window.max(axis=0), window.min(axis=0)
+        change = price - day_open
+        updated = fetched_at - timedelta(seconds=int(rng.integers(0, tick_seconds)))
+        records = []
+        for i in range(coins):
+            records.append({
+                'id': universe['id'][i],
+                'symbol': universe['symbol'][i],
+                'name': universe['name'][i],
+                'image': f"https://coin-images.coingecko.com/coins/images/{i + 1}/large/{universe['id'][i]}.png",
+                'current_price': float(price[i]),
+                'market_cap': None if missing[i] else round(float(market_cap[i])),
+                'market_cap_rank': int(universe['rank'][i]),
+                'fully_diluted_valuation': round(float(market_cap[i]) * 1.1) if universe['has_max_supply'][i] else None,
+                'total_volume': None if missing[i] else round(float(volume[i])),
+                'high_24h': float(high[i]),
+                'low_24h': float(low[i]),
+                'price_change_24h': float(change[i]),
+                'price_change_percentage_24h': float(change[i] / day_open[i] * 100),
+                'market_cap_change_24h': float(change[i] * universe['supply'][i]),
+                'market_cap_change_percentage_24h': float(change[i] / day_open[i] * 100),
+                'circulating_supply': float(universe['supply'][i]),
+                'total_supply': float(universe['supply'][i]),
+                'max_supply': float(universe['supply'][i] * 1.1) if universe['has_max_supply'][i] else None,
+                'ath': float(high[i] * 1.5),
+                'ath_change_percentage': -33.3,
+                'ath_date': '2024-12-17T15:02:41.429Z',
+                'atl': float(low[i] * 0.01),
+                'atl_change_percentage': 9900.0,
+                'atl_date': '2015-10-20T00:00:00.000Z',
+                'roi': None,
+                'last_updated': updated.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+            })
+        yield fetched_at, records
+
+
+def fact_frame(coins=250, ticks=60, start=START, tick_seconds=TICK_SECONDS, seed=42):
+    """
+    Processed rows (fact_market_data columns) for coins x ticks, built with
+    numpy only, for loader-scale data without the per-record payload cost.
+    """
+    rng = np.random.default_rng(seed)
+    universe = _coin_universe(coins, rng)
+    prices = _price_paths(coins, ticks, universe['price'], rng, tick_seconds)
+    rows = coins * ticks
+    market_cap = prices * universe['supply']
+    volume = market_cap * universe['volume_ratio'] * rng.lognormal(0, 0.1, (ticks, coins))
+    missing = rng.random(rows) < NULL_FRACTION
+    timestamps = pd.Timestamp(start).tz_localize(None) + pd.to_timedelta(
+        np.repeat(np.arange(ticks) * tick_seconds, coins), unit='s'
+    )
+    df = pd.DataFrame({
+        'coin_id': np.tile(np.array(universe['id'], dtype=object), ticks),
+        'coin_symbol': np.tile(np.array(universe['symbol'], dtype=object), ticks),
+        'price_usd': prices.ravel(),
+        'market_cap_usd': np.where(missing, np.nan, market_cap.ravel()),
+        'volume_24h_usd': np.where(missing, np.nan, volume.ravel()),
+        'source_timestamp': timestamps,
+        'load_date': pd.Timestamp(start).tz_localize(None) + pd.Timedelta(seconds=ticks * tick_seconds),
+    })
+    return df
+
+
+def write_processed_parquet(output, coins=250, ticks=60, rows_per_file=1_000_000, start=START,
+                            tick_seconds=TICK_SECONDS, seed=42):
+    """
+    Write fact_frame() as <output>/dt=YYYY-MM-DD/part-NNNNN.parquet, sorted by
+    (coin_id, source_timestamp) within each date like the transform's output.
+
+    Returns:
+        list: Paths written.
+    """
+    df = fact_frame(coins, ticks, start, tick_seconds, seed)
+    dates = df['source_timestamp'].dt.strftime('%Y-%m-%d')
+    paths = []
+    for dt, part in df.groupby(dates, sort=True):
+        part = part.sort_values(['coin_id', 'source_timestamp'], kind='stable')
+        directory = os.path.join(output, f"dt={dt}")
+        os.makedirs(directory, exist_ok=True)
+        for i, offset in enumerate(range(0, len(part), rows_per_file)):
+            path = os.path.join(directory, f"part-{i:05d}.parquet")
+            part.iloc[offset:offset + rows_per_file].to_parquet(path, index=False, coerce_timestamps='us')
+            paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--coins', type=int, default=250)
+    parser.add_argument('--ticks', type=int, default=1440, help='poll ticks per coin (default: one day of minutes)')
+    parser.add_argument('--tick-seconds', type=int, default=TICK_SECONDS)
+    parser.add_argument('--rows-per-file', type=int, default=1_000_000)
+    parser.add_argument('--output', required=True, help='directory for the processed Parquet files')
+    args = parser.parse_args()
+
+    paths = write_processed_parquet(args.output, args.coins, args.ticks, args.rows_per_file,
+                                    tick_seconds=args.tick_seconds)
+    print(f"Wrote {args.coins * args.ticks:,} rows in {len(paths)} file(s) under {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_settings():
+    """
+    Build psycopg2.connect keyword arguments from the environment.
+
+    DB_PASSWORD is required; every other setting has a default.
+    """
+    password = os.getenv('DB_PASSWORD')
+    if not password:
+        raise ValueError("DB_PASSWORD environment variable is required but not set")
+
+    settings = {
+        'host': os.getenv('DB_HOST', 'crypto-etl-db.c87yis8u2wwc.us-east-1.rds.amazonaws.com'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'postgres'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': password,
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '10')),
+        'application_name': os.getenv('DB_APPLICATION_NAME', 'crypto-etl'),
+    }
+    if os.getenv('DB_SSLMODE'):
+        settings['sslmode'] = os.getenv('DB_SSLMODE')
+    return settings
+
+
+class BlockingConnectionPool(pool.ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool that waits for a free connection instead of raising
+    PoolError once `maxconn` connections are checked out.
+    """
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None, timeout=None):
+        if not self._slots.acquire(timeout=timeout):
+            raise pool.PoolError(f"Timed out after {timeout}s waiting for a database connection")
+        try:
+            conn = super().getconn(key)
+            if conn.closed:
+                # Server-side disconnects leave dead connections in the pool
+                super().putconn(conn, key, close=True)
+                conn = super().getconn(key)
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            super().putconn(conn, key, close=close)
+        finally:
+            self._slots.release()
+
+
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use.
+
+    Size is bounded by DB_POOL_MIN / DB_POOL_MAX so parallel workers reuse
+    already-authenticated connections instead of each paying the RDS
+    TLS/auth handshake.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            minconn = int(os.getenv('DB_POOL_MIN', '1'))
+            maxconn = int(os.getenv('DB_POOL_MAX', '8'))
+            settings = get_connection_settings()
+            logger.info(
+                f"Creating connection pool ({minconn}-{maxconn}) for database "
+                f"{settings['database']} at {settings['host']}"
+            )
+            _pool = BlockingConnectionPool(minconn, maxconn, **settings)
+        return _pool
+
+
+def get_connection(timeout=None):
+    """Check a connection out of the shared pool; return it with release_connection()."""
+    return get_pool().getconn(timeout=timeout)
+
+
+def release_connection(conn):
+    """
+    Return a connection to the shared pool.
+
+    Any open transaction is rolled back first so the next borrower starts
+    clean; broken connections are discarded instead of reused.
+    """
+    if conn is None or _pool is None or _pool.closed:
+        if conn is not None and not conn.closed:
+            conn.close()
+        return
+    broken = bool(conn.closed)
+    if not broken and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+    _pool.putconn(conn, close=broken)
+
+
+@contextmanager
+def pooled_connection(timeout=None):
+    """Context manager that borrows a pooled connection and always returns it."""
+    conn = get_connection(timeout=timeout)
+    try:
+        yield conn
+    finally:
+        release_connection(conn)
+
+
+def close_pool():
+    """Close every pooled connection (call once at process exit)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
@@ -0,0 +1,289 @@
+import logging
+import re
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+PARTITION_KEY = "source_timestamp"
+GRANULARITIES = ("day", "month")
+
+_BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def period_start(ts, granularity):
+    """Truncate a timestamp to the start of its daily or monthly partition."""
+    if granularity == "day":
+        return datetime(ts.year, ts.month, ts.day)
+    if granularity == "month":
+        return datetime(ts.year, ts.month, 1)
+    raise ValueError(f"Unknown partition granularity '{granularity}' (expected one of {GRANULARITIES})")
+
+
+def next_period(start, granularity):
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return datetime(start.year + 1, 1, 1)
+    return datetime(start.year, start.month + 1, 1)
+
+
+def shift_periods(start, granularity, count):
+    """Move a period start `count` periods back (negative) or forward (positive)."""
+    if granularity == "day":
+        return start + timedelta(days=count)
+    month_index = start.year * 12 + (start.month - 1) + count
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(table_name, start, granularity):
+    suffix = start.strftime("%Y%m%d" if granularity == "day" else "%Y%m")
+    return f"{table_name}_p{suffix}"
+
+
+def default_partition_name(table_name):
+    return f"{table_name}_default"
+
+
+def is_partitioned(cursor, table_name, schema_name="public"):
+    cursor.execute(
+        """
+        SELECT c.relkind = 'p'
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relname = %s
+        """,
+        (schema_name, table_name),
+    )
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def _relation_exists(cursor, qualified_name):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (qualified_name,))
+    return cursor.fetchone()[0]
+
+
+def _is_attached(cursor, parent, qualified_name):
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s) AND inhparent = to_regclass(%s))",
+        (qualified_name, parent),
+    )
+    return cursor.fetchone()[0]
+
+
+def create_default_partition(cursor, table_name, schema_name="public"):
+    """Catch-all partition for NULL or not-yet-provisioned source_timestamps."""
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {schema_name}.{default_partition_name(table_name)} "
+        f"PARTITION OF {schema_name}.{table_name} DEFAULT"
+    )
+
+
+def create_partition(cursor, table_name, start, granularity, schema_name="public"):
+    """
+    Create the partition covering [start, next period) if it doesn't exist.
+
+    Rows that already landed in the default partition for that range are
+    moved into the new partition, otherwise Postgres refuses to add it.
+
+    Returns:
+        bool: True if a partition was created.
+    """
+    name = partition_name(table_name, start, granularity)
+    qualified = f"{schema_name}.{name}"
+    parent = f"{schema_name}.{table_name}"
+    if _relation_exists(cursor, qualified):
+        if _is_attached(cursor, parent, qualified):
+            return False
+        raise ValueError(f"{qualified} exists but is not a partition of {parent}; rename or drop it first")
+
+    end = next_period(start, granularity)
+    default = f"{schema_name}.{default_partition_name(table_name)}"
+
+    has_stranded_rows = False
+    if _relation_exists(cursor, default):
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s)",
+            (start, end),
+        )
+        has_stranded_rows = cursor.fetchone()[0]
+
+    if has_stranded_rows:
+        cursor.execute(f"CREATE TABLE {qualified} (LIKE {parent} INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {default}
+                WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s
+                RETURNING *
+            )
+            INSERT INTO {qualified} SELECT * FROM moved
+            """,
+            (start, end),
+        )
+        logger.info(f"Moved {cursor.rowcount} row(s) from {default} into {qualified}")
+        cursor.execute(
+            f"ALTER TABLE {parent} ATTACH PARTITION {qualified} FOR VALUES FROM (%s) TO (%s)",
+            (start, end),
+        )
+    else:
+        cursor.execute(
+            f"CREATE TABLE {qualified} PARTITION OF {parent} FOR VALUES FROM (%s) TO (%s)",
+            (start, end),
+        )
+    logger.info(f"Created partition {qualified} [{start:%Y-%m-%d}, {end:%Y-%m-%d})")
+    return True
+
+
+class PartitionManager:
+    """
+    Keeps time partitions of a range-partitioned table provisioned ahead of loads.
+
+    Periods already ensured by this process are remembered, so calling
+    ensure_range() for every streamed batch costs no catalog lookups once the
+    current periods exist.
+
+    Partitions created with commit=False only exist once the caller's
+    transaction commits, so they are held as pending until the caller reports
+    the outcome: mark_committed() after its commit, discard_pending() after a
+    rollback (otherwise a retried load would skip the CREATE and its rows
+    would land in the default partition).
+    """
+
+    def __init__(self, table_name, granularity="month", premake=2, schema_name="public"):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown partition granularity '{granularity}' (expected one of {GRANULARITIES})")
+        self.table_name = table_name
+        self.granularity = granularity
+        self.premake = premake
+        self.schema_name = schema_name
+        self._ensured = set()
+        self._pending = set()
+
+    def ensure_range(self, conn, start, end, commit=True):
+        """
+        Create every partition from the period containing `start` through the
+        period containing `end`, plus `premake` periods beyond it.
+
+        DDL is transactional in Postgres, so with commit=False the new
+        partitions become part of the caller's open load transaction; call
+        mark_committed() or discard_pending() once it ends.
+        """
+        first = period_start(start, self.granularity)
+        last = shift_periods(period_start(end, self.granularity), self.granularity, self.premake)
+
+        cursor = conn.cursor()
+        try:
+            period = first
+            checked = []
+            created = 0
+            while period <= last:
+                if period not in self._ensured and period not in self._pending:
+                    created += create_partition(
+                        cursor, self.table_name, period, self.granularity, self.schema_name
+                    )
+                    checked.append(period)
+                period = next_period(period, self.granularity)
+            self._pending.update(checked)
+            if commit:
+                conn.commit()
+                self.mark_committed()
+            return created
+        except Exception:
+            conn.rollback()
+            self.discard_pending()
+            raise
+        finally:
+            cursor.close()
+
+    def mark_committed(self):
+        """The transaction holding the pending partitions committed; remember them."""
+        self._ensured.update(self._pending)
+        self._pending.clear()
+
+    def discard_pending(self):
+        """The transaction holding the pending partitions rolled back; check them again next time."""
+        self._pending.clear()
+
+    def ensure_for_timestamps(self, conn, timestamps, commit=True):
+        """Provision partitions for the min..max of a pandas timestamp Series."""
+        valid = timestamps.dropna()
+        if valid.empty:
+            return 0
+        start, end = valid.min(), valid.max()
+        # Partition bounds are naive UTC, like the TIMESTAMP column itself
+        if getattr(start, "tzinfo", None) is not None:
+            start, end = start.tz_convert("UTC").tz_localize(None), end.tz_convert("UTC").tz_localize(None)
+        return self.ensure_range(conn, start.to_pydatetime(), end.to_pydatetime(), commit=commit)
+
+
+def list_partitions(cursor, table_name, schema_name="public"):
+    """Return (name, lower_bound, upper_bound) for each bounded partition of a table."""
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        WHERE n.nspname = %s AND p.relname = %s
+        ORDER BY c.relname
+        """,
+        (schema_name, table_name),
+    )
+    partitions = []
+    for name, bound in cursor.fetchall():
+        match = _BOUND_PATTERN.search(bound or "")
+        if match:
+            lower, upper = (datetime.fromisoformat(value) for value in match.groups())
+            partitions.append((name, lower, upper))
+    return partitions
+
+
+def apply_retention(conn, table_name, granularity, keep_periods, action="detach",
+                    schema_name="public", now=None):
+    """
+    Detach or drop partitions that lie entirely before the retention window.
+
+    The window is the current period plus the `keep_periods - 1` before it.
+    Detached partitions stay as standalone `<name>_detached` tables (for
+    archiving; `<name>_detached_2`, ... when late data recreated and expired
+    the same period again); dropped ones are deleted. Either way the purge is a catalog operation, not a
+    row-by-row DELETE.
+
+    Returns:
+        list: Names of the partitions that were detached or dropped.
+    """
+    if keep_periods <= 0:
+        return []
+    if action not in ("detach", "drop"):
+        raise ValueError(f"Unknown retention action '{action}' (expected 'detach' or 'drop')")
+
+    now = now or datetime.utcnow()
+    cutoff = shift_periods(period_start(now, granularity), granularity, -(keep_periods - 1))
+
+    cursor = conn.cursor()
+    try:
+        expired = [name for name, _, upper in list_partitions(cursor, table_name, schema_name) if upper <= cutoff]
+        for name in expired:
+            cursor.execute(f"ALTER TABLE {schema_name}.{table_name} DETACH PARTITION {schema_name}.{name}")
+            if action == "drop":
+                cursor.execute(f"DROP TABLE {schema_name}.{name}")
+            else:
+                # Free the partition name in case late data for that period arrives
+                detached = f"{name}_detached"
+                suffix = 1
+                while _relation_exists(cursor, f"{schema_name}.{detached}"):
+                    suffix += 1
+                    detached = f"{name}_detached_{suffix}"
+                cursor.execute(f"ALTER TABLE {schema_name}.{name} RENAME TO {detached}")
+            logger.info(
+                f"Retention: {'dropped' if action == 'drop' else 'detached'} partition "
+                f"{schema_name}.{name} (older than {cutoff:%Y-%m-%d})"
+            )
+        conn.commit()
+        return expired
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
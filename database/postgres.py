@@ -1,45 +1,46 @@
 import psycopg2
+import os
 import sys
 
-# RDS connection details
-host = 'crypto-etl-db.c87yis8u2wwc.us-east-1.rds.amazonaws.com'
-port = 5432
-database = 'postgres'
-user = 'postgres'
-password = 'Tyme4achg'
+# Make the repo-root packages (src/, database/) importable when run as a script
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from database.connection import close_pool, get_connection, release_connection
+from database.rollups import ensure_rollup_tables, rebuild_rollups
+from database.schema import ensure_schema, migrate_to_partitioned
+
+# RDS connection details come from the environment (DB_HOST, DB_PORT, DB_NAME,
+# DB_USER, DB_PASSWORD); see database/connection.py
+
+# Range-partition fact_market_data on source_timestamp by 'day' or 'month' ('none' disables)
+PARTITION_GRANULARITY = os.getenv('PARTITION_GRANULARITY', 'month')
 
 # Create a table schema
-def create_table(conn, table_name="fact_market_data", schema_name="public"):
+def create_table(conn, table_name="fact_market_data", schema_name="public",
+                 partition_granularity=PARTITION_GRANULARITY):
     """
     Create the fact_market_data table if it doesn't exist.
+
+    Also creates the (coin_id, source_timestamp) natural-key unique index,
+    the supporting indexes (see database/schema.py) and the OHLCV rollup
+    tables (see database/rollups.py).
     
     Args:
         conn: psycopg2 connection object
         table_name: Name of the table to create (default: 'fact_market_data')
         schema_name: Schema name (default: 'public')
+        partition_granularity: 'day', 'month' or 'none' (default: $PARTITION_GRANULARITY)
     
     Returns:
         bool: True if table was created successfully, False otherwise
     """
     try:
-        cursor = conn.cursor()
-        
-        # Create table with columns matching the ETL script output
-        create_table_sql = f"""
-        CREATE TABLE IF NOT EXISTS {schema_name}.{table_name} (
-            coin_id VARCHAR(255),
-            coin_symbol VARCHAR(50),
-            price_usd DOUBLE PRECISION,
-            market_cap_usd DOUBLE PRECISION,
-            volume_24h_usd DOUBLE PRECISION,
-            source_timestamp TIMESTAMP,
-            load_date TIMESTAMP
-        );
-        """
-        
-        cursor.execute(create_table_sql)
-        conn.commit()
-        cursor.close()
+        granularity = None if partition_granularity == 'none' else partition_granularity
+        ensure_schema(conn, table_name=table_name, schema_name=schema_name,
+                      partition_granularity=granularity)
+        ensure_rollup_tables(conn, table_name=table_name, schema_name=schema_name)
         print(f"Table '{schema_name}.{table_name}' created successfully (or already exists)!")
         return True
     except psycopg2.Error as e:
@@ -51,16 +52,10 @@ def create_table(conn, table_name="fact_market_data", schema_name="public"):
 # Connect to PostgreSQL
 def connect_to_postgres():
     try:
-        conn = psycopg2.connect(
-            host=host,
-            port=port,
-            database=database,
-            user=user,
-            password=password
-        )
+        conn = get_connection()
         print("Connected to PostgreSQL successfully!")
         return conn
-    except psycopg2.Error as e:
+    except (psycopg2.Error, ValueError) as e:
         print(f"Error connecting to PostgreSQL: {e}")
         sys.exit(1)
 
@@ -90,7 +85,18 @@ if __name__ == "__main__":
     # Create the table
     print("\nCreating table...")
     create_table(conn)
+
+    # Optionally convert an existing unpartitioned table in place
+    if "--migrate-to-partitioned" in sys.argv and PARTITION_GRANULARITY != 'none':
+        print("\nMigrating to a partitioned table...")
+        migrate_to_partitioned(conn, PARTITION_GRANULARITY)
+
+    # Backfill the OHLCV rollups from the ticks already in the table
+    if "--rebuild-rollups" in sys.argv:
+        print("\nRebuilding rollups...")
+        print(f"Refreshed {rebuild_rollups(conn)} coin-hour(s)")
     
     # Close the connection
-    conn.close()
+    release_connection(conn)
+    close_pool()
     print("Connection closed.")
\ No newline at end of file
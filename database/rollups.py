@@ -0,0 +1,391 @@
+"""
+Pre-aggregated OHLCV rollups of fact_market_data.
+
+Three tables per fact table hold one row per coin and bucket:
+<fact>_ohlcv_1m, <fact>_ohlcv_1h and <fact>_ohlcv_1d. Each row stores
+the open/high/low/close/average price, the last 24h volume, the market-cap
+low/high/close and the tick count.
+
+Maintenance is incremental. Every load records the (coin_id, hour) pairs it
+touched in <fact>_rollup_dirty, in the same transaction as the rows. It is
+a plain append-only table, so parallel writers never contend on it.
+refresh_rollups() drains that queue and recomputes only those buckets:
+the 1m rows from the ticks of each dirty hour, the 1h rows from those 1m
+rows, and the 1d rows from the 1h rows of each dirty day. Marks left behind
+by a failed run are picked up by the next refresh.
+
+Rollups are not touched by fact-table retention, so the history of detached
+or dropped partitions stays queryable at rollup resolution.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from database.schema import FACT_TABLE
+
+logger = logging.getLogger(__name__)
+
+# (table suffix, bucket width), finest first
+LEVELS = (
+    ("1m", timedelta(minutes=1)),
+    ("1h", timedelta(hours=1)),
+    ("1d", timedelta(days=1)),
+)
+# Rollup rows, in column order
+OHLCV_COLUMNS = (
+    "coin_id", "bucket_start",
+    "open_price", "high_price", "low_price", "close_price", "avg_price",
+    "volume_24h_usd", "market_cap_low", "market_cap_high", "market_cap_close",
+    "tick_count",
+)
+
+ROLLUP_COLUMNS_SQL = """
+    coin_id VARCHAR(255) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    open_price DOUBLE PRECISION,
+    high_price DOUBLE PRECISION,
+    low_price DOUBLE PRECISION,
+    close_price DOUBLE PRECISION,
+    avg_price DOUBLE PRECISION,
+    volume_24h_usd DOUBLE PRECISION,
+    market_cap_low DOUBLE PRECISION,
+    market_cap_high DOUBLE PRECISION,
+    market_cap_close DOUBLE PRECISION,
+    tick_count BIGINT NOT NULL,
+    PRIMARY KEY (coin_id, bucket_start)
+"""
+
+# Aggregates over fact rows (alias f), one per OHLCV column after the key.
+# volume_24h_usd is CoinGecko's rolling 24h volume, so a bucket keeps the
+# last value observed, not a sum.
+_TICK_AGGREGATES = """
+    (array_agg(f.price_usd ORDER BY f.source_timestamp))[1],
+    max(f.price_usd),
+    min(f.price_usd),
+    (array_agg(f.price_usd ORDER BY f.source_timestamp DESC))[1],
+    avg(f.price_usd),
+    (array_agg(f.volume_24h_usd ORDER BY f.source_timestamp DESC))[1],
+    min(f.market_cap_usd),
+    max(f.market_cap_usd),
+    (array_agg(f.market_cap_usd ORDER BY f.source_timestamp DESC))[1],
+    count(*)
+"""
+# The same aggregates over finer rollup rows (alias s)
+_COMBINE_AGGREGATES = """
+    (array_agg(s.open_price ORDER BY s.bucket_start))[1],
+    max(s.high_price),
+    min(s.low_price),
+    (array_agg(s.close_price ORDER BY s.bucket_start DESC))[1],
+    sum(s.avg_price * s.tick_count) / sum(s.tick_count),
+    (array_agg(s.volume_24h_usd ORDER BY s.bucket_start DESC))[1],
+    min(s.market_cap_low),
+    max(s.market_cap_high),
+    (array_agg(s.market_cap_close ORDER BY s.bucket_start DESC))[1],
+    sum(s.tick_count)
+"""
+
+# Serializes refreshes, so a slower concurrent refresh can't overwrite a bucket with older results
+_REFRESH_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext(%s))"
+_EPOCH = datetime(1970, 1, 1)
+
+
+def rollup_table(table_name, level):
+    return f"{table_name}_ohlcv_{level}"
+
+
+def dirty_table(table_name):
+    return f"{table_name}_rollup_dirty"
+
+
+def ensure_rollup_tables(conn, table_name=FACT_TABLE, schema_name="public"):
+    """Create the rollup tables and the dirty-bucket queue if they don't exist."""
+    cursor = conn.cursor()
+    try:
+        for level, _ in LEVELS:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {schema_name}.{rollup_table(table_name, level)} ({ROLLUP_COLUMNS_SQL})"
+            )
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {schema_name}.{dirty_table(table_name)} "
+            f"(coin_id VARCHAR(255) NOT NULL, bucket_hour TIMESTAMP NOT NULL)"
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# ==============================================================================
+# DIRTY BUCKETS
+# ==============================================================================
+
+def dirty_hours(batch):
+    """
+    Distinct (coin_id, hour start) pairs of a prepared batch: a pandas
+    DataFrame or an Arrow RecordBatch/Table with naive UTC source_timestamps.
+    """
+    if hasattr(batch, "schema"):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        hours = pc.floor_temporal(batch.column(batch.schema.get_field_index("source_timestamp")), unit="hour")
+        keys = pa.table({"coin_id": batch.column(batch.schema.get_field_index("coin_id")), "hour": hours})
+        keys = keys.filter(pc.and_(pc.is_valid(keys["coin_id"]), pc.is_valid(keys["hour"])))
+        keys = keys.group_by(["coin_id", "hour"]).aggregate([])
+        return list(zip(keys.column("coin_id").to_pylist(), keys.column("hour").to_pylist()))
+
+    keys = batch[["coin_id", "source_timestamp"]].dropna()
+    hours = keys["source_timestamp"].dt.floor("h")
+    if hours.dt.tz is not None:
+        hours = hours.dt.tz_convert("UTC").dt.tz_localize(None)
+    keys = keys.assign(source_timestamp=hours).drop_duplicates()
+    return list(zip(keys["coin_id"].tolist(), keys["source_timestamp"].dt.to_pydatetime().tolist()))
+
+
+def mark_dirty(conn, keys, table_name=FACT_TABLE, schema_name="public", commit=True):
+    """
+    Queue (coin_id, hour) pairs for the next refresh_rollups().
+
+    With commit=False the marks join the caller's load transaction, so they
+    commit (or roll back) together with the rows they describe.
+
+    Returns:
+        int: Pairs queued.
+    """
+    keys = list(keys)
+    if not keys:
+        return 0
+    coin_ids, hours = zip(*keys)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"INSERT INTO {schema_name}.{dirty_table(table_name)} (coin_id, bucket_hour) "
+            f"SELECT * FROM unnest(%s::varchar[], %s::timestamp[])",
+            (list(coin_ids), list(hours)),
+        )
+        if commit:
+            conn.commit()
+        return len(keys)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# ==============================================================================
+# REFRESH
+# ==============================================================================
+
+def _upsert_sql(target, select_sql):
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in OHLCV_COLUMNS[2:])
+    return (
+        f"INSERT INTO {target} ({', '.join(OHLCV_COLUMNS)}) {select_sql} "
+        f"ON CONFLICT (coin_id, bucket_start) DO UPDATE SET {updates}"
+    )
+
+
+def refresh_rollups(conn, table_name=FACT_TABLE, schema_name="public"):
+    """
+    Recompute the buckets queued by mark_dirty(), in one transaction.
+
+    Returns:
+        int: (coin_id, hour) pairs refreshed.
+    """
+    fact = f"{schema_name}.{table_name}"
+    tables = {level: f"{schema_name}.{rollup_table(table_name, level)}" for level, _ in LEVELS}
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_REFRESH_LOCK_SQL, (f"{fact}_rollups",))
+        cursor.execute(
+            "CREATE TEMP TABLE rollup_refresh (coin_id VARCHAR(255), bucket_hour TIMESTAMP) ON COMMIT DROP"
+        )
+        cursor.execute(
+            f"WITH drained AS (DELETE FROM {schema_name}.{dirty_table(table_name)} RETURNING coin_id, bucket_hour) "
+            f"INSERT INTO rollup_refresh SELECT DISTINCT coin_id, bucket_hour FROM drained"
+        )
+        pairs = cursor.rowcount
+        if pairs == 0:
+            conn.commit()
+            return 0
+        cursor.execute("ANALYZE rollup_refresh")
+
+        # Each join has both an equality on the truncated key (hash join for a
+        # large backlog) and a range on the finer column (index range scans for
+        # a few dirty buckets); the min/max bounds prune partitions and rows.
+        cursor.execute(_upsert_sql(tables["1m"], f"""
+            SELECT f.coin_id, date_trunc('minute', f.source_timestamp), {_TICK_AGGREGATES}
+            FROM {fact} f
+            JOIN rollup_refresh r
+              ON f.coin_id = r.coin_id
+             AND date_trunc('hour', f.source_timestamp) = r.bucket_hour
+             AND f.source_timestamp >= r.bucket_hour
+             AND f.source_timestamp < r.bucket_hour + interval '1 hour'
+            WHERE f.price_usd IS NOT NULL
+              AND f.source_timestamp >= (SELECT min(bucket_hour) FROM rollup_refresh)
+              AND f.source_timestamp < (SELECT max(bucket_hour) FROM rollup_refresh) + interval '1 hour'
+            GROUP BY 1, 2
+        """))
+        minutes = cursor.rowcount
+        cursor.execute(_upsert_sql(tables["1h"], f"""
+            SELECT s.coin_id, date_trunc('hour', s.bucket_start), {_COMBINE_AGGREGATES}
+            FROM {tables["1m"]} s
+            JOIN rollup_refresh r
+              ON s.coin_id = r.coin_id
+             AND date_trunc('hour', s.bucket_start) = r.bucket_hour
+             AND s.bucket_start >= r.bucket_hour
+             AND s.bucket_start < r.bucket_hour + interval '1 hour'
+            WHERE s.bucket_start >= (SELECT min(bucket_hour) FROM rollup_refresh)
+              AND s.bucket_start < (SELECT max(bucket_hour) FROM rollup_refresh) + interval '1 hour'
+            GROUP BY 1, 2
+        """))
+        cursor.execute(_upsert_sql(tables["1d"], f"""
+            SELECT s.coin_id, date_trunc('day', s.bucket_start), {_COMBINE_AGGREGATES}
+            FROM {tables["1h"]} s
+            JOIN (SELECT DISTINCT coin_id, date_trunc('day', bucket_hour) AS bucket_day FROM rollup_refresh) r
+              ON s.coin_id = r.coin_id
+             AND date_trunc('day', s.bucket_start) = r.bucket_day
+             AND s.bucket_start >= r.bucket_day
+             AND s.bucket_start < r.bucket_day + interval '1 day'
+            WHERE s.bucket_start >= (SELECT date_trunc('day', min(bucket_hour)) FROM rollup_refresh)
+              AND s.bucket_start < (SELECT date_trunc('day', max(bucket_hour)) FROM rollup_refresh) + interval '1 day'
+            GROUP BY 1, 2
+        """))
+        conn.commit()
+        logger.info(f"Refreshed rollups of {fact} for {pairs} coin-hour(s) ({minutes} minute bucket(s))")
+        return pairs
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def rebuild_rollups(conn, table_name=FACT_TABLE, schema_name="public", start=None, end=None):
+    """
+    Queue every hour with ticks in [start, end) (default: the whole fact
+    table) and refresh. Used to backfill rollups for data loaded before they
+    existed.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"""
+            INSERT INTO {schema_name}.{dirty_table(table_name)} (coin_id, bucket_hour)
+            SELECT DISTINCT coin_id, date_trunc('hour', source_timestamp)
+            FROM {schema_name}.{table_name}
+            WHERE coin_id IS NOT NULL AND source_timestamp IS NOT NULL
+              AND (%(start)s::timestamp IS NULL OR source_timestamp >= %(start)s)
+              AND (%(end)s::timestamp IS NULL OR source_timestamp < %(end)s)
+            """,
+            {"start": start, "end": end},
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return refresh_rollups(conn, table_name, schema_name)
+
+
+# ==============================================================================
+# QUERY
+# ==============================================================================
+
+# Chart intervals tried by query_ohlcv(max_points=...), finest first
+CHART_INTERVALS = (
+    timedelta(minutes=1), timedelta(minutes=5), timedelta(minutes=15), timedelta(minutes=30),
+    timedelta(hours=1), timedelta(hours=4), timedelta(hours=12),
+    timedelta(days=1), timedelta(days=7), timedelta(days=30),
+)
+
+
+def _aligned(ts, width):
+    return (ts - _EPOCH) % width == timedelta(0)
+
+
+def _floor(ts, width):
+    return ts - (ts - _EPOCH) % width
+
+
+def choose_rollup(start, end, interval):
+    """
+    Coarsest rollup level able to answer [start, end) at `interval`: its
+    buckets must tile both the interval and the range edges exactly.
+
+    Returns:
+        str or None: '1d', '1h' or '1m'; None when only raw ticks will do.
+    """
+    for level, width in reversed(LEVELS):
+        if interval % width == timedelta(0) and _aligned(start, width) and _aligned(end, width):
+            return level
+    return None
+
+
+def ohlcv_query(coin_id, start, end, interval=None, max_points=500,
+                table_name=FACT_TABLE, schema_name="public"):
+    """
+    SQL for the OHLCV rows of one coin over [start, end) (naive UTC), one per
+    interval, with columns in OHLCV_COLUMNS order.
+
+    Without an explicit `interval`, the finest CHART_INTERVALS step giving at
+    most `max_points` buckets is used and the range is widened to whole
+    steps, so it always lines up with a rollup. Buckets start at `start`.
+    The data comes from the coarsest rollup that fits (choose_rollup), or
+    from the raw ticks when none does.
+
+    Returns:
+        tuple: (query, params, rollup level or None for raw ticks)
+    """
+    if interval is None:
+        span = end - start
+        interval = next((step for step in CHART_INTERVALS if span / step <= max_points), CHART_INTERVALS[-1])
+        # Snap to the rollup the step is built from (weeks and months start on day boundaries)
+        snap = min(interval, LEVELS[-1][1])
+        start = _floor(start, snap)
+        end = _floor(end, snap) + (snap if not _aligned(end, snap) else timedelta(0))
+
+    level = choose_rollup(start, end, interval)
+    bucket = "%(start)s + floor(extract(epoch FROM {ts} - %(start)s) / %(step)s) * %(step)s * interval '1 second'"
+    if level is None:
+        source = f"{schema_name}.{table_name} f"
+        aggregates = _TICK_AGGREGATES
+        bucket = bucket.format(ts="f.source_timestamp")
+        where = "f.coin_id = %(coin_id)s AND f.source_timestamp >= %(start)s AND f.source_timestamp < %(end)s " \
+                "AND f.price_usd IS NOT NULL"
+    else:
+        source = f"{schema_name}.{rollup_table(table_name, level)} s"
+        aggregates = _COMBINE_AGGREGATES
+        bucket = bucket.format(ts="s.bucket_start")
+        where = "s.coin_id = %(coin_id)s AND s.bucket_start >= %(start)s AND s.bucket_start < %(end)s"
+
+    query = (
+        f"SELECT %(coin_id)s, {bucket} AS bucket, {aggregates} FROM {source} WHERE {where} "
+        f"GROUP BY bucket ORDER BY bucket"
+    )
+    params = {"coin_id": coin_id, "start": start, "end": end, "step": interval.total_seconds()}
+    return query, params, level
+
+
+def query_ohlcv(conn, coin_id, start, end, interval=None, max_points=500,
+                table_name=FACT_TABLE, schema_name="public"):
+    """
+    OHLCV rows for one coin over [start, end), see ohlcv_query(). All rows
+    are fetched at once; stream ohlcv_query() instead when an explicit
+    `interval` may produce an unbounded number of buckets.
+
+    Returns:
+        list[dict]: Rows keyed by OHLCV_COLUMNS, in bucket order.
+    """
+    query, params, level = ohlcv_query(coin_id, start, end, interval, max_points, table_name, schema_name)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        rows = [dict(zip(OHLCV_COLUMNS, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+    logger.debug(f"query_ohlcv({coin_id}, {start} - {end}, {interval}): {len(rows)} row(s) from {level or 'ticks'}")
+    return rows
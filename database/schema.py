@@ -0,0 +1,213 @@
+import logging
+
+from database.partitions import (
+    PARTITION_KEY,
+    PartitionManager,
+    create_default_partition,
+    is_partitioned,
+)
+from src.common import schema_registry
+
+logger = logging.getLogger(__name__)
+
+FACT_TABLE = "fact_market_data"
+# One row per coin per source tick; re-loading the same tick updates it in place
+NATURAL_KEY = ("coin_id", "source_timestamp")
+
+# Columns come from the versioned schema registry (src/common/schema_registry.py)
+FACT_COLUMNS_SQL = "\n" + schema_registry.columns_sql() + "\n"
+# Applied registry version per table, in the table's schema
+SCHEMA_VERSIONS_TABLE = "schema_versions"
+
+
+def natural_key_index(table_name):
+    return f"{table_name}_natural_key_idx"
+
+
+def index_statements(table_name=FACT_TABLE, schema_name="public"):
+    """
+    Secondary indexes for the fact table.
+
+    - load_date DESC serves "most recent rows" lookups (verify_data.py) with
+      an index scan instead of a sort over the whole table.
+    - source_timestamp serves time-range queries across all coins.
+    """
+    qualified = f"{schema_name}.{table_name}"
+    return [
+        f"CREATE INDEX IF NOT EXISTS {table_name}_load_date_idx "
+        f"ON {qualified} (load_date DESC)",
+        f"CREATE INDEX IF NOT EXISTS {table_name}_source_timestamp_idx "
+        f"ON {qualified} (source_timestamp)",
+    ]
+
+
+def has_index(cursor, index_name, schema_name="public"):
+    cursor.execute(
+        "SELECT 1 FROM pg_indexes WHERE schemaname = %s AND indexname = %s",
+        (schema_name, index_name),
+    )
+    return cursor.fetchone() is not None
+
+
+def deduplicate(cursor, table_name=FACT_TABLE, schema_name="public"):
+    """
+    Delete duplicate natural-key rows, keeping the most recently loaded one.
+
+    Needed once before the unique index can be built on a table that was
+    filled by the old append-only loader.
+    """
+    key_match = " AND ".join([f"a.{col} = b.{col}" for col in NATURAL_KEY])
+    cursor.execute(f"""
+        DELETE FROM {schema_name}.{table_name} a
+        USING {schema_name}.{table_name} b
+        WHERE {key_match}
+          AND (COALESCE(a.load_date, '-infinity'), a.ctid)
+            < (COALESCE(b.load_date, '-infinity'), b.ctid)
+    """)
+    return cursor.rowcount
+
+
+def migrate_columns(cursor, table_name=FACT_TABLE, schema_name="public"):
+    """
+    Add the registry columns an existing table lacks and record the schema
+    version it is now at.
+
+    New columns are nullable without a default, so ADD COLUMN only touches
+    the catalog: existing rows (and partitions) are not rewritten and read
+    the column as NULL.
+
+    Returns:
+        list: Names of the columns added.
+    """
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema = %s AND table_name = %s",
+        (schema_name, table_name),
+    )
+    existing = {name for (name,) in cursor.fetchall()}
+    added = []
+    for column in schema_registry.columns():
+        if column.name not in existing:
+            cursor.execute(
+                f"ALTER TABLE {schema_name}.{table_name} ADD COLUMN IF NOT EXISTS {column.name} {column.sql_type}"
+            )
+            added.append(column.name)
+    if added:
+        logger.info(f"Added column(s) {added} to {schema_name}.{table_name}")
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema_name}.{SCHEMA_VERSIONS_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        )
+    """)
+    cursor.execute(f"""
+        INSERT INTO {schema_name}.{SCHEMA_VERSIONS_TABLE} (table_name, version) VALUES (%s, %s)
+        ON CONFLICT (table_name) DO UPDATE SET version = EXCLUDED.version, applied_at = EXCLUDED.applied_at
+        WHERE {SCHEMA_VERSIONS_TABLE}.version < EXCLUDED.version
+    """, (table_name, schema_registry.SCHEMA_VERSION))
+    return added
+
+
+def ensure_schema(conn, table_name=FACT_TABLE, schema_name="public", partition_granularity=None):
+    """
+    Create the fact table, its natural-key unique index and supporting indexes.
+
+    With `partition_granularity` ('day' or 'month'), a new table is created
+    range-partitioned on source_timestamp, with a DEFAULT partition for
+    NULL or not-yet-provisioned timestamps. An existing unpartitioned table
+    is left as-is; see migrate_to_partitioned().
+
+    Safe to call before every load: each step is a no-op once applied. The
+    first run against a legacy table removes duplicate ticks so the unique
+    index can be built, and columns added to the schema registry since the
+    table was created are added to it (migrate_columns).
+    """
+    cursor = conn.cursor()
+    try:
+        partition_clause = f" PARTITION BY RANGE ({PARTITION_KEY})" if partition_granularity else ""
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {schema_name}.{table_name} ({FACT_COLUMNS_SQL}){partition_clause};"
+        )
+        migrate_columns(cursor, table_name, schema_name)
+        if partition_granularity:
+            if is_partitioned(cursor, table_name, schema_name):
+                create_default_partition(cursor, table_name, schema_name)
+            else:
+                logger.warning(
+                    f"{schema_name}.{table_name} is not partitioned; "
+                    f"run database/postgres.py --migrate-to-partitioned to convert it"
+                )
+
+        key_index = natural_key_index(table_name)
+        if not has_index(cursor, key_index, schema_name):
+            removed = deduplicate(cursor, table_name, schema_name)
+            if removed:
+                logger.info(f"Removed {removed} duplicate row(s) from {schema_name}.{table_name}")
+            cursor.execute(
+                f"CREATE UNIQUE INDEX {key_index} "
+                f"ON {schema_name}.{table_name} ({', '.join(NATURAL_KEY)})"
+            )
+
+        for statement in index_statements(table_name, schema_name):
+            cursor.execute(statement)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def migrate_to_partitioned(conn, granularity, table_name=FACT_TABLE, schema_name="public"):
+    """
+    Convert an existing heap fact table into a range-partitioned one.
+
+    Runs in a single transaction: the old table and its indexes are renamed
+    aside, the partitioned table is created with partitions covering the
+    existing data, rows are copied across and the old table is dropped.
+    """
+    cursor = conn.cursor()
+    try:
+        if is_partitioned(cursor, table_name, schema_name):
+            logger.info(f"{schema_name}.{table_name} is already partitioned")
+            return False
+
+        # Bring the old table to the current columns so rows copy across one to one
+        migrate_columns(cursor, table_name, schema_name)
+        legacy = f"{table_name}_legacy"
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE schemaname = %s AND tablename = %s",
+            (schema_name, table_name),
+        )
+        for (index_name,) in cursor.fetchall():
+            cursor.execute(f"ALTER INDEX {schema_name}.{index_name} RENAME TO {index_name}_legacy")
+        cursor.execute(f"ALTER TABLE {schema_name}.{table_name} RENAME TO {legacy}")
+        cursor.execute(f"SELECT min({PARTITION_KEY}), max({PARTITION_KEY}) FROM {schema_name}.{legacy}")
+        start, end = cursor.fetchone()
+
+        cursor.execute(
+            f"CREATE TABLE {schema_name}.{table_name} ({FACT_COLUMNS_SQL}) "
+            f"PARTITION BY RANGE ({PARTITION_KEY})"
+        )
+        create_default_partition(cursor, table_name, schema_name)
+        if start is not None:
+            PartitionManager(table_name, granularity, premake=0, schema_name=schema_name).ensure_range(
+                conn, start, end, commit=False
+            )
+        column_list = ', '.join(schema_registry.column_names())
+        cursor.execute(
+            f"INSERT INTO {schema_name}.{table_name} ({column_list}) "
+            f"SELECT {column_list} FROM {schema_name}.{legacy}"
+        )
+        logger.info(f"Copied {cursor.rowcount} row(s) into partitioned {schema_name}.{table_name}")
+        cursor.execute(f"DROP TABLE {schema_name}.{legacy}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    ensure_schema(conn, table_name, schema_name, partition_granularity=granularity)
+    return True
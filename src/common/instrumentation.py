@@ -0,0 +1,477 @@
+"""
+Stage timing, throughput counters, memory sampling and profiling hooks.
+
+An entry point creates one RunMetrics per run and activates it; code below
+it records into the active run through the module-level stage(), timed(),
+iterate() and add() helpers, which are no-ops when no run is active:
+
+    with RunMetrics('load') as run:
+        with stage('fetch') as s:
+            data = fetch()
+            s.add(rows=len(data), bytes=size)
+        run.report(status='ok')
+
+Repeated stages (one per batch) accumulate calls, seconds, rows and bytes.
+report() prints the whole run as one JSON line and, with METRICS_FORMAT
+emf/both, CloudWatch Embedded Metric Format lines (picked up from Lambda
+stdout as metrics without PutMetricData calls).
+
+Profiling is opt-in per stage: PROFILE_STAGES=fetch,load (or '*') runs those
+stages under cProfile, or pyinstrument with PROFILER=pyinstrument when it is
+installed, and writes the profiles to PROFILE_DIR.
+
+Standard library only, with no imports from the rest of the repo, so the
+Glue job can ship it with --extra-py-files.
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# 'json' (one line per run), 'emf' (CloudWatch Embedded Metric Format) or 'both'
+METRICS_FORMAT = os.getenv('METRICS_FORMAT', 'json')
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'CryptoETL')
+# Comma-separated stage names to profile, '*' for all (empty = profiling off)
+PROFILE_STAGES = {s for s in os.getenv('PROFILE_STAGES', '').split(',') if s}
+# 'cprofile' or 'pyinstrument'
+PROFILER = os.getenv('PROFILER', 'cprofile')
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'profiles'))
+# Functions listed per cProfile'd stage in the log (sorted by cumulative time)
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', '15'))
+# How often RSS is sampled while a stage runs, for its peak_rss_mb (0 = only at stage start/end)
+RSS_SAMPLE_INTERVAL_SECONDS = float(os.getenv('RSS_SAMPLE_INTERVAL_SECONDS', '0.05'))
+
+_active = None
+
+
+# ==============================================================================
+# MEMORY
+# ==============================================================================
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the process so far, in MB (None where unavailable).
+
+    A lifetime high-water mark: on a warm Lambda it includes earlier invocations.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def current_rss_mb():
+    """Current resident set size in MB, from /proc (None where unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+
+
+# ==============================================================================
+# STAGES
+# ==============================================================================
+
+class StageStats:
+    """Accumulated totals of one named stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.rss_delta_mb = 0.0
+        self.peak_rss_mb = None
+
+    def as_dict(self):
+        record = {
+            'calls': self.calls,
+            'ms': round(self.seconds * 1000, 2),
+        }
+        if self.rows:
+            record['rows'] = self.rows
+            record['rows_per_sec'] = round(self.rows / self.seconds) if self.seconds > 0 else None
+        if self.bytes:
+            record['bytes'] = self.bytes
+            record['mb_per_sec'] = round(self.bytes / 1048576 / self.seconds, 2) if self.seconds > 0 else None
+        if self.peak_rss_mb is not None:
+            record['peak_rss_mb'] = self.peak_rss_mb
+            record['rss_delta_mb'] = round(self.rss_delta_mb, 1)
+        return record
+
+
+class _StageHandle:
+    """Yielded by stage(); counts rows/bytes for the stage being timed."""
+
+    def __init__(self, run, name):
+        self._run = run
+        self._name = name
+
+    def add(self, rows=0, bytes=0):
+        if self._run is not None:
+            self._run.add(self._name, rows=rows, bytes=bytes)
+
+
+class _Profiler:
+    """Per-stage cProfile (accumulated over calls) or pyinstrument (one session per call)."""
+
+    def __init__(self, run_name, stage_name):
+        self.run_name = run_name
+        self.stage_name = stage_name
+        self.kind = PROFILER
+        if self.kind == 'pyinstrument':
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                logger.warning("pyinstrument is not installed; profiling with cProfile")
+                self.kind = 'cprofile'
+        self.sessions = 0
+        self._profile = None
+        self._current = None
+
+    def start(self):
+        if self.kind == 'pyinstrument':
+            from pyinstrument import Profiler
+            self._current = Profiler()
+            self._current.start()
+        else:
+            if self._profile is None:
+                import cProfile
+                self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self):
+        self.sessions += 1
+        if self.kind == 'pyinstrument':
+            self._current.stop()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{self.run_name}-{self.stage_name}-{self.sessions}.html")
+            with open(path, 'w') as f:
+                f.write(self._current.output_html())
+            self._current = None
+        else:
+            self._profile.disable()
+
+    def dump(self):
+        """Write the accumulated cProfile stats and log the top functions."""
+        if self._profile is None:
+            return None
+        import io
+        import pstats
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{self.run_name}-{self.stage_name}.prof")
+        self._profile.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(self._profile, stream=text).sort_stats('cumulative').print_stats(PROFILE_TOP_N)
+        logger.info(f"Profile of stage '{self.stage_name}' ({self.sessions} call(s)) -> {path}\n{text.getvalue()}")
+        return path
+
+
+class RunMetrics:
+    """
+    Metrics of one run of an entry point (an invocation, a job run, a load).
+
+    Thread-safe: parallel workers can record into the same stages.
+    Profiling skips a stage call while another thread is being profiled
+    (only one profiler can be active per process).
+
+    A stage's peak_rss_mb is the highest RSS sampled while it ran (at start,
+    at end and every RSS_SAMPLE_INTERVAL_SECONDS in between, by a sampler
+    thread that runs only while a stage is open), so it reflects that stage
+    rather than the process high-water mark; spikes shorter than the
+    interval can be missed. The run's peak_rss_mb is the process peak.
+    """
+
+    def __init__(self, name, dimensions=None, output_format=METRICS_FORMAT, namespace=METRICS_NAMESPACE,
+                 profile_stages=None, rss_sample_interval=RSS_SAMPLE_INTERVAL_SECONDS):
+        """
+        :param name: Run name, e.g. 'extract', 'transform', 'load'.
+        :param dimensions: Extra fields (str values) added to the JSON record and used as EMF dimensions.
+        :param output_format: 'json', 'emf' or 'both'.
+        :param profile_stages: Stage names to profile (default: $PROFILE_STAGES).
+        :param rss_sample_interval: Seconds between RSS samples while a stage runs (0 disables the sampler).
+        """
+        self.name = name
+        self.dimensions = dict(dimensions or {})
+        self.output_format = output_format
+        self.namespace = namespace
+        self.profile_stages = PROFILE_STAGES if profile_stages is None else set(profile_stages)
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._stages = {}
+        self._profilers = {}
+        self._profiling = False
+        self._lock = threading.Lock()
+        self._previous = None
+        self.rss_sample_interval = rss_sample_interval
+        # stage name -> calls currently running, and the thread sampling their RSS
+        self._open_stages = {}
+        self._sampler = None
+
+    # activation -----------------------------------------------------------
+    def __enter__(self):
+        global _active
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = self._previous
+        return False
+
+    # recording ------------------------------------------------------------
+    def _stats(self, name):
+        stats = self._stages.get(name)
+        if stats is None:
+            stats = self._stages[name] = StageStats(name)
+        return stats
+
+    def add(self, name, rows=0, bytes=0):
+        """Count rows/bytes for a stage without timing anything."""
+        with self._lock:
+            stats = self._stats(name)
+            stats.rows += rows
+            stats.bytes += bytes
+
+    def record(self, name, seconds, rows=0, bytes=0):
+        """Add an externally measured duration to a stage."""
+        with self._lock:
+            stats = self._stats(name)
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.rows += rows
+            stats.bytes += bytes
+
+    def _record_rss(self, names, rss):
+        """Raise the peak RSS of stages `names` to `rss`; call with the lock held."""
+        if rss is None:
+            return
+        for name in names:
+            stats = self._stats(name)
+            if stats.peak_rss_mb is None or rss > stats.peak_rss_mb:
+                stats.peak_rss_mb = rss
+
+    def _sample_rss(self):
+        """Sampler thread: record RSS into every open stage until none is open."""
+        while True:
+            rss = current_rss_mb()
+            with self._lock:
+                if not self._open_stages:
+                    self._sampler = None
+                    return
+                self._record_rss(self._open_stages, rss)
+            time.sleep(self.rss_sample_interval)
+
+    def _open_stage(self, name):
+        with self._lock:
+            self._open_stages[name] = self._open_stages.get(name, 0) + 1
+            if self.rss_sample_interval > 0 and self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_rss, name='rss-sampler', daemon=True)
+                self._sampler.start()
+
+    def _close_stage(self, name):
+        """Call with the lock held."""
+        self._open_stages[name] -= 1
+        if not self._open_stages[name]:
+            del self._open_stages[name]
+
+    def _start_profiler(self, name):
+        if '*' not in self.profile_stages and name not in self.profile_stages:
+            return None
+        with self._lock:
+            if self._profiling:
+                return None
+            self._profiling = True
+            profiler = self._profilers.get(name)
+            if profiler is None:
+                profiler = self._profilers[name] = _Profiler(self.name, name)
+        profiler.start()
+        return profiler
+
+    @contextmanager
+    def stage(self, name, rows=0, bytes=0):
+        """Time a block as (one call of) stage `name`; the handle's add() counts rows/bytes."""
+        rss_before = current_rss_mb()
+        self._open_stage(name)
+        profiler = self._start_profiler(name)
+        started = time.perf_counter()
+        try:
+            yield _StageHandle(self, name)
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                profiler.stop()
+                with self._lock:
+                    self._profiling = False
+            rss_after = current_rss_mb()
+            with self._lock:
+                self._close_stage(name)
+                stats = self._stats(name)
+                stats.calls += 1
+                stats.seconds += elapsed
+                stats.rows += rows
+                stats.bytes += bytes
+                if rss_before is not None and rss_after is not None:
+                    stats.rss_delta_mb += rss_after - rss_before
+                self._record_rss([name], rss_before)
+                self._record_rss([name], rss_after)
+
+    def timed(self, name=None):
+        """Decorator form of stage() (default name: the function's name)."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or func.__name__):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # output ---------------------------------------------------------------
+    def as_dict(self, status=None, **fields):
+        with self._lock:
+            stages = {name: stats.as_dict() for name, stats in self._stages.items()}
+        record = {
+            'event': 'pipeline_run',
+            'run': self.name,
+            'started_at': self.started_at.isoformat(),
+            'duration_ms': round((time.perf_counter() - self._started) * 1000, 2),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stages,
+            **self.dimensions,
+        }
+        if status is not None:
+            record['status'] = status
+        record.update(fields)
+        return record
+
+    def emf_records(self, record):
+        """One EMF document per stage plus one for the run, dimensioned by pipeline (and stage)."""
+        dimensions = ['Pipeline'] + sorted(self.dimensions)
+        base = {'Pipeline': self.name, **{key: str(value) for key, value in self.dimensions.items()}}
+        timestamp = int(time.time() * 1000)
+
+        def document(metrics, values, extra_dimensions=()):
+            return {
+                '_aws': {
+                    'Timestamp': timestamp,
+                    'CloudWatchMetrics': [{
+                        'Namespace': self.namespace,
+                        'Dimensions': [dimensions + list(extra_dimensions)],
+                        'Metrics': [{'Name': metric, 'Unit': unit} for metric, unit in metrics],
+                    }],
+                },
+                **base,
+                **values,
+            }
+
+        documents = []
+        for name, stats in record['stages'].items():
+            metrics = [('DurationMs', 'Milliseconds')]
+            values = {'Stage': name, 'DurationMs': stats['ms']}
+            for key, metric, unit in (('rows', 'Rows', 'Count'), ('rows_per_sec', 'RowsPerSecond', 'Count/Second'),
+                                      ('bytes', 'Bytes', 'Bytes'), ('mb_per_sec', 'MegabytesPerSecond', 'Megabytes/Second')):
+                if stats.get(key) is not None:
+                    metrics.append((metric, unit))
+                    values[metric] = stats[key]
+            documents.append(document(metrics, values, ['Stage']))
+
+        metrics = [('DurationMs', 'Milliseconds')]
+        values = {'DurationMs': record['duration_ms']}
+        if record['peak_rss_mb'] is not None:
+            metrics.append(('PeakRssMb', 'Megabytes'))
+            values['PeakRssMb'] = record['peak_rss_mb']
+        documents.append(document(metrics, values))
+        return documents
+
+    def report(self, status=None, **fields):
+        """
+        Print the run record (JSON and/or EMF lines) and dump cProfile stats.
+
+        Returns:
+            dict: The run record.
+        """
+        for profiler in self._profilers.values():
+            profiler.dump()
+        record = self.as_dict(status, **fields)
+        lines = []
+        if self.output_format in ('json', 'both'):
+            lines.append(json.dumps(record, default=str))
+        if self.output_format in ('emf', 'both'):
+            lines.extend(json.dumps(document, default=str) for document in self.emf_records(record))
+        # print, not logging: one bare JSON object per line for Logs Insights / EMF extraction
+        for line in lines:
+            print(line, flush=True)
+        return record
+
+
+# ==============================================================================
+# ACTIVE-RUN HELPERS (no-ops without an active RunMetrics)
+# ==============================================================================
+
+def active_run():
+    return _active
+
+
+@contextmanager
+def stage(name, rows=0, bytes=0):
+    run = _active
+    if run is None:
+        yield _StageHandle(None, name)
+        return
+    with run.stage(name, rows=rows, bytes=bytes) as handle:
+        yield handle
+
+
+def timed(name=None):
+    """Decorator timing each call as a stage of whichever run is active at call time."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add(name, rows=0, bytes=0):
+    if _active is not None:
+        _active.add(name, rows=rows, bytes=bytes)
+
+
+def iterate(name, iterable, count_rows=None):
+    """
+    Yield from `iterable`, timing each next() as a call of stage `name`
+    (the time spent producing items, e.g. downloading and decoding batches).
+
+    :param count_rows: Optional item -> row count function.
+    """
+    iterator = iter(iterable)
+    while True:
+        run = _active
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        if run is not None:
+            run.record(name, time.perf_counter() - started, rows=count_rows(item) if count_rows else 0)
+        yield item
@@ -0,0 +1,92 @@
+"""
+Versioned schema of fact_market_data: the single list of columns that drives
+the transform's raw read schema and mapping (staging_transform.py), the
+Postgres DDL and migrations (database/schema.py) and the loader's Parquet
+column projection.
+
+Evolution rules, so no version ever requires rewriting existing data:
+
+* Columns are only appended, each tagged with the version that added it,
+  and SCHEMA_VERSION is bumped with them.
+* New columns are nullable. Older Parquet files simply lack them (the loader
+  projects only the columns a file has and they load as NULL), and
+  ALTER TABLE ... ADD COLUMN without a default is a catalog-only change in
+  Postgres, also on a partitioned table.
+* Columns are never renamed, retyped or removed; add a new one instead.
+
+To add a CoinGecko field, append e.g.
+    Column("price_change_pct_24h", "price_change_percentage_24h", "double", "DOUBLE PRECISION", 2)
+and set SCHEMA_VERSION = 2. The next transform writes it, and the next
+loader run adds the column to the table before loading.
+
+Standard library only, with no imports from the rest of the repo, so the
+Glue job can ship it with --extra-py-files.
+"""
+from collections import namedtuple
+
+# name:     fact column
+# source:   raw CoinGecko JSON field, or None for columns set by the pipeline
+# kind:     'string', 'double' or 'timestamp' (UTC), mapped to Spark/Arrow types in staging_transform.py
+# sql_type: Postgres column type
+# version:  schema version that added the column
+Column = namedtuple("Column", ["name", "source", "kind", "sql_type", "version"])
+
+SCHEMA_VERSION = 1
+
+COLUMNS = [
+    Column("coin_id", "id", "string", "VARCHAR(255)", 1),
+    Column("coin_symbol", "symbol", "string", "VARCHAR(50)", 1),
+    Column("price_usd", "current_price", "double", "DOUBLE PRECISION", 1),
+    Column("market_cap_usd", "market_cap", "double", "DOUBLE PRECISION", 1),
+    Column("volume_24h_usd", "total_volume", "double", "DOUBLE PRECISION", 1),
+    Column("source_timestamp", "ingestion_timestamp", "timestamp", "TIMESTAMP", 1),
+    Column("load_date", None, "timestamp", "TIMESTAMP", 1),
+]
+
+KINDS = ("string", "double", "timestamp")
+
+
+def columns(version=None):
+    """Columns of a schema version (default: the current one), in table order."""
+    version = SCHEMA_VERSION if version is None else version
+    if not 1 <= version <= SCHEMA_VERSION:
+        raise ValueError(f"Unknown schema version {version} (current is {SCHEMA_VERSION})")
+    return [column for column in COLUMNS if column.version <= version]
+
+
+def column_names(version=None):
+    return [column.name for column in columns(version)]
+
+
+def source_mapping(version=None):
+    """(raw JSON field, fact column, kind) for every column read from the raw payload."""
+    return [(column.source, column.name, column.kind) for column in columns(version) if column.source]
+
+
+def columns_sql(version=None):
+    """Column definitions for CREATE TABLE."""
+    return ",\n".join(f"    {column.name} {column.sql_type}" for column in columns(version))
+
+
+def added_columns(from_version, to_version=None):
+    """Columns added after `from_version` up to `to_version` (default: current)."""
+    to_version = SCHEMA_VERSION if to_version is None else to_version
+    return [column for column in columns(to_version) if column.version > from_version]
+
+
+def validate():
+    """Check the evolution rules above; raises ValueError on a violation."""
+    names = set()
+    previous = 1
+    for column in COLUMNS:
+        if column.name in names:
+            raise ValueError(f"Duplicate column '{column.name}'")
+        if column.kind not in KINDS:
+            raise ValueError(f"Column '{column.name}' has unknown kind '{column.kind}'")
+        if column.version < previous or column.version > SCHEMA_VERSION:
+            raise ValueError(f"Column '{column.name}' is out of version order (version {column.version})")
+        names.add(column.name)
+        previous = column.version
+
+
+validate()
@@ -0,0 +1,166 @@
+"""
+Concurrent CoinGecko /coins/markets extractor.
+
+Pages are fetched with asyncio over one pooled aiohttp session. A token
+bucket keeps the request rate within the API plan's limit, a semaphore
+bounds concurrency, and 429/5xx responses are retried with exponential
+backoff (honouring Retry-After). Wall-clock time per snapshot is then
+governed by the rate limit rather than by latency x page count.
+"""
+import asyncio
+import logging
+import math
+import os
+import random
+import time
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+API_BASE_URL = os.getenv('COINGECKO_BASE_URL', 'https://api.coingecko.com/api/v3')
+API_KEY = os.getenv('COINGECKO_API_KEY')
+# 'demo' or 'pro' decides which header carries the key
+API_PLAN = os.getenv('COINGECKO_API_PLAN', 'demo')
+VS_CURRENCY = 'usd'
+PER_PAGE = 250                                                  # API maximum
+REQUESTS_PER_MINUTE = float(os.getenv('COINGECKO_RATE_LIMIT_PER_MIN', '30'))
+MAX_CONCURRENCY = int(os.getenv('COINGECKO_MAX_CONCURRENCY', '5'))
+MAX_RETRIES = int(os.getenv('COINGECKO_MAX_RETRIES', '5'))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv('COINGECKO_TIMEOUT_SECONDS', '10'))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursts up to `capacity`.
+
+    Every request takes one token, so sustained throughput never exceeds the
+    plan's limit no matter how many requests are in flight.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _api_headers():
+    headers = {'Accept': 'application/json'}
+    if API_KEY:
+        header = 'x-cg-pro-api-key' if API_PLAN == 'pro' else 'x-cg-demo-api-key'
+        headers[header] = API_KEY
+    return headers
+
+
+def _retry_delay(attempt, retry_after=None, base=1.0, cap=60.0):
+    """Seconds to wait before a retry: Retry-After if given, else capped exponential backoff with jitter."""
+    if retry_after:
+        try:
+            return min(float(retry_after), cap)
+        except ValueError:
+            pass
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+async def fetch_markets_page(session, bucket, semaphore, page, ids=None, base_url=API_BASE_URL):
+    """Fetch one /coins/markets page, retrying on 429/5xx and connection errors."""
+    params = {
+        'vs_currency': VS_CURRENCY,
+        'order': 'market_cap_desc',
+        'per_page': PER_PAGE,
+        'page': page,
+    }
+    if ids:
+        params['ids'] = ','.join(ids)
+
+    url = f"{base_url}/coins/markets"
+    for attempt in range(MAX_RETRIES + 1):
+        await bucket.acquire()
+        async with semaphore:
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status not in RETRY_STATUSES:
+                        response.raise_for_status()
+                        return await response.json()
+                    retry_after = response.headers.get('Retry-After')
+                    error = f"HTTP {response.status}"
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                retry_after = None
+                error = repr(e)
+
+        if attempt == MAX_RETRIES:
+            raise RuntimeError(f"CoinGecko page {page} failed after {MAX_RETRIES + 1} attempts: {error}")
+        delay = _retry_delay(attempt, retry_after)
+        logger.warning(f"Page {page}: {error}, retrying in {delay:.1f}s (attempt {attempt + 1}/{MAX_RETRIES})")
+        await asyncio.sleep(delay)
+
+
+def create_session(concurrency=MAX_CONCURRENCY):
+    """Create an aiohttp session whose connector keeps up to `concurrency` keep-alive connections."""
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=60, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=_api_headers())
+
+
+async def fetch_markets_async(coin_ids=None, top_n=None, session=None,
+                              requests_per_minute=REQUESTS_PER_MINUTE,
+                              concurrency=MAX_CONCURRENCY, base_url=API_BASE_URL):
+    """
+    Fetch market data for explicit `coin_ids` or the `top_n` coins by market cap.
+
+    Pages are requested concurrently (bounded by `concurrency` and the rate
+    limit) and returned in market-cap order. Pass an existing `session` to
+    reuse its keep-alive connections across snapshots.
+
+    Returns:
+        list: CoinGecko /coins/markets records.
+    """
+    if coin_ids:
+        id_chunks = [coin_ids[i:i + PER_PAGE] for i in range(0, len(coin_ids), PER_PAGE)]
+        calls = [(1, chunk) for chunk in id_chunks]
+    else:
+        pages = math.ceil((top_n or PER_PAGE) / PER_PAGE)
+        calls = [(page, None) for page in range(1, pages + 1)]
+
+    bucket = TokenBucket(rate=requests_per_minute / 60.0, capacity=min(concurrency, len(calls)))
+    semaphore = asyncio.Semaphore(concurrency)
+    owns_session = session is None
+    session = session or create_session(concurrency)
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*[
+            fetch_markets_page(session, bucket, semaphore, page, ids, base_url)
+            for page, ids in calls
+        ])
+        records = [record for page_records in results for record in page_records]
+        if top_n:
+            records = records[:top_n]
+        logger.info(
+            f"Fetched {len(records)} coin(s) in {len(calls)} request(s) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return records
+    finally:
+        if owns_session:
+            await session.close()
+
+
+def fetch_markets(coin_ids=None, top_n=None, **kwargs):
+    """Blocking wrapper around fetch_markets_async for synchronous callers."""
+    return asyncio.run(fetch_markets_async(coin_ids=coin_ids, top_n=top_n, **kwargs))
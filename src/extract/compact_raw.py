@@ -0,0 +1,169 @@
+"""
+Compact the raw landing zone.
+
+* Merges the small objects inside each raw/dt=YYYY-MM-DD/hour=HH/ partition
+  into as few objects as the target size allows.
+* With --legacy, migrates the old one-object-per-call files at the bucket
+  root (market_data_YYYY-MM-DD-HH-MM-SS.json) into the partitioned layout,
+  stamping each record with the snapshot time from the file name.
+
+Source objects are deleted only after every merged object of their partition
+has been written. A crash in between leaves duplicates, never gaps; duplicate
+snapshots are collapsed by the natural-key upsert downstream.
+
+Usage:
+    python src/extract/compact_raw.py [--legacy] [--dry-run]
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import boto3
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from src.extract.raw_writer import (
+    RAW_COMPRESSION,
+    RAW_PREFIX,
+    RawZoneWriter,
+    decompress,
+)
+from src.loading.s3_fetch import fetch_objects, list_objects
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+# Configuration
+RAW_BUCKET = os.getenv('RAW_BUCKET', 'julian-crypto-s3-bucket')
+# Objects at or above this size are considered compacted already
+SMALL_FILE_BYTES = int(os.getenv('COMPACT_SMALL_FILE_BYTES', str(32 * 1024 * 1024)))
+# Uncompressed size of each merged object
+TARGET_FILE_BYTES = int(os.getenv('COMPACT_TARGET_FILE_BYTES', str(256 * 1024 * 1024)))
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', '8'))
+
+PARTITION_RE = re.compile(r'dt=(\d{4}-\d{2}-\d{2})/hour=(\d{2})/')
+LEGACY_RE = re.compile(r'^market_data_(\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2})\.json$')
+
+
+def partition_hour(key):
+    """UTC hour of a raw/dt=.../hour=.../ key, or None if the key is not partitioned."""
+    match = PARTITION_RE.search(key)
+    if not match:
+        return None
+    return datetime.strptime(f"{match.group(1)} {match.group(2)}", '%Y-%m-%d %H').replace(tzinfo=timezone.utc)
+
+
+def legacy_snapshot_time(key):
+    """Snapshot time encoded in a legacy market_data_<timestamp>.json key (Lambda clock is UTC)."""
+    match = LEGACY_RE.match(key)
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), '%Y-%m-%d-%H-%M-%S').replace(tzinfo=timezone.utc)
+
+
+def plan_partition_compaction(s3_client, bucket, prefix, small_file_bytes):
+    """Group small partitioned objects by hour; only hours with 2+ small objects need work."""
+    groups = defaultdict(list)
+    for obj in list_objects(s3_client, bucket, f"{prefix}/"):
+        hour = partition_hour(obj['Key'])
+        if hour is not None and obj['Size'] < small_file_bytes:
+            groups[hour].append(obj)
+    return {hour: sorted(objs, key=lambda o: o['Key']) for hour, objs in groups.items() if len(objs) > 1}
+
+
+def plan_legacy_migration(s3_client, bucket):
+    """Group legacy root-level snapshot files by the UTC hour in their name."""
+    groups = defaultdict(list)
+    for obj in list_objects(s3_client, bucket, 'market_data_', suffix='.json'):
+        moment = legacy_snapshot_time(obj['Key'])
+        if moment is not None:
+            groups[moment.replace(minute=0, second=0, microsecond=0)].append(obj)
+    return {hour: sorted(objs, key=lambda o: o['Key']) for hour, objs in groups.items()}
+
+
+def iter_source_records(s3_client, bucket, objects, legacy):
+    """Yield (records, ingested_at) per source object, fetched concurrently."""
+    for obj, body in fetch_objects(s3_client, bucket, objects, max_workers=FETCH_WORKERS):
+        if legacy:
+            yield json.loads(body), legacy_snapshot_time(obj['Key'])
+        else:
+            text = decompress(body, obj['Key']).decode('utf-8')
+            yield [json.loads(line) for line in text.splitlines() if line], None
+
+
+def compact_group(s3_client, bucket, prefix, hour, objects, legacy, compression, target_bytes, dry_run):
+    """Rewrite one hour's objects as merged object(s), then delete the sources."""
+    total_bytes = sum(o['Size'] for o in objects)
+    logger.info(f"{hour:%Y-%m-%d %H}:00 - {len(objects)} object(s), {total_bytes} bytes")
+    if dry_run:
+        return 0
+
+    writer = RawZoneWriter(
+        s3_client, bucket, prefix=prefix, compression=compression,
+        max_records=0, max_bytes=target_bytes, max_age_seconds=0,
+    )
+    written = []
+    for records, ingested_at in iter_source_records(s3_client, bucket, objects, legacy):
+        # Partitioned sources already carry ingestion_timestamp; only the hour matters here
+        written += writer.add(records, ingested_at=ingested_at or hour)
+    written += writer.flush()
+
+    source_keys = [o['Key'] for o in objects]
+    for i in range(0, len(source_keys), 1000):
+        s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in source_keys[i:i + 1000]], 'Quiet': True},
+        )
+    logger.info(f"{hour:%Y-%m-%d %H}:00 - merged into {len(written)} object(s)")
+    return len(source_keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bucket', default=RAW_BUCKET)
+    parser.add_argument('--prefix', default=RAW_PREFIX, help='raw zone prefix (default: %(default)s)')
+    parser.add_argument('--compression', default=RAW_COMPRESSION, choices=['gzip', 'zstd'])
+    parser.add_argument('--small-file-bytes', type=int, default=SMALL_FILE_BYTES)
+    parser.add_argument('--target-file-bytes', type=int, default=TARGET_FILE_BYTES)
+    parser.add_argument('--legacy', action='store_true',
+                        help='also migrate root-level market_data_*.json files')
+    parser.add_argument('--dry-run', action='store_true', help='only report what would be compacted')
+    args = parser.parse_args()
+
+    s3_client = boto3.client('s3')
+    prefix = args.prefix.rstrip('/')
+    replaced = 0
+    try:
+        plans = [(False, plan_partition_compaction(s3_client, args.bucket, prefix, args.small_file_bytes))]
+        if args.legacy:
+            plans.append((True, plan_legacy_migration(s3_client, args.bucket)))
+
+        for legacy, groups in plans:
+            label = 'legacy snapshot' if legacy else 'small raw'
+            logger.info(f"Found {sum(len(o) for o in groups.values())} {label} object(s) in {len(groups)} hour(s)")
+            for hour in sorted(groups):
+                replaced += compact_group(
+                    s3_client, args.bucket, prefix, hour, groups[hour], legacy,
+                    args.compression, args.target_file_bytes, args.dry_run,
+                )
+    except Exception as e:
+        logger.error(f"Compaction failed: {e}")
+        return 1
+
+    logger.info(f"Compaction complete: {replaced} source object(s) replaced")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
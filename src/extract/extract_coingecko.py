@@ -1,22 +1,23 @@
-import requests
 import csv
 from datetime import datetime, timezone
 import os
+import sys
 
-COINS = ["bitcoin", "ethereum", "solana"]
-VS_CURRENCY = "usd"
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
 
-def fetch_crypto_prices():
-    url = "https://api.coingecko.com/api/v3/coins/markets"
-    params = {
-        "vs_currency": VS_CURRENCY,
-        "ids": ",".join(COINS)
-    }
+from src.extract.async_coingecko import fetch_markets
 
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+COINS = ["bitcoin", "ethereum", "solana"]
+# Track the top N coins by market cap instead of COINS (0 = disabled)
+TOP_N_COINS = int(os.getenv("TOP_N_COINS", "0"))
 
-    data = response.json()
+def fetch_crypto_prices():
+    if TOP_N_COINS:
+        data = fetch_markets(top_n=TOP_N_COINS)
+    else:
+        data = fetch_markets(coin_ids=COINS)
 
     snapshot_date = datetime.now(timezone.utc).date().isoformat()
     ingestion_time = datetime.now(timezone.utc).isoformat()
@@ -1,42 +1,113 @@
 import json
-import boto3
-import requests
-from datetime import datetime
+import os
+import sys
+import time
+
+_INIT_STARTED = time.perf_counter()
+
+# Deployed as a zip with src/ at its root (see package_lambda.py), where this
+# resolves to the already importable task root; locally it is the repo root.
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from src.common.instrumentation import RunMetrics
+from src.extract.raw_writer import RawZoneWriter
 
 # Configuration
 TARGET_S3_BUCKET = "julian-crypto-s3-bucket"
 TARGET_COINS = ["bitcoin", "ethereum", "solana"]
-VS_CURRENCY = "usd"
-API_ENDPOINT = "https://api.coingecko.com/api/v3/coins/markets"
+# Track the top N coins by market cap instead of TARGET_COINS (0 = disabled)
+TOP_N_COINS = int(os.getenv("TOP_N_COINS", "0"))
+
+# ==============================================================================
+# MODULE-SCOPE STATE (survives across warm invocations)
+# ==============================================================================
+# boto3 and aiohttp are imported on first use, not at import time, and the
+# clients built from them are kept here so warm invocations reuse them
+# (including their keep-alive connections) instead of rebuilding them.
+_s3_client = None
+_event_loop = None
+_http_session = None
+_cold_start = True
+
+
+def get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client("s3")
+    return _s3_client
+
+
+def _get_event_loop():
+    # aiohttp sessions are bound to one loop, so keep a loop alive instead of asyncio.run()
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        import asyncio
+        _event_loop = asyncio.new_event_loop()
+    return _event_loop
+
+
+def _get_http_session():
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        from src.extract.async_coingecko import create_session
+
+        async def build():
+            return create_session()
 
-# Initialize AWS clients
-s3_client = boto3.client("s3")
+        _http_session = _get_event_loop().run_until_complete(build())
+    return _http_session
 
-# Fetch market data from CoinGecko API
+
+def close_http_session():
+    """Close the cached HTTP session and loop (for local runs; Lambda just freezes them)."""
+    global _http_session, _event_loop
+    if _http_session is not None and not _http_session.closed:
+        _get_event_loop().run_until_complete(_http_session.close())
+    if _event_loop is not None and not _event_loop.is_closed():
+        _event_loop.close()
+    _http_session = _event_loop = None
+
+
+# Fetch market data from CoinGecko API (pages fetched concurrently under the rate limit)
 def fetch_market_data():
-    params = {
-        "vs_currency": VS_CURRENCY,
-        "ids": ",".join(TARGET_COINS)
-    }
-    response = requests.get(API_ENDPOINT, params=params, timeout=10)
-    response.raise_for_status()
-    return response.json()
+    from src.extract.async_coingecko import fetch_markets_async
+
+    session = _get_http_session()
+    if TOP_N_COINS:
+        request = fetch_markets_async(top_n=TOP_N_COINS, session=session)
+    else:
+        request = fetch_markets_async(coin_ids=TARGET_COINS, session=session)
+    return _get_event_loop().run_until_complete(request)
+
+
 def lambda_handler(event, context):
+    global _cold_start
+    cold_start, _cold_start = _cold_start, False
+    # One JSON line (and, with METRICS_FORMAT=emf, CloudWatch metrics) per
+    # invocation, so cold vs warm latency can be aggregated per stage
+    run = RunMetrics('extract', dimensions={'cold_start': cold_start})
+    init_ms = _INIT_MS if cold_start else 0
     try:
-        data = fetch_market_data()
+        with run.stage('fetch') as fetch:
+            data = fetch_market_data()
+            fetch.add(rows=len(data))
 
-        current_time = datetime.now()
-        timestamp = current_time.strftime("%Y-%m-%d-%H-%M-%S")
+        # Flushed once per invocation: buffering across frozen invocations could
+        # lose data, so the small hourly objects are merged later by compact_raw.py
+        writer = RawZoneWriter(get_s3_client(), TARGET_S3_BUCKET,
+                               max_records=0, max_bytes=0, max_age_seconds=0)
+        with run.stage('serialize', rows=len(data)):
+            writer.add(data)
+            raw_bytes = writer.buffered_bytes
 
-        filename = f"market_data_{timestamp}.json"
-
-        s3_client.put_object(
-            Bucket=TARGET_S3_BUCKET,
-            Key=filename,
-            Body=json.dumps(data),
-            ContentType='application/json'
-        )
+        with run.stage('put', bytes=raw_bytes):
+            keys = writer.flush()
+        filename = keys[0] if keys else None
 
+        run.report(status='ok', init_ms=init_ms, records=len(data), bytes=raw_bytes)
         return {
             'statusCode': 200,
             'body': json.dumps({
@@ -48,12 +119,18 @@ def lambda_handler(event, context):
 
     except Exception as e:
         print(e)
+        run.report(status='error', init_ms=init_ms, error=str(e))
         return {
             'statusCode': 500,
             'body': json.dumps(str(e))
         }
-    
+
+
+_INIT_MS = round((time.perf_counter() - _INIT_STARTED) * 1000, 2)
+
 if __name__ == "__main__":
+    import boto3
+
     # 1. Verify AWS Identity (helps debug account/permission issues)
     try:
         sts = boto3.client("sts")
@@ -64,17 +141,18 @@ if __name__ == "__main__":
 
     # 2. Run the handler
     result = lambda_handler(None, None)
+    close_http_session()
     print(f"Lambda Result: {result}")
 
     # 3. List bucket contents to verify upload
     if result['statusCode'] == 200:
         print(f"\nChecking bucket '{TARGET_S3_BUCKET}' contents:")
         try:
-            response = s3_client.list_objects_v2(Bucket=TARGET_S3_BUCKET)
+            response = get_s3_client().list_objects_v2(Bucket=TARGET_S3_BUCKET)
             if 'Contents' in response:
                 for obj in response['Contents']:
                     print(f" - {obj['Key']} ({obj['Size']} bytes)")
             else:
                 print("Bucket is empty.")
         except Exception as e:
-            print(f"Error listing bucket: {e}")
\ No newline at end of file
+            print(f"Error listing bucket: {e}")
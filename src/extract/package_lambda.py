@@ -0,0 +1,103 @@
+"""
+Build the deployment zip for the extraction Lambda.
+
+The handler imports the shared modules as the src package, so the zip keeps
+the repo layout with src/ at its root, next to the third-party packages:
+
+    lambda.zip
+    ├── src/common/instrumentation.py
+    ├── src/extract/async_coingecko.py
+    ├── src/extract/lambda_function.py
+    ├── src/extract/raw_writer.py
+    └── aiohttp/, yarl/, multidict/, ...   (aiohttp and its dependencies)
+
+Handler: src.extract.lambda_function.lambda_handler. boto3 is provided by
+the Python runtime and is not bundled. Wheels are fetched for the Lambda
+platform (manylinux, --python-version), so the zip can be built on any OS.
+
+Usage:
+    python src/extract/package_lambda.py
+    python src/extract/package_lambda.py --output dist/lambda.zip --python-version 3.12 --arch arm64
+"""
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Modules the handler imports, relative to the repo root
+LAMBDA_MODULES = [
+    'src/common/instrumentation.py',
+    'src/extract/async_coingecko.py',
+    'src/extract/lambda_function.py',
+    'src/extract/raw_writer.py',
+]
+# Third-party packages, pinned in requirements.txt
+LAMBDA_REQUIREMENTS = ['aiohttp']
+PLATFORMS = {'x86_64': 'manylinux2014_x86_64', 'arm64': 'manylinux2014_aarch64'}
+
+
+def pinned_requirements(names, path=os.path.join(REPO_ROOT, 'requirements.txt')):
+    """The requirements.txt lines for `names` (the bare name when not pinned there)."""
+    pins = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                pins[line.split('==')[0].lower()] = line
+    return [pins.get(name.lower(), name) for name in names]
+
+
+def install_requirements(target, python_version, arch):
+    subprocess.run(
+        [sys.executable, '-m', 'pip', 'install', '--quiet', '--target', target,
+         '--platform', PLATFORMS[arch], '--implementation', 'cp', '--python-version', python_version,
+         '--only-binary=:all:', *pinned_requirements(LAMBDA_REQUIREMENTS)],
+        check=True,
+    )
+
+
+def build(output, python_version, arch):
+    """
+    Returns:
+        int: Files written to the zip.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with tempfile.TemporaryDirectory() as site_packages:
+        install_requirements(site_packages, python_version, arch)
+        files = 0
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for module in LAMBDA_MODULES:
+                archive.write(os.path.join(REPO_ROOT, module), module)
+                files += 1
+            for root, dirs, names in os.walk(site_packages):
+                dirs[:] = [d for d in dirs if d != '__pycache__']
+                for name in names:
+                    path = os.path.join(root, name)
+                    archive.write(path, os.path.relpath(path, site_packages))
+                    files += 1
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=os.path.join(REPO_ROOT, 'dist', 'lambda.zip'))
+    parser.add_argument('--python-version', default='3.12', help='Lambda Python runtime version')
+    parser.add_argument('--arch', default='x86_64', choices=sorted(PLATFORMS))
+    args = parser.parse_args()
+
+    files = build(args.output, args.python_version, args.arch)
+    logger.info(f"Wrote {args.output} ({files} files, {os.path.getsize(args.output) / 1e6:.1f} MB); "
+                f"handler: src.extract.lambda_function.lambda_handler")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
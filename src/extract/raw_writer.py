@@ -0,0 +1,232 @@
+"""
+Raw landing zone writer.
+
+Snapshots are buffered as newline-delimited JSON and written as compressed
+objects under a Hive-style prefix:
+
+    raw/dt=YYYY-MM-DD/hour=HH/part-<write time>-<uuid>.json.gz
+
+so Glue/Spark can prune by date/hour and read a few larger objects instead
+of one tiny uncompressed object per API call.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+RAW_PREFIX = os.getenv('RAW_PREFIX', 'raw')
+RAW_COMPRESSION = os.getenv('RAW_COMPRESSION', 'gzip')              # 'gzip' or 'zstd'
+# Flush when any threshold is reached (0 disables that threshold)
+RAW_FLUSH_MAX_RECORDS = int(os.getenv('RAW_FLUSH_MAX_RECORDS', '50000'))
+RAW_FLUSH_MAX_BYTES = int(os.getenv('RAW_FLUSH_MAX_BYTES', str(64 * 1024 * 1024)))
+RAW_FLUSH_MAX_AGE_SECONDS = float(os.getenv('RAW_FLUSH_MAX_AGE_SECONDS', '900'))
+# Cap on buffered bytes while writes keep failing; the oldest unwritten buffers are dropped beyond it (0 = no cap)
+RAW_MAX_PENDING_BYTES = int(os.getenv('RAW_MAX_PENDING_BYTES', str(256 * 1024 * 1024)))
+
+EXTENSIONS = {'gzip': '.json.gz', 'zstd': '.json.zst'}
+
+
+def compress(data, compression):
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    raise ValueError(f"Unsupported raw compression '{compression}'")
+
+
+def decompress(data, key):
+    """Decompress a raw object according to its key's extension."""
+    if key.endswith('.gz'):
+        return gzip.decompress(data)
+    if key.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {key}")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def partition_prefix(moment, prefix=RAW_PREFIX):
+    """Hive-style dt/hour prefix for a UTC datetime."""
+    return f"{prefix}/dt={moment:%Y-%m-%d}/hour={moment:%H}/"
+
+
+def object_key(moment, compression, prefix=RAW_PREFIX):
+    """Unique object key in `moment`'s partition; names sort by write time."""
+    written_at = datetime.now(timezone.utc)
+    return (
+        f"{partition_prefix(moment, prefix)}"
+        f"part-{written_at:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:12]}{EXTENSIONS[compression]}"
+    )
+
+
+def encode_records(records, ingestion_timestamp=None):
+    """
+    Encode records as NDJSON bytes, stamping `ingestion_timestamp` on records
+    that do not carry one (it becomes source_timestamp downstream).
+    """
+    lines = []
+    for record in records:
+        if ingestion_timestamp is not None and not record.get('ingestion_timestamp'):
+            record = {**record, 'ingestion_timestamp': ingestion_timestamp}
+        lines.append(json.dumps(record, separators=(',', ':')))
+    return ('\n'.join(lines) + '\n').encode('utf-8') if lines else b''
+
+
+class RawZoneWriter:
+    """
+    Buffer snapshots and write them to the raw zone as compressed NDJSON.
+
+    Records are grouped by the UTC hour they were ingested in; a buffer is
+    flushed when it reaches `max_records`, `max_bytes` or `max_age_seconds`,
+    when a snapshot for a later hour arrives, or on flush()/close().
+
+    A buffer being flushed is sealed first, so a failed write leaves it queued
+    for the next flush while new snapshots keep being buffered. Should writes
+    keep failing, the oldest sealed buffers are dropped once everything
+    buffered exceeds `max_pending_bytes`.
+    """
+
+    def __init__(self, s3_client, bucket, prefix=RAW_PREFIX, compression=RAW_COMPRESSION,
+                 max_records=RAW_FLUSH_MAX_RECORDS, max_bytes=RAW_FLUSH_MAX_BYTES,
+                 max_age_seconds=RAW_FLUSH_MAX_AGE_SECONDS, max_pending_bytes=RAW_MAX_PENDING_BYTES):
+        """
+        :param s3_client: A Boto3 S3 client.
+        :param bucket: Target bucket.
+        :param prefix: Raw zone prefix (without trailing slash).
+        :param compression: 'gzip' or 'zstd' (requires the zstandard package).
+        :param max_records: Flush after this many buffered records.
+        :param max_bytes: Flush after this many uncompressed buffered bytes.
+        :param max_age_seconds: Flush once the oldest buffered record is this old.
+        :param max_pending_bytes: Cap on all buffered bytes, written or not (0 disables it).
+        """
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Unsupported raw compression '{compression}'")
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError("RAW_COMPRESSION=zstd requires the zstandard package")
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip('/')
+        self.compression = compression
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.max_pending_bytes = max_pending_bytes
+        # (hour, NDJSON bytes, records) per sealed buffer, oldest first
+        self._sealed = []
+        self.records_dropped = 0
+        self._reset()
+
+    def _reset(self):
+        self._chunks = []
+        self._records = 0
+        self._bytes = 0
+        self._hour = None
+        self._opened_at = None
+
+    def add(self, records, ingested_at=None):
+        """
+        Buffer one snapshot of records, flushing first if it belongs to a new hour.
+
+        Returns:
+            list: Keys written by any flush this call triggered.
+        """
+        ingested_at = ingested_at or datetime.now(timezone.utc)
+        hour = ingested_at.replace(minute=0, second=0, microsecond=0)
+        if self._hour is not None and hour != self._hour:
+            self._seal()
+
+        # Buffered before anything is written, so a failing flush can't lose this snapshot
+        payload = encode_records(records, ingested_at.isoformat())
+        if payload:
+            if self._hour is None:
+                self._hour = hour
+                self._opened_at = time.monotonic()
+            self._chunks.append(payload)
+            self._records += len(records)
+            self._bytes += len(payload)
+        self._enforce_cap()
+
+        if self._records and self._should_flush():
+            return self.flush()
+        if self._sealed:
+            return self._write_sealed()
+        return []
+
+    @property
+    def buffered_records(self):
+        return self._records + sum(records for _, _, records in self._sealed)
+
+    @property
+    def buffered_bytes(self):
+        return self._bytes + sum(len(data) for _, data, _ in self._sealed)
+
+    def _should_flush(self):
+        if self.max_records and self._records >= self.max_records:
+            return True
+        if self.max_bytes and self._bytes >= self.max_bytes:
+            return True
+        if self.max_age_seconds and time.monotonic() - self._opened_at >= self.max_age_seconds:
+            return True
+        return False
+
+    def _seal(self):
+        """Move the open buffer to the queue of buffers waiting to be written."""
+        if self._records:
+            self._sealed.append((self._hour, b''.join(self._chunks), self._records))
+        self._reset()
+
+    def _enforce_cap(self):
+        """Drop the oldest sealed buffers while everything buffered exceeds max_pending_bytes."""
+        while self.max_pending_bytes and self._sealed and self.buffered_bytes > self.max_pending_bytes:
+            hour, data, records = self._sealed.pop(0)
+            self.records_dropped += records
+            logger.error(
+                f"Raw buffer over {self.max_pending_bytes} bytes after failed writes; dropped {records} "
+                f"record(s) for {partition_prefix(hour, self.prefix)}"
+            )
+
+    def _write_sealed(self):
+        """Write sealed buffers oldest first; a failure keeps it and the rest for the next flush."""
+        written = []
+        while self._sealed:
+            hour, data, records = self._sealed[0]
+            key = object_key(hour, self.compression, self.prefix)
+            body = compress(data, self.compression)
+            self.s3_client.put_object(
+                Bucket=self.bucket,
+                Key=key,
+                Body=body,
+                ContentType='application/x-ndjson',
+            )
+            logger.info(
+                f"Wrote {records} record(s) to s3://{self.bucket}/{key} "
+                f"({len(data)} -> {len(body)} bytes)"
+            )
+            self._sealed.pop(0)
+            written.append(key)
+        return written
+
+    def flush(self):
+        """Write the buffered records (if any), one object per buffer; return the keys written."""
+        self._seal()
+        return self._write_sealed()
+
+    def close(self):
+        return self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,213 @@
+"""
+Glue Data Catalog definitions for the data lake, kept current without a crawler.
+
+* crypto_db.fact_market_data: the processed zone (Parquet, partitioned by dt,
+  plus coin_id when the transform partitions by coin). Columns come from the
+  schema registry, so a new registry version updates the table on the next
+  bootstrap. The transforms register exactly the partitions they wrote
+  (register_processed_partitions), so Athena sees new dates as soon as the
+  write finishes and no crawler has to rescan the bucket.
+* crypto_db.raw_market_data: the raw zone (NDJSON under dt=YYYY-MM-DD/hour=HH/).
+  It uses Athena partition projection, so partitions are computed from the
+  dt/hour template at query time and the extract never calls Glue.
+
+bootstrap_catalog() creates or updates the database and both tables and is
+safe to run any number of times; see creation_glue_datacatlog_db.py.
+
+Besides boto3 (through GlueWrapper) it only needs the schema registry, so the
+Glue job can ship it with --extra-py-files.
+"""
+import logging
+import os
+
+try:
+    from src.common.schema_registry import SCHEMA_VERSION, columns
+    from src.glue.creating_aws_glue_crawler import GlueWrapper
+except ImportError:  # shipped flat to Glue with --extra-py-files
+    from schema_registry import SCHEMA_VERSION, columns
+    from creating_aws_glue_crawler import GlueWrapper
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+GLUE_DATABASE = os.getenv('GLUE_DATABASE', 'crypto_db')
+GLUE_DATABASE_DESCRIPTION = 'Database for crypto market data'
+PROCESSED_TABLE = os.getenv('GLUE_PROCESSED_TABLE', 'fact_market_data')
+RAW_TABLE = os.getenv('GLUE_RAW_TABLE', 'raw_market_data')
+RAW_PATH = os.getenv('RAW_PATH', 's3://julian-crypto-s3-bucket/raw/')
+PROCESSED_PATH = os.getenv('PROCESSED_PATH', 's3://julian-crypto-s3-bucket/processed/fact_market_data/')
+# First date Athena projects raw partitions for
+RAW_PROJECTION_START = os.getenv('RAW_PROJECTION_START', '2024-01-01')
+
+# Registry kind -> Glue (Hive) type
+GLUE_TYPES = {'string': 'string', 'double': 'double', 'timestamp': 'timestamp'}
+
+PARQUET_FORMAT = {
+    'InputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat',
+    'OutputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat',
+    'SerdeInfo': {'SerializationLibrary': 'org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe'},
+}
+JSON_FORMAT = {
+    'InputFormat': 'org.apache.hadoop.mapred.TextInputFormat',
+    'OutputFormat': 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat',
+    'SerdeInfo': {'SerializationLibrary': 'org.openx.data.jsonserde.JsonSerDe'},
+}
+
+
+def _location(path):
+    """Directory URI with exactly one trailing slash."""
+    return path.rstrip('/') + '/'
+
+
+def split_s3_path(path):
+    """'s3://bucket/prefix/' -> ('bucket', 'prefix/')"""
+    bucket, _, prefix = path[len('s3://'):].partition('/')
+    return bucket, prefix
+
+
+# ==============================================================================
+# TABLE DEFINITIONS
+# ==============================================================================
+
+def processed_table_input(location=PROCESSED_PATH, partition_keys=('dt',), name=PROCESSED_TABLE):
+    """
+    TableInput for the processed zone.
+
+    Partition columns are stored in the path, not in the Parquet files, so they
+    are left out of the data columns.
+    """
+    data_columns = [
+        {'Name': column.name, 'Type': GLUE_TYPES[column.kind]}
+        for column in columns() if column.name not in partition_keys
+    ]
+    return {
+        'Name': name,
+        'TableType': 'EXTERNAL_TABLE',
+        'PartitionKeys': [{'Name': key, 'Type': 'string'} for key in partition_keys],
+        'StorageDescriptor': {'Columns': data_columns, 'Location': _location(location), **PARQUET_FORMAT},
+        'Parameters': {
+            'classification': 'parquet',
+            'EXTERNAL': 'TRUE',
+            'schema_version': str(SCHEMA_VERSION),
+        },
+    }
+
+
+def raw_table_input(location=RAW_PATH, name=RAW_TABLE, projection_start=RAW_PROJECTION_START):
+    """
+    TableInput for the raw zone, with dt/hour partition projection.
+
+    Raw fields keep their CoinGecko names; timestamps are ISO strings in the
+    payload, so they are declared as string.
+    """
+    location = _location(location)
+    data_columns = [
+        {'Name': column.source, 'Type': 'string' if column.kind == 'timestamp' else GLUE_TYPES[column.kind]}
+        for column in columns() if column.source
+    ]
+    return {
+        'Name': name,
+        'TableType': 'EXTERNAL_TABLE',
+        'PartitionKeys': [{'Name': 'dt', 'Type': 'string'}, {'Name': 'hour', 'Type': 'string'}],
+        'StorageDescriptor': {'Columns': data_columns, 'Location': location, **JSON_FORMAT},
+        'Parameters': {
+            'classification': 'json',
+            'EXTERNAL': 'TRUE',
+            'projection.enabled': 'true',
+            'projection.dt.type': 'date',
+            'projection.dt.format': 'yyyy-MM-dd',
+            'projection.dt.range': f'{projection_start},NOW',
+            'projection.hour.type': 'integer',
+            'projection.hour.range': '0,23',
+            'projection.hour.digits': '2',
+            'storage.location.template': location + 'dt=${dt}/hour=${hour}/',
+        },
+    }
+
+
+def bootstrap_catalog(glue_client, raw_path=RAW_PATH, processed_path=PROCESSED_PATH,
+                      processed_partition_keys=('dt',), database=GLUE_DATABASE):
+    """
+    Create or update the database and the raw and processed tables.
+
+    Idempotent: existing objects are left alone unless their definition changed
+    (e.g. a new schema registry version), in which case the table is updated.
+
+    Returns:
+        dict: Outcome per object ('created', 'updated' or 'unchanged').
+    """
+    glue = GlueWrapper(glue_client)
+    created = glue.ensure_database(database, GLUE_DATABASE_DESCRIPTION)
+    outcome = {database: 'created' if created else 'unchanged'}
+    for table_input in (raw_table_input(raw_path), processed_table_input(processed_path, processed_partition_keys)):
+        outcome[table_input['Name']] = glue.ensure_table(database, table_input)
+    return outcome
+
+
+# ==============================================================================
+# PARTITION REGISTRATION
+# ==============================================================================
+
+def partition_inputs(table_input, partition_values):
+    """
+    PartitionInput for each tuple of partition values, located at
+    <table location>/key=value/... and sharing the table's format and columns.
+    """
+    keys = [key['Name'] for key in table_input['PartitionKeys']]
+    descriptor = table_input['StorageDescriptor']
+    inputs = []
+    for values in partition_values:
+        values = [str(value) for value in values]
+        if len(values) != len(keys):
+            raise ValueError(f"Partition values {values} don't match partition keys {keys}")
+        path = ''.join(f"{key}={value}/" for key, value in zip(keys, values))
+        inputs.append({'Values': values, 'StorageDescriptor': {**descriptor, 'Location': descriptor['Location'] + path}})
+    return inputs
+
+
+def register_processed_partitions(glue_client, partition_values, location=PROCESSED_PATH,
+                                  partition_keys=('dt',), database=GLUE_DATABASE):
+    """
+    Register processed-zone partitions written by a transform run.
+
+    `partition_values` holds one tuple per partition in `partition_keys` order
+    (a bare string is taken as a dt). Already registered partitions are skipped.
+
+    Returns:
+        int: Partitions newly registered.
+    """
+    values = [(value,) if isinstance(value, str) else tuple(value) for value in partition_values]
+    if not values:
+        return 0
+    table_input = processed_table_input(location, partition_keys)
+    created = GlueWrapper(glue_client).batch_create_partition(
+        database, table_input['Name'], partition_inputs(table_input, values)
+    )
+    logger.info(f"Glue catalog: {created} new of {len(values)} partition(s) registered in {database}.{table_input['Name']}")
+    return created
+
+
+def list_partitions(s3_client, location, partition_keys=('dt',), dates=None):
+    """
+    Partition values present under an s3:// location, found by listing one
+    key=value level at a time with a delimiter (no per-object listing).
+
+    :param dates: Only look under these dt values (the first partition key).
+    :return: Sorted tuples of partition values.
+    """
+    bucket, prefix = split_s3_path(_location(location))
+    paginator = s3_client.get_paginator('list_objects_v2')
+
+    def walk(prefix, keys, values):
+        if not keys:
+            yield tuple(values)
+            return
+        marker = f"{keys[0]}="
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix + marker, Delimiter='/'):
+            for common in page.get('CommonPrefixes', []):
+                value = common['Prefix'][len(prefix) + len(marker):].rstrip('/')
+                if dates is not None and not values and value not in dates:
+                    continue
+                yield from walk(common['Prefix'], keys[1:], values + [value])
+
+    return sorted(walk(prefix, list(partition_keys), []))
@@ -5,7 +5,6 @@ from botocore.exceptions import ClientError
 
 #Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 my_crawler_name = 'crypto_glue_crawler'
 my_iam_role = os.getenv('AWS_GLUE_IAM_ROLE')
@@ -13,10 +12,8 @@ my_glue_db_name = 'crypto_db'
 my_prefix = 'raw_'
 s3_bucket = os.getenv('S3_BUCKET', 'julian-crypto-s3-bucket')
 my_s3_target = f's3://{s3_bucket}/'
-
-if not my_iam_role:
-    logger.error("AWS_GLUE_IAM_ROLE environment variable is required but not set")
-    raise ValueError("AWS_GLUE_IAM_ROLE environment variable must be set")
+# BatchCreatePartition accepts at most 100 partitions per request
+BATCH_CREATE_PARTITION_MAX = 100
 
 class GlueWrapper:
     """Encapsulates AWS Glue actions."""
@@ -60,7 +57,163 @@ class GlueWrapper:
             )
             raise
 
+    def ensure_database(self, name, description=None):
+        """
+        Creates a database in the Data Catalog unless it already exists.
+
+        :param name: The name of the database.
+        :param description: Optional description for a newly created database.
+        :return: True if the database was created, False if it already existed.
+        """
+        try:
+            self.glue_client.get_database(Name=name)
+            return False
+        except ClientError as err:
+            if err.response["Error"]["Code"] != "EntityNotFoundException":
+                logger.error(
+                    "Couldn't get database %s. Here's why: %s: %s",
+                    name,
+                    err.response["Error"]["Code"],
+                    err.response["Error"]["Message"],
+                )
+                raise
+        database_input = {"Name": name}
+        if description:
+            database_input["Description"] = description
+        try:
+            self.glue_client.create_database(DatabaseInput=database_input)
+            logger.info("Created database %s", name)
+            return True
+        except ClientError as err:
+            # Created concurrently by another run
+            if err.response["Error"]["Code"] == "AlreadyExistsException":
+                return False
+            logger.error(
+                "Couldn't create database %s. Here's why: %s: %s",
+                name,
+                err.response["Error"]["Code"],
+                err.response["Error"]["Message"],
+            )
+            raise
+
+    def get_table(self, db_name, table_name):
+        """
+        Gets a table definition from the Data Catalog.
+
+        :param db_name: The database that contains the table.
+        :param table_name: The name of the table.
+        :return: The table definition, or None if the table does not exist.
+        """
+        try:
+            return self.glue_client.get_table(DatabaseName=db_name, Name=table_name)["Table"]
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "EntityNotFoundException":
+                return None
+            logger.error(
+                "Couldn't get table %s.%s. Here's why: %s: %s",
+                db_name,
+                table_name,
+                err.response["Error"]["Code"],
+                err.response["Error"]["Message"],
+            )
+            raise
+
+    def ensure_table(self, db_name, table_input):
+        """
+        Creates a table, or updates it when its columns, partition keys, location
+        or parameters differ from `table_input`. Repeated calls with the same
+        definition make no changes.
+
+        :param db_name: The database that contains the table.
+        :param table_input: A Glue TableInput dict.
+        :return: 'created', 'updated' or 'unchanged'.
+        """
+        name = table_input["Name"]
+        existing = self.get_table(db_name, name)
+        try:
+            if existing is None:
+                self.glue_client.create_table(DatabaseName=db_name, TableInput=table_input)
+                logger.info("Created table %s.%s", db_name, name)
+                return "created"
+            current = {
+                "Columns": existing["StorageDescriptor"].get("Columns", []),
+                "Location": existing["StorageDescriptor"].get("Location"),
+                "PartitionKeys": existing.get("PartitionKeys", []),
+                "Parameters": existing.get("Parameters", {}),
+            }
+            wanted = {
+                "Columns": table_input["StorageDescriptor"].get("Columns", []),
+                "Location": table_input["StorageDescriptor"].get("Location"),
+                "PartitionKeys": table_input.get("PartitionKeys", []),
+                "Parameters": table_input.get("Parameters", {}),
+            }
+            if current == wanted:
+                return "unchanged"
+            self.glue_client.update_table(DatabaseName=db_name, TableInput=table_input)
+            logger.info("Updated table %s.%s", db_name, name)
+            return "updated"
+        except ClientError as err:
+            logger.error(
+                "Couldn't create or update table %s.%s. Here's why: %s: %s",
+                db_name,
+                name,
+                err.response["Error"]["Code"],
+                err.response["Error"]["Message"],
+            )
+            raise
+
+    def batch_create_partition(self, db_name, table_name, partition_inputs):
+        """
+        Registers partitions directly in the Data Catalog, without a crawler.
+
+        Partitions are sent in chunks of 100 (the API's limit). Partitions that
+        are already registered are skipped, so the call is safe to repeat for
+        the same values.
+
+        :param db_name: The database that contains the table.
+        :param table_name: The partitioned table.
+        :param partition_inputs: Glue PartitionInput dicts ('Values' and 'StorageDescriptor').
+        :return: The number of partitions newly created.
+        """
+        created = 0
+        for offset in range(0, len(partition_inputs), BATCH_CREATE_PARTITION_MAX):
+            chunk = partition_inputs[offset:offset + BATCH_CREATE_PARTITION_MAX]
+            try:
+                response = self.glue_client.batch_create_partition(
+                    DatabaseName=db_name,
+                    TableName=table_name,
+                    PartitionInputList=chunk,
+                )
+            except ClientError as err:
+                logger.error(
+                    "Couldn't create partitions for %s.%s. Here's why: %s: %s",
+                    db_name,
+                    table_name,
+                    err.response["Error"]["Code"],
+                    err.response["Error"]["Message"],
+                )
+                raise
+            errors = [
+                error for error in response.get("Errors", [])
+                if error["ErrorDetail"]["ErrorCode"] != "AlreadyExistsException"
+            ]
+            if errors:
+                details = "; ".join(
+                    f"{error['PartitionValues']}: {error['ErrorDetail']['ErrorCode']}: "
+                    f"{error['ErrorDetail'].get('ErrorMessage', '')}"
+                    for error in errors
+                )
+                logger.error("Couldn't create partitions for %s.%s: %s", db_name, table_name, details)
+                raise RuntimeError(f"Couldn't create {len(errors)} partition(s) for {db_name}.{table_name}: {details}")
+            created += len(chunk) - len(response.get("Errors", []))
+        return created
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    # Checked here rather than at import so the catalog code can use GlueWrapper without a crawler role
+    if not my_iam_role:
+        logger.error("AWS_GLUE_IAM_ROLE environment variable is required but not set")
+        raise ValueError("AWS_GLUE_IAM_ROLE environment variable must be set")
     glue_client = boto3.client('glue')
     glue_wrapper = GlueWrapper(glue_client)
     glue_wrapper.create_crawler(my_crawler_name, my_iam_role, my_glue_db_name, my_prefix, my_s3_target)
@@ -1,21 +1,63 @@
+"""
+Create or update the Glue Data Catalog database and tables (see catalog.py).
+
+Safe to re-run: existing objects are left as they are, and a table is only
+updated when its definition changed, e.g. after a schema registry version
+bump. Run it once before the first transform and again after schema changes;
+the transforms then register their partitions themselves, so no crawler is
+needed.
+
+Usage:
+    python src/glue/creation_glue_datacatlog_db.py
+    python src/glue/creation_glue_datacatlog_db.py --backfill
+"""
+import argparse
+import logging
+import os
+import sys
+
 import boto3
 
-# Pseudo-code Walkthrough for creating an AWS Glue Data Catalog Database:
-#
-# 1. Initialize the Boto3 Glue client.
-#This establishes the connection to AWS Glue.
-glue_client = boto3.client('glue')
-
-# 2. Define the database properties.
-crypto_db = 'crypto_db'
-
-
-# 3. Execute the creation command.   
-response = glue_client.create_database(
-    DatabaseInput={
-        'Name': crypto_db,
-        'Description': 'Database for crypto market data'
-    } 
-) 
-# 4. Confirm creation.
-print(f"Database '{crypto_db}' created successfully.")
+# Make the repo-root packages (src/, database/) importable when run as a script
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from src.glue.catalog import (
+    GLUE_DATABASE,
+    PROCESSED_PATH,
+    RAW_PATH,
+    bootstrap_catalog,
+    list_partitions,
+    register_processed_partitions,
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default=GLUE_DATABASE)
+    parser.add_argument('--raw', default=RAW_PATH, help='raw zone s3:// URI')
+    parser.add_argument('--processed', default=PROCESSED_PATH, help='processed zone s3:// URI')
+    parser.add_argument('--partition-by-coin', action='store_true',
+                        help='the processed zone is also partitioned by coin_id (PARTITION_BY_COIN job parameter)')
+    parser.add_argument('--backfill', action='store_true',
+                        help='also register every partition already in the processed zone')
+    args = parser.parse_args()
+
+    partition_keys = ('dt', 'coin_id') if args.partition_by_coin else ('dt',)
+    glue_client = boto3.client('glue')
+    outcome = bootstrap_catalog(glue_client, args.raw, args.processed, partition_keys, args.database)
+    for name, result in outcome.items():
+        logger.info(f"{name}: {result}")
+
+    if args.backfill:
+        partitions = list_partitions(boto3.client('s3'), args.processed, partition_keys)
+        register_processed_partitions(glue_client, partitions, args.processed, partition_keys, args.database)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
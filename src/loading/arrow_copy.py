@@ -0,0 +1,252 @@
+"""
+Arrow-native load path: Parquet record batches are prepared with Arrow
+compute kernels and serialized straight into PostgreSQL's binary COPY format.
+
+No per-row Python objects are created. Each column is encoded with numpy as
+a whole and scattered into one output buffer.
+"""
+import io
+import logging
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from database.schema import NATURAL_KEY
+from src.loading.copy_loader import log_throughput
+from src.loading.prepare import CRITICAL_COLUMNS, TIMESTAMP_COLUMNS, to_naive_utc
+from src.loading.upsert_loader import build_merge_sql, ensure_staging_table
+
+logger = logging.getLogger(__name__)
+
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + (0).to_bytes(4, 'big') + (0).to_bytes(4, 'big')
+PGCOPY_TRAILER = b'\xff\xff'
+# PostgreSQL timestamps count microseconds from 2000-01-01, not 1970-01-01
+PG_EPOCH_OFFSET_US = 946_684_800 * 1_000_000
+
+_FIXED_WIDTH = {
+    pa.float64(): ('>f8', 8),
+    pa.float32(): ('>f4', 4),
+    pa.int64(): ('>i8', 8),
+    pa.int32(): ('>i4', 4),
+    pa.int16(): ('>i2', 2),
+}
+
+
+# ==============================================================================
+# PREPARATION (Arrow counterpart of prepare.prepare_data_for_insert)
+# ==============================================================================
+
+def to_naive_utc_array(array):
+    """Convert a timestamp or ISO-8601 string array to naive UTC timestamp[us]."""
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        try:
+            array = pc.cast(array, pa.timestamp('us', tz='UTC'))
+        except pa.ArrowInvalid:
+            try:
+                array = pc.cast(array, pa.timestamp('us'))
+            except pa.ArrowInvalid:
+                # Mixed or malformed strings: coerce bad values to NULL like the pandas path
+                logger.warning("Falling back to pandas for unparseable timestamp strings")
+                return pa.array(to_naive_utc(array.to_pandas()), type=pa.timestamp('us'))
+    if not pa.types.is_timestamp(array.type):
+        raise TypeError(f"Cannot convert {array.type} to timestamp")
+    # Values of tz-aware timestamps are already stored as UTC; dropping the
+    # zone only changes metadata.
+    return pc.cast(array, pa.timestamp('us'), safe=False)
+
+
+def prepare_record_batch(batch):
+    """
+    Normalize a RecordBatch for binary COPY.
+
+    Timestamp columns become naive UTC timestamp[us] and metric columns
+    float64, matching the TIMESTAMP / DOUBLE PRECISION target columns.
+    """
+    if batch.num_rows == 0:
+        return batch
+
+    arrays = []
+    for name, array in zip(batch.schema.names, batch.columns):
+        if name in TIMESTAMP_COLUMNS:
+            array = to_naive_utc_array(array)
+        elif name in CRITICAL_COLUMNS and array.type != pa.float64():
+            array = pc.cast(array, pa.float64())
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+
+def drop_null_key_rows(batch):
+    """Arrow counterpart of prepare.drop_null_keys; run after validation."""
+    key_columns = [col for col in NATURAL_KEY if col in batch.schema.names]
+    null_keys = sum(batch.column(col).null_count for col in key_columns)
+    if null_keys:
+        valid = pc.is_valid(batch.column(key_columns[0]))
+        for col in key_columns[1:]:
+            valid = pc.and_(valid, pc.is_valid(batch.column(col)))
+        dropped = batch.num_rows
+        batch = batch.filter(valid)
+        logger.warning(f"Dropping {dropped - batch.num_rows} row(s) with a NULL {'/'.join(key_columns)}")
+    return batch
+
+
+def timestamp_range(batch, column='source_timestamp'):
+    """Return (min, max) datetimes of a timestamp column, or None if all NULL."""
+    bounds = pc.min_max(batch.column(batch.schema.get_field_index(column)))
+    low, high = bounds['min'].as_py(), bounds['max'].as_py()
+    return None if low is None else (low, high)
+
+
+# ==============================================================================
+# BINARY COPY ENCODING
+# ==============================================================================
+
+def _column_payload(array):
+    """
+    Return (field lengths, encoder) for one column.
+
+    Lengths are -1 for NULL. The encoder writes the non-NULL values into
+    `out` at the per-row positions it is given.
+    """
+    valid = ~np.asarray(array.is_null().to_numpy(zero_copy_only=False), dtype=bool)
+
+    if pa.types.is_timestamp(array.type):
+        micros = pc.cast(pc.cast(array, pa.timestamp('us'), safe=False), pa.int64())
+        values = micros.fill_null(0).to_numpy() - PG_EPOCH_OFFSET_US
+        return _fixed_width_payload(values.astype('>i8'), 8, valid)
+
+    if array.type in _FIXED_WIDTH:
+        dtype, width = _FIXED_WIDTH[array.type]
+        values = array.fill_null(0).to_numpy()
+        return _fixed_width_payload(values.astype(dtype), width, valid)
+
+    if pa.types.is_boolean(array.type):
+        values = array.fill_null(False).to_numpy(zero_copy_only=False)
+        return _fixed_width_payload(values.astype(np.uint8), 1, valid)
+
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        return _string_payload(array, valid)
+
+    raise TypeError(f"Binary COPY encoding not supported for Arrow type {array.type}")
+
+
+def _fixed_width_payload(values, width, valid):
+    lengths = np.where(valid, width, -1).astype(np.int64)
+    value_bytes = values.view(np.uint8).reshape(-1, width)
+    span = np.arange(width)
+
+    def encode(out, positions):
+        rows = positions[valid]
+        out[rows[:, None] + span] = value_bytes[valid]
+
+    return lengths, encode
+
+
+def _string_payload(array, valid):
+    offset_type = np.int64 if pa.types.is_large_string(array.type) else np.int32
+    _, offsets_buf, data_buf = array.buffers()
+    offsets = np.frombuffer(offsets_buf, dtype=offset_type)[array.offset:array.offset + len(array) + 1]
+    offsets = offsets.astype(np.int64)
+    data = np.frombuffer(data_buf, dtype=np.uint8) if data_buf is not None else np.empty(0, np.uint8)
+
+    byte_lengths = np.where(valid, np.diff(offsets), 0)
+    lengths = np.where(valid, byte_lengths, -1)
+
+    def encode(out, positions):
+        total = int(byte_lengths.sum())
+        if total == 0:
+            return
+        # Position of every byte within its own value, for all values at once
+        value_starts = np.cumsum(byte_lengths) - byte_lengths
+        within = np.arange(total) - np.repeat(value_starts, byte_lengths)
+        out[np.repeat(positions, byte_lengths) + within] = data[np.repeat(offsets[:-1], byte_lengths) + within]
+
+    return lengths, encode
+
+
+def encode_binary_copy(batch):
+    """Serialize a RecordBatch into a complete PostgreSQL binary COPY payload."""
+    num_rows = batch.num_rows
+    payloads = [_column_payload(array) for array in batch.columns]
+
+    # Row layout: int16 field count, then per field int32 length + value bytes
+    row_sizes = np.full(num_rows, 2, dtype=np.int64)
+    for lengths, _ in payloads:
+        row_sizes += 4 + np.maximum(lengths, 0)
+
+    header_len = len(PGCOPY_HEADER)
+    total = header_len + int(row_sizes.sum()) + len(PGCOPY_TRAILER)
+    out = np.empty(total, dtype=np.uint8)
+    out[:header_len] = np.frombuffer(PGCOPY_HEADER, dtype=np.uint8)
+    out[total - len(PGCOPY_TRAILER):] = np.frombuffer(PGCOPY_TRAILER, dtype=np.uint8)
+
+    positions = header_len + np.cumsum(row_sizes) - row_sizes
+    field_count = np.array([batch.num_columns], dtype='>i2').view(np.uint8)
+    out[positions[:, None] + np.arange(2)] = field_count
+    positions = positions + 2
+
+    for lengths, encode in payloads:
+        out[positions[:, None] + np.arange(4)] = lengths.astype('>i4').view(np.uint8).reshape(-1, 4)
+        positions = positions + 4
+        encode(out, positions)
+        positions = positions + np.maximum(lengths, 0)
+
+    return out.tobytes()
+
+
+# ==============================================================================
+# LOADERS
+# ==============================================================================
+
+def _copy_binary(cursor, table_name, batch):
+    column_names = ','.join([f'"{col}"' for col in batch.schema.names])
+    cursor.copy_expert(
+        f'COPY "{table_name}" ({column_names}) FROM STDIN WITH (FORMAT binary)',
+        io.BytesIO(encode_binary_copy(batch)),
+    )
+
+
+def copy_record_batch(connection, batch, table_name, method='upsert', commit=True):
+    """
+    Load one prepared RecordBatch with binary COPY.
+
+    method='copy' appends directly to the target; method='upsert' copies into
+    the temp staging table and merges on the natural key, like
+    upsert_loader.upsert_dataframe.
+
+    Returns:
+        int: Rows copied (copy) or rows inserted/updated (upsert).
+    """
+    if batch.num_rows == 0:
+        logger.warning("No data to copy.")
+        return 0
+
+    cursor = connection.cursor()
+    try:
+        start = time.perf_counter()
+        if method == 'copy':
+            _copy_binary(cursor, table_name, batch)
+            rows_written = batch.num_rows
+        elif method == 'upsert':
+            missing_keys = [col for col in NATURAL_KEY if col not in batch.schema.names]
+            if missing_keys:
+                raise ValueError(f"Upsert requires natural key column(s) {missing_keys}")
+            staging = ensure_staging_table(cursor, table_name)
+            cursor.execute(f'TRUNCATE "{staging}"')
+            _copy_binary(cursor, staging, batch)
+            cursor.execute(build_merge_sql(table_name, staging, batch.schema.names))
+            rows_written = cursor.rowcount
+        else:
+            raise ValueError(f"Arrow engine supports LOAD_METHOD 'upsert' or 'copy', not '{method}'")
+        if commit:
+            connection.commit()
+
+        log_throughput(f'arrow-{method}', batch.num_rows, time.perf_counter() - start)
+        return rows_written
+    except Exception as e:
+        connection.rollback()
+        logger.error(f"Binary COPY load failed: {e}")
+        raise
+    finally:
+        cursor.close()
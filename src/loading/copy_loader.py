@@ -0,0 +1,83 @@
+import io
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Marker written for missing values; unambiguous because it can never appear
+# in a coin id/symbol and keeps empty strings distinct from NULL.
+COPY_NULL = '\\N'
+COPY_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def build_copy_sql(table_name, columns):
+    """Build the COPY ... FROM STDIN statement used for CSV bulk loads."""
+    column_names = ','.join([f'"{col}"' for col in columns])
+    return (
+        f'COPY "{table_name}" ({column_names}) FROM STDIN '
+        f"WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+
+
+def dataframe_to_csv_buffer(df):
+    """Serialize a DataFrame slice into an in-memory CSV buffer for COPY."""
+    buffer = io.StringIO()
+    df.to_csv(
+        buffer,
+        index=False,
+        header=False,
+        na_rep=COPY_NULL,
+        date_format=COPY_TIMESTAMP_FORMAT,
+    )
+    buffer.seek(0)
+    return buffer
+
+
+def copy_dataframe(connection, df, table_name, commit_every=100000, commit=True):
+    """
+    Stream a prepared DataFrame into Postgres with COPY ... FROM STDIN.
+
+    The frame is serialized in chunks of `commit_every` rows so only one chunk
+    is ever held as CSV text. Each chunk is committed on its own; pass
+    commit_every=0 to load everything in a single transaction, or
+    commit=False to leave the transaction open for the caller.
+
+    Returns:
+        int: Number of rows copied.
+    """
+    if df.empty:
+        logger.warning("No data to copy.")
+        return 0
+
+    chunk_size = commit_every if commit_every and commit_every > 0 else len(df)
+    copy_sql = build_copy_sql(table_name, list(df.columns))
+
+    cursor = connection.cursor()
+    try:
+        rows_copied = 0
+        start = time.perf_counter()
+        for offset in range(0, len(df), chunk_size):
+            chunk = df.iloc[offset:offset + chunk_size]
+            buffer = dataframe_to_csv_buffer(chunk)
+            cursor.copy_expert(copy_sql, buffer)
+            if commit:
+                connection.commit()
+            rows_copied += len(chunk)
+            logger.info(f"Copied {rows_copied}/{len(df)} rows...")
+
+        elapsed = time.perf_counter() - start
+        log_throughput('copy', rows_copied, elapsed)
+        return rows_copied
+    except Exception as e:
+        connection.rollback()
+        logger.error(f"COPY load failed: {e}")
+        raise
+    finally:
+        cursor.close()
+
+
+def log_throughput(method, rows, elapsed):
+    """Log rows/sec for a load method so the different paths can be compared."""
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    logger.info(f"[{method}] loaded {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    return rate
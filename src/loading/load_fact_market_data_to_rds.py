@@ -1,12 +1,36 @@
 import boto3
 import pandas as pd
-import psycopg2
+import pyarrow as pa
+import pyarrow.parquet as pq
 from psycopg2 import extras
 import logging
 import sys
 import os
+import itertools
+import time
 import traceback
-from io import BytesIO
+
+# Make the repo-root packages (src/, database/) importable when run as a script
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from database.connection import close_pool, get_connection, release_connection
+from database.partitions import PartitionManager, apply_retention
+from database.rollups import dirty_hours, ensure_rollup_tables, mark_dirty, refresh_rollups
+from database.schema import ensure_schema
+from src.common.instrumentation import RunMetrics, add, iterate, stage
+from src.loading.arrow_copy import copy_record_batch, drop_null_key_rows, prepare_record_batch, timestamp_range
+from src.loading.copy_loader import copy_dataframe, log_throughput
+from src.loading.data_quality import DataQualityValidator, QuarantineWriter
+from src.loading.parallel_loader import LoadCancelled, parallel_load, parquet_timestamp_bounds
+from src.loading.load_manifest import ensure_manifest_table, filter_new_objects, record_loaded_objects
+from src.common import schema_registry
+from src.loading.parquet_stream import add_partition_columns, iter_parquet_batches, projected_columns
+from src.loading.prepare import drop_null_keys, prepare_data_for_insert, rows_for_insert
+from src.loading.s3_cache import default_cache
+from src.loading.s3_fetch import fetch_objects, list_objects
+from src.loading.upsert_loader import upsert_dataframe
 
 # ==============================================================================
 # LOGGING CONFIGURATION
@@ -23,19 +47,61 @@ logger = logging.getLogger(__name__)
 # ==============================================================================
 S3_BUCKET = os.getenv('S3_BUCKET', 'julian-crypto-s3-bucket')
 S3_PREFIX = os.getenv('S3_PREFIX', 'processed/fact_market_data/')
+# Optional endpoint for S3-compatible stand-ins (MinIO, moto server, LocalStack)
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
 
-DB_HOST = os.getenv('DB_HOST', 'crypto-etl-db.c87yis8u2wwc.us-east-1.rds.amazonaws.com')
-DB_PORT = int(os.getenv('DB_PORT', '5432'))
-DB_NAME = os.getenv('DB_NAME', 'postgres')
-DB_USER = os.getenv('DB_USER', 'postgres')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
+# Concurrent Parquet downloads and the cap on downloaded-but-unprocessed bytes
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', '8'))
+FETCH_MAX_INFLIGHT_MB = int(os.getenv('FETCH_MAX_INFLIGHT_MB', '256'))
+# S3_CACHE_DIR / S3_CACHE_MAX_MB enable the local read-through cache of
+# Parquet objects (src/loading/s3_cache.py), so re-runs skip the S3 GETs
 
-if not DB_PASSWORD:
-    logger.error("DB_PASSWORD environment variable is required but not set")
-    sys.exit(1)
+# Database settings (DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, DB_POOL_MAX)
+# are read by database/connection.py
 
 TABLE_NAME = "fact_market_data"
 BATCH_SIZE = 1000
+# Columns read from Parquet (the schema registry's); any other column in the
+# files is never fetched, and registry columns a file predates load as NULL
+LOAD_COLUMNS = schema_registry.column_names()
+
+# 'upsert' merges on (coin_id, source_timestamp) via a COPY-filled staging table,
+# 'copy' appends with COPY ... FROM STDIN, 'execute_batch' is the fallback
+LOAD_METHOD = os.getenv('LOAD_METHOD', 'upsert')
+# 'pandas' prepares DataFrames; 'arrow' keeps RecordBatches end to end and loads
+# them with binary COPY (supports LOAD_METHOD 'upsert' or 'copy')
+LOAD_ENGINE = os.getenv('LOAD_ENGINE', 'pandas')
+# Rows per COPY/upsert transaction (0 = single transaction for the whole load)
+COPY_COMMIT_ROWS = int(os.getenv('COPY_COMMIT_ROWS', '100000'))
+
+# 'stream' loads record batches one at a time; 'full' reads the whole prefix first
+READ_MODE = os.getenv('READ_MODE', 'stream')
+# Upper bound on rows held in memory per streamed batch
+STREAM_BATCH_ROWS = int(os.getenv('STREAM_BATCH_ROWS', '100000'))
+
+# 'incremental' skips S3 objects already recorded in the load manifest; 'full' reloads everything
+LOAD_MODE = os.getenv('LOAD_MODE', 'incremental')
+
+# Concurrent writer workers for READ_MODE=stream, one S3 file per shard
+# (1 = sequential; each worker holds one pooled connection on top of the
+# orchestrator's, so keep LOAD_WORKERS < DB_POOL_MAX)
+LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', '1'))
+
+# Range partitioning of the target on source_timestamp: 'day', 'month' or 'none'
+PARTITION_GRANULARITY = os.getenv('PARTITION_GRANULARITY', 'month')
+# Partitions to create beyond the newest period present in each batch
+PARTITION_PREMAKE = int(os.getenv('PARTITION_PREMAKE', '2'))
+# Number of most recent periods to keep (0 = keep everything) and what to do with older ones
+RETENTION_PERIODS = int(os.getenv('RETENTION_PERIODS', '0'))
+RETENTION_ACTION = os.getenv('RETENTION_ACTION', 'detach')
+
+# Row-level data-quality rules (data_quality.default_rules); rejected rows are
+# written to s3://S3_BUCKET/QUARANTINE_PREFIX/ instead of failing the load
+DQ_ENABLED = os.getenv('DQ_ENABLED', 'true').lower() == 'true'
+
+# Maintain the 1m/1h/1d OHLCV rollups (database/rollups.py): each batch queues the
+# coin-hours it touched and the affected buckets are recomputed after the load
+ROLLUPS_ENABLED = os.getenv('ROLLUPS_ENABLED', 'true').lower() == 'true'
 
 # ==============================================================================
 # CORE FUNCTIONS
@@ -44,7 +110,7 @@ BATCH_SIZE = 1000
 def create_s3_client():
     """Create and return an AWS S3 client."""
     try:
-        s3_client = boto3.client('s3')
+        s3_client = boto3.client('s3', endpoint_url=S3_ENDPOINT_URL)
         logger.info("S3 client created successfully")
         return s3_client
     except Exception as e:
@@ -52,76 +118,56 @@ def create_s3_client():
         raise
 
 def create_db_connection():
-    """Create and return a connection to the PostgreSQL RDS instance."""
+    """Borrow a connection to the PostgreSQL RDS instance from the shared pool."""
     try:
-        logger.info(f"Attempting to connect to database: {DB_NAME} at {DB_HOST}")
-        connection = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            connect_timeout=10
-        )
-        logger.info(f"Successfully connected to database: {DB_NAME}")
+        connection = get_connection()
+        logger.info("Database connection acquired from pool")
         return connection
     except Exception as e:
         logger.error(f"Failed to connect to database: {e}")
         raise
 
-def read_all_parquet_files(s3_client, bucket, prefix):
-    """List and read all Parquet files from S3 into a single DataFrame."""
+def list_parquet_objects(s3_client, bucket, prefix):
+    """List every Parquet object (Key/Size/ETag dicts) under an S3 prefix, across all pages."""
+    objects = list(list_objects(s3_client, bucket, prefix, suffix='.parquet'))
+    if not objects:
+        logger.warning(f"No files found in s3://{bucket}/{prefix}")
+    return objects
+
+def read_all_parquet_files(s3_client, bucket, prefix, objects=None, as_arrow=False, cache=None):
+    """
+    List and read all Parquet files (or the given objects) from S3 into a
+    single DataFrame, or a single pyarrow Table when as_arrow=True.
+    Objects are read through `cache` (an S3ObjectCache) when given.
+    """
     try:
-        response = s3_client.list_objects_v2(Bucket=bucket, Prefix=prefix)
-        if 'Contents' not in response:
-            logger.warning(f"No files found in s3://{bucket}/{prefix}")
-            return pd.DataFrame()
+        files = objects if objects is not None else list_parquet_objects(s3_client, bucket, prefix)
+        if not files:
+            return pa.table({}) if as_arrow else pd.DataFrame()
+        logger.info(f"Reading {len(files)} Parquet file(s) with {FETCH_WORKERS} worker(s)...")
         
-        files = [obj['Key'] for obj in response['Contents'] if obj['Key'].endswith('.parquet')]
-        logger.info(f"Reading {len(files)} Parquet file(s)...")
-        
-        dataframes = []
-        for file in files:
-            resp = s3_client.get_object(Bucket=bucket, Key=file)
-            df = pd.read_parquet(BytesIO(resp['Body'].read()))
-            dataframes.append(df)
-            
-        return pd.concat(dataframes, ignore_index=True)
+        tables = []
+        for obj, data in fetch_objects(
+            s3_client, bucket, files,
+            max_workers=FETCH_WORKERS,
+            max_inflight_bytes=FETCH_MAX_INFLIGHT_MB * 1024 * 1024,
+            cache=cache,
+        ):
+            parquet_file = pq.ParquetFile(pa.BufferReader(data))
+            columns = projected_columns(parquet_file.schema_arrow, LOAD_COLUMNS)
+            # Partition columns (coin_id with PARTITION_BY_COIN) come from the key=value path
+            table = add_partition_columns(parquet_file.read(columns=columns), obj['Key'], LOAD_COLUMNS)
+            tables.append(table if as_arrow else table.to_pandas())
+
+        if as_arrow:
+            return pa.concat_tables(tables, promote_options='default')
+        return pd.concat(tables, ignore_index=True)
     except Exception as e:
         logger.error(f"Error reading Parquet files: {e}")
         raise
 
-def prepare_data_for_insert(df):
-    """Clean data and fix 'NaT' timestamp errors for PostgreSQL compatibility."""
-    if df.empty:
-        return df
-    
-    logger.info(f"SCHEMA CHECK - Columns found in S3: {df.columns.tolist()}")
-    df_clean = df.copy()
-    
-    # 1. Convert Timestamps
-    timestamp_cols = ['source_timestamp', 'load_date']
-    for col in timestamp_cols:
-        if col in df_clean.columns:
-            df_clean[col] = pd.to_datetime(df_clean[col], errors='coerce')
-            if df_clean[col].dt.tz is None:
-                df_clean[col] = df_clean[col].dt.tz_localize('UTC')
-
-    # 2. VALIDATION: Ensure critical metrics aren't all NULL
-    critical_cols = ['price_usd', 'market_cap_usd', 'volume_24h_usd']
-    missing_data = df_clean[critical_cols].isnull().all()
-    if missing_data.any():
-        logger.error(f"DATA INTEGRITY ERROR: Columns {missing_data[missing_data].index.tolist()} are entirely NULL.")
-        return pd.DataFrame()
-
-    # 3. FIX: Convert NaT to None (Crucial for psycopg2 to insert NULL instead of invalid string "NaT")
-    df_clean = df_clean.replace({pd.NaT: None})
-    
-    logger.info("Data preparation complete (NaT values converted to None)")
-    return df_clean
-
-def insert_data_in_batches(connection, df, table_name, batch_size):
-    """Insert data into RDS using efficient batch execution."""
+def insert_data_in_batches(connection, df, table_name, batch_size, commit=True):
+    """Insert data into RDS using efficient batch execution (commit=False leaves the transaction open)."""
     if df.empty:
         logger.warning("No data to insert.")
         return 0
@@ -134,15 +180,18 @@ def insert_data_in_batches(connection, df, table_name, batch_size):
         insert_query = f'INSERT INTO "{table_name}" ({column_names}) VALUES ({placeholders})'
         
         rows_inserted = 0
+        start = time.perf_counter()
         for batch_num in range(0, len(df), batch_size):
             batch = df.iloc[batch_num:batch_num + batch_size]
-            batch_tuples = [tuple(row) for row in batch.values]
+            batch_tuples = list(rows_for_insert(batch))
             
             extras.execute_batch(cursor, insert_query, batch_tuples, page_size=batch_size)
-            connection.commit()
+            if commit:
+                connection.commit()
             rows_inserted += len(batch_tuples)
             logger.info(f"Inserted {rows_inserted}/{len(df)} rows...")
-            
+
+        log_throughput('execute_batch', rows_inserted, time.perf_counter() - start)
         return rows_inserted
     except Exception as e:
         connection.rollback()
@@ -151,48 +200,302 @@ def insert_data_in_batches(connection, df, table_name, batch_size):
     finally:
         cursor.close()
 
+def load_dataframe(connection, df, table_name, method=LOAD_METHOD, commit=True):
+    """Load a prepared DataFrame using the configured load method."""
+    if method == 'upsert':
+        return upsert_dataframe(connection, df, table_name, commit_every=COPY_COMMIT_ROWS, commit=commit)
+    if method == 'copy':
+        return copy_dataframe(connection, df, table_name, commit_every=COPY_COMMIT_ROWS, commit=commit)
+    if method == 'execute_batch':
+        return insert_data_in_batches(connection, df, table_name, BATCH_SIZE, commit=commit)
+    raise ValueError(f"Unknown LOAD_METHOD '{method}' (expected 'upsert', 'copy' or 'execute_batch')")
+
+def prepare_and_load_batch(connection, batch, table_name, partitions=None, engine=LOAD_ENGINE, commit=True,
+                           validator=None):
+    """
+    Prepare one batch (DataFrame or RecordBatch, per `engine`), drop the rows
+    the validator rejects, provision its partitions and load it. With
+    ROLLUPS_ENABLED the batch's coin-hours are queued for refresh_rollups()
+    in the same transaction.
+
+    Returns:
+        int: Rows loaded.
+    """
+    if engine == 'arrow':
+        with stage('prepare', rows=batch.num_rows):
+            batch = prepare_record_batch(batch)
+        if validator is not None:
+            with stage('validate', rows=batch.num_rows):
+                batch = validator.validate(batch)
+        batch = drop_null_key_rows(batch)
+        if batch.num_rows == 0:
+            return 0
+        with stage('load', rows=batch.num_rows, bytes=batch.nbytes):
+            if partitions and 'source_timestamp' in batch.schema.names:
+                bounds = timestamp_range(batch)
+                if bounds:
+                    partitions.ensure_range(connection, *bounds, commit=commit)
+            if ROLLUPS_ENABLED:
+                mark_dirty(connection, dirty_hours(batch), table_name, commit=commit)
+            return copy_record_batch(connection, batch, table_name, method=LOAD_METHOD, commit=commit)
+
+    with stage('prepare', rows=len(batch)):
+        df = prepare_data_for_insert(batch)
+    if validator is not None:
+        with stage('validate', rows=len(df)):
+            df = validator.validate(df)
+    df = drop_null_keys(df)
+    if df.empty:
+        return 0
+    with stage('load', rows=len(df)):
+        if partitions:
+            partitions.ensure_for_timestamps(connection, df['source_timestamp'], commit=commit)
+        if ROLLUPS_ENABLED:
+            mark_dirty(connection, dirty_hours(df), table_name, commit=commit)
+        return load_dataframe(connection, df, table_name, commit=commit)
+
 # ==============================================================================
 # MAIN ORCHESTRATOR
 # ==============================================================================
+def select_objects_to_load(s3_client, connection, bucket, prefix, incremental):
+    """List the prefix and, in incremental mode, keep only objects not yet in the manifest."""
+    with stage('list'):
+        objects = list_parquet_objects(s3_client, bucket, prefix)
+        if incremental:
+            ensure_manifest_table(connection)
+            objects = filter_new_objects(connection, objects)
+    return objects
+
+def load_object_batches(connection, obj, batches, table_name, incremental,
+                        partitions=None, progress=None, stop_event=None, validator=None):
+    """
+    Prepare and load every batch of one S3 object.
+
+    In incremental mode all batches and the object's manifest entry commit in
+    a single transaction. `stop_event` (parallel mode) aborts between
+    batches; the caller's connection release rolls back the open transaction.
+
+    Returns:
+        int: Rows loaded from the object.
+    """
+    object_rows = 0
+    try:
+        for batch in batches:
+            if stop_event is not None and stop_event.is_set():
+                raise LoadCancelled(obj['Key'])
+            loaded = prepare_and_load_batch(connection, batch, table_name, partitions, commit=not incremental,
+                                            validator=validator)
+            object_rows += loaded
+            if progress is not None:
+                progress.add_rows(loaded)
+
+        add('read', bytes=obj.get('Size', 0))
+        if incremental:
+            record_loaded_objects(connection, [(obj, object_rows)], table_name)
+            connection.commit()
+    except Exception:
+        # Partitions created inside the object's transaction are gone with it
+        if partitions is not None:
+            partitions.discard_pending()
+        raise
+    if partitions is not None:
+        partitions.mark_committed()
+    return object_rows
+
+def stream_load(s3_client, connection, bucket, prefix, table_name,
+                batch_rows=STREAM_BATCH_ROWS, incremental=LOAD_MODE == 'incremental',
+                partitions=None, workers=LOAD_WORKERS, validator=None, cache=None):
+    """
+    Read, prepare and load Parquet data one record batch at a time.
+
+    Each batch is loaded before the next one is fetched, so peak memory is
+    bounded by `batch_rows` instead of by the size of the prefix. In
+    incremental mode each object is loaded in one transaction together with
+    its manifest entry, so a failed run resumes at the first unfinished object.
+    When a PartitionManager is given, partitions for each batch's time range
+    are created before the batch is written.
+
+    With workers > 1, files are loaded by parallel_load on that many pooled
+    connections (see load_in_parallel). Objects are read through `cache` (an
+    S3ObjectCache) when given.
+    """
+    objects = select_objects_to_load(s3_client, connection, bucket, prefix, incremental)
+    if workers > 1:
+        return load_in_parallel(s3_client, connection, bucket, objects, table_name,
+                                batch_rows, incremental, partitions, workers, validator, cache)
+
+    logger.info(f"Streaming {len(objects)} Parquet file(s) in batches of {batch_rows} rows...")
+    # 'read' is the time spent waiting on S3 downloads and Parquet decoding
+    batches = iterate('read', iter_parquet_batches(
+        s3_client, bucket, objects, batch_rows,
+        max_workers=FETCH_WORKERS,
+        max_inflight_bytes=FETCH_MAX_INFLIGHT_MB * 1024 * 1024,
+        as_arrow=LOAD_ENGINE == 'arrow',
+        cache=cache,
+        columns=LOAD_COLUMNS,
+    ), count_rows=lambda item: len(item[1]))
+    rows_inserted = 0
+    loaded_keys = set()
+    for _, group in itertools.groupby(batches, key=lambda item: item[0]['Key']):
+        obj, first_batch = next(group)
+        object_batches = itertools.chain([first_batch], (batch for _, batch in group))
+        rows_inserted += load_object_batches(connection, obj, object_batches, table_name, incremental, partitions,
+                                             validator=validator)
+        loaded_keys.add(obj['Key'])
+        logger.info(f"Loaded {obj['Key']} ({rows_inserted} rows total)")
+
+    # Objects without any rows yield no batches, so groupby never sees them;
+    # record them too or every incremental run would list and open them again
+    empty = [(obj, 0) for obj in objects if obj['Key'] not in loaded_keys]
+    if incremental and empty:
+        record_loaded_objects(connection, empty, table_name)
+        connection.commit()
+    return rows_inserted
+
+def load_in_parallel(s3_client, connection, bucket, objects, table_name,
+                     batch_rows, incremental, partitions, workers, validator=None, cache=None):
+    """
+    Load files on `workers` concurrent writers, each with its own connection
+    and transaction(s).
+
+    Partitions are provisioned once up front from Parquet footer statistics,
+    so workers never run partition DDL while holding open transactions
+    (which could deadlock against each other on the parent table's locks).
+    """
+    if partitions and objects:
+        bounds = parquet_timestamp_bounds(s3_client, bucket, objects, max_workers=FETCH_WORKERS, cache=cache)
+        if bounds:
+            partitions.ensure_range(connection, *bounds)
+        else:
+            logger.warning("No source_timestamp statistics in Parquet footers; rows may land in the default partition")
+
+    def load_object(worker_connection, obj, progress, stop_event):
+        batches = (
+            batch for _, batch in iterate('read', iter_parquet_batches(
+                s3_client, bucket, [obj], batch_rows, as_arrow=LOAD_ENGINE == 'arrow', cache=cache,
+                columns=LOAD_COLUMNS,
+            ), count_rows=lambda item: len(item[1]))
+        )
+        return load_object_batches(worker_connection, obj, batches, table_name, incremental,
+                                   progress=progress, stop_event=stop_event, validator=validator)
+
+    return parallel_load(objects, load_object, workers)
+
 def main():
     logger.info("=" * 60)
     logger.info("Starting ETL process: Load fact_market_data to RDS")
     logger.info("=" * 60)
     
     db_connection = None
-    try:
-        # STEP 1: Extract
-        s3_client = create_s3_client()
-        df = read_all_parquet_files(s3_client, S3_BUCKET, S3_PREFIX)
-        
-        if df.empty:
+    validator = None
+    # Stage timings, rows/bytes per second and peak RSS, reported as one JSON line at the end
+    run = RunMetrics('load', dimensions={'engine': LOAD_ENGINE, 'method': LOAD_METHOD, 'read_mode': READ_MODE})
+    report = {'status': 'error', 'rows': 0}
+    with run:
+        try:
+            with stage('setup'):
+                s3_client = create_s3_client()
+
+                db_connection = create_db_connection()
+                partitioned = PARTITION_GRANULARITY != 'none'
+                ensure_schema(db_connection, table_name=TABLE_NAME,
+                              partition_granularity=PARTITION_GRANULARITY if partitioned else None)
+                partitions = (
+                    PartitionManager(TABLE_NAME, PARTITION_GRANULARITY, premake=PARTITION_PREMAKE)
+                    if partitioned else None
+                )
+                if ROLLUPS_ENABLED:
+                    ensure_rollup_tables(db_connection, table_name=TABLE_NAME)
+                cache = default_cache()
+            incremental = LOAD_MODE == 'incremental'
+            validator = (
+                DataQualityValidator(quarantine=QuarantineWriter(s3_client, S3_BUCKET))
+                if DQ_ENABLED else None
+            )
+
+            if READ_MODE == 'stream':
+                # STEPS 1-3 interleaved: extract, clean and load one batch at a time
+                rows_inserted = stream_load(s3_client, db_connection, S3_BUCKET, S3_PREFIX, TABLE_NAME,
+                                            incremental=incremental, partitions=partitions, validator=validator,
+                                            cache=cache)
+            else:
+                # STEP 1: Extract
+                objects = select_objects_to_load(s3_client, db_connection, S3_BUCKET, S3_PREFIX, incremental)
+                with stage('read', bytes=sum(obj.get('Size', 0) for obj in objects)) as read:
+                    data = read_all_parquet_files(s3_client, S3_BUCKET, S3_PREFIX, objects=objects,
+                                                  as_arrow=LOAD_ENGINE == 'arrow', cache=cache)
+                    read.add(rows=len(data))
+
+                if len(data) == 0:
+                    # Remember empty objects, so they are not read again on the next run
+                    if incremental and objects:
+                        record_loaded_objects(db_connection, [(obj, 0) for obj in objects], TABLE_NAME)
+                        db_connection.commit()
+                    report['status'] = 'ok'
+                    return 0
+
+                # STEPS 2-3: Transform, Clean & Load (rows and manifest entries commit together in incremental mode)
+                # The arrow engine keeps the Table and loads it in COPY_COMMIT_ROWS-sized record batches
+                batches = (
+                    data.to_batches(max_chunksize=COPY_COMMIT_ROWS or None)
+                    if LOAD_ENGINE == 'arrow' else [data]
+                )
+                rows_inserted = 0
+                for batch in batches:
+                    rows_inserted += prepare_and_load_batch(db_connection, batch, TABLE_NAME, partitions,
+                                                            commit=not incremental, validator=validator)
+                if incremental:
+                    record_loaded_objects(db_connection, [(obj, None) for obj in objects], TABLE_NAME)
+                    db_connection.commit()
+
+            if cache is not None:
+                cache.summary()
+                report.update(cache.stats())
+
+            # Write out the remaining quarantined rows and report per-rule cost
+            if validator is not None:
+                with stage('quarantine'):
+                    validator.close()
+                validator.summary()
+                report['rows_rejected'] = validator.rows_rejected
+
+            # Recompute the rollup buckets this load touched (and any left queued by a failed run)
+            if ROLLUPS_ENABLED:
+                with stage('rollups'):
+                    refresh_rollups(db_connection, table_name=TABLE_NAME)
+
+            # STEP 4: Retention (detach/drop whole partitions older than the window)
+            if partitioned and RETENTION_PERIODS > 0:
+                with stage('retention'):
+                    apply_retention(db_connection, TABLE_NAME, PARTITION_GRANULARITY,
+                                    RETENTION_PERIODS, action=RETENTION_ACTION)
+            
+            logger.info("=" * 60)
+            logger.info(f"ETL SUCCESS: {rows_inserted} rows loaded into {TABLE_NAME}")
+            logger.info("=" * 60)
+            report.update(status='ok', rows=rows_inserted)
             return 0
-        
-        # STEP 2: Transform & Clean
-        df = prepare_data_for_insert(df)
-        if df.empty:
-            logger.error("Stopping: Data failed integrity check.")
+            
+        except Exception as e:
+            logger.error("=" * 60)
+            logger.error(f"ETL FAILED: {str(e)}")
+            logger.error(traceback.format_exc())
+            logger.error("=" * 60)
+            report['error'] = str(e)
             return 1
-        
-        # STEP 3: Load
-        db_connection = create_db_connection()
-        rows_inserted = insert_data_in_batches(db_connection, df, TABLE_NAME, BATCH_SIZE)
-        
-        logger.info("=" * 60)
-        logger.info(f"ETL SUCCESS: {rows_inserted} rows loaded into {TABLE_NAME}")
-        logger.info("=" * 60)
-        return 0
-        
-    except Exception as e:
-        logger.error("=" * 60)
-        logger.error(f"ETL FAILED: {str(e)}")
-        logger.error(traceback.format_exc())
-        logger.error("=" * 60)
-        return 1
-    finally:
-        if db_connection:
-            db_connection.close()
+        finally:
+            if validator is not None:
+                # After a failure, rows rejected from batches committed before it still reach the
+                # quarantine output (a no-op after the close on the success path)
+                try:
+                    validator.close()
+                except Exception as e:
+                    logger.error(f"Writing quarantined rows failed: {e}")
+            if db_connection:
+                release_connection(db_connection)
+            close_pool()
             logger.info("Resources cleaned up.")
+            run.report(**report)
 
 if __name__ == "__main__":
     sys.exit(main())
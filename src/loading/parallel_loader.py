@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from database.connection import pooled_connection
+from src.loading.parquet_stream import S3ObjectFile
+
+logger = logging.getLogger(__name__)
+
+
+class LoadCancelled(Exception):
+    """Raised inside a worker when another shard failed and the run is stopping."""
+
+
+class LoadProgress:
+    """Thread-safe progress counters shared by all writer workers."""
+
+    def __init__(self, total_objects, log_interval=10.0):
+        self.total_objects = total_objects
+        self.log_interval = log_interval
+        self.objects_done = 0
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._last_log = self.started
+        self._lock = threading.Lock()
+
+    def add_rows(self, rows):
+        with self._lock:
+            self.rows += rows
+            self._maybe_log()
+
+    def object_done(self):
+        with self._lock:
+            self.objects_done += 1
+            self._maybe_log(force=self.objects_done == self.total_objects)
+
+    def _maybe_log(self, force=False):
+        now = time.perf_counter()
+        if force or now - self._last_log >= self.log_interval:
+            elapsed = now - self.started
+            rate = self.rows / elapsed if elapsed > 0 else 0
+            logger.info(
+                f"Progress: {self.objects_done}/{self.total_objects} file(s), "
+                f"{self.rows} rows, {rate:,.0f} rows/sec overall"
+            )
+            self._last_log = now
+
+
+def parquet_timestamp_bounds(s3_client, bucket, objects, column='source_timestamp', max_workers=8, cache=None):
+    """
+    Return the overall (min, max) of a timestamp column using only Parquet
+    footer statistics (one small ranged read per object, no data pages;
+    objects already in `cache` are read locally).
+
+    Returns None if no object carries statistics for the column.
+    """
+    def object_bounds(obj):
+        path = cache.lookup(bucket, obj) if cache is not None else None
+        source = pa.memory_map(path) if path else S3ObjectFile(s3_client, bucket, obj['Key'], size=obj.get('Size'))
+        metadata = pq.ParquetFile(source).metadata
+        index = metadata.schema.names.index(column) if column in metadata.schema.names else None
+        if index is None:
+            return None
+        bounds = []
+        for rg in range(metadata.num_row_groups):
+            stats = metadata.row_group(rg).column(index).statistics
+            if stats is not None and stats.has_min_max:
+                bounds.append((stats.min, stats.max))
+        if not bounds:
+            return None
+        return min(b[0] for b in bounds), max(b[1] for b in bounds)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='parquet-footer') as executor:
+        results = [b for b in executor.map(object_bounds, objects) if b is not None]
+    if not results:
+        return None
+    low, high = min(r[0] for r in results), max(r[1] for r in results)
+    # Parquet stores UTC instants; partition bounds are naive UTC
+    if getattr(low, 'tzinfo', None) is not None:
+        low, high = low.replace(tzinfo=None), high.replace(tzinfo=None)
+    return low, high
+
+
+def parallel_load(objects, load_object, workers):
+    """
+    Load S3 objects concurrently, one shard (object) per task.
+
+    Each task borrows its own connection from the shared pool and runs
+    `load_object(connection, obj, progress, stop_event)`, which must manage
+    its own transaction(s) and return the number of rows loaded. When any
+    shard fails, the stop event is set, shards not yet started are
+    cancelled, running shards abort at their next batch boundary (rolling
+    back their open transaction). Every failed shard is logged and the error
+    of the first one, in submission order, is re-raised.
+
+    Returns:
+        int: Total rows loaded.
+    """
+    if not objects:
+        return 0
+
+    progress = LoadProgress(len(objects))
+    stop_event = threading.Event()
+
+    def run_shard(obj):
+        if stop_event.is_set():
+            raise LoadCancelled(obj['Key'])
+        with pooled_connection() as connection:
+            rows = load_object(connection, obj, progress, stop_event)
+        progress.object_done()
+        return rows
+
+    logger.info(f"Parallel load: {len(objects)} file(s) across {workers} writer(s)")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='writer') as executor:
+        futures = {executor.submit(run_shard, obj): obj for obj in objects}
+        done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+
+        if any(future.exception() is not None for future in done):
+            stop_event.set()
+            for future in not_done:
+                future.cancel()
+            wait(not_done)
+            # In submission order, including shards that failed while stopping
+            failures = [
+                future for future in futures
+                if not future.cancelled() and future.exception() is not None
+                and not isinstance(future.exception(), LoadCancelled)
+            ]
+            for future in failures:
+                logger.error(f"Shard {futures[future]['Key']} failed: {future.exception()}")
+            logger.error(f"{len(failures)} shard(s) failed; stopped remaining shards")
+            raise failures[0].exception()
+
+    logger.info(f"Parallel load complete: {progress.rows} rows from {progress.objects_done} file(s)")
+    return progress.rows
@@ -0,0 +1,180 @@
+import io
+import logging
+from urllib.parse import unquote
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.loading.s3_fetch import fetch_objects
+
+logger = logging.getLogger(__name__)
+
+
+class S3ObjectFile(io.RawIOBase):
+    """
+    Seekable, read-only file object over an S3 object using ranged GETs.
+
+    pyarrow only fetches the footer and the column chunks of the row group it
+    is decoding, so wrapping an object this way keeps the whole file out of
+    memory.
+    """
+
+    def __init__(self, s3_client, bucket, key, size=None):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        if size is None:
+            size = s3_client.head_object(Bucket=bucket, Key=key)['ContentLength']
+        self.size = size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self.position
+
+    def read(self, size=-1):
+        if self.position >= self.size:
+            return b''
+        if size is None or size < 0:
+            end = self.size - 1
+        else:
+            end = min(self.position + size, self.size) - 1
+        resp = self.s3_client.get_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Range=f'bytes={self.position}-{end}',
+        )
+        data = resp['Body'].read()
+        self.position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def projected_columns(schema, columns):
+    """
+    The names in `columns` that a Parquet file's schema has (all when
+    `columns` is None). Files written before a column was added to the
+    schema registry simply lack it, and it loads as NULL.
+    """
+    if columns is None:
+        return None
+    return [name for name in columns if name in schema.names]
+
+
+def hive_partition_values(key):
+    """
+    Partition values encoded in an object key:
+    '.../dt=2026-01-01/coin_id=bitcoin/part-0.parquet' -> {'dt': '2026-01-01', 'coin_id': 'bitcoin'}.
+
+    Spark escapes special characters in values as %XX and writes NULL as
+    __HIVE_DEFAULT_PARTITION__.
+    """
+    values = {}
+    for segment in key.split('/')[:-1]:
+        name, sep, value = segment.partition('=')
+        if sep and name:
+            values[name] = None if value == '__HIVE_DEFAULT_PARTITION__' else unquote(value)
+    return values
+
+
+def add_partition_columns(data, key, columns):
+    """
+    Append the requested `columns` that a RecordBatch or Table lacks but its
+    object key carries as partition directories, as string columns.
+
+    Spark's partitionBy stores partition columns only in the path (e.g.
+    coin_id with PARTITION_BY_COIN), so they would otherwise load as NULL or
+    fail the natural-key check of the upsert.
+    """
+    if columns is None:
+        return data
+    missing = [name for name in columns if name not in data.schema.names]
+    if not missing:
+        return data
+    partition_values = hive_partition_values(key)
+    for name in missing:
+        if name in partition_values:
+            data = data.append_column(name, pa.array([partition_values[name]] * data.num_rows, pa.string()))
+    return data
+
+
+def iter_parquet_sources(s3_client, bucket, objects, max_workers=1, max_inflight_bytes=None, cache=None):
+    """
+    Yield (object summary, file-like source) pairs for pyarrow to decode.
+
+    With a single worker each object is read lazily through ranged GETs, or
+    from a memory map of the whole object when an S3ObjectCache is given.
+    With more workers, whole objects are prefetched concurrently by
+    fetch_objects, capped at `max_inflight_bytes` downloaded-but-unconsumed
+    bytes.
+    """
+    if max_workers <= 1:
+        for obj in objects:
+            if cache is not None:
+                yield obj, cache.open(s3_client, bucket, obj)
+            else:
+                yield obj, S3ObjectFile(s3_client, bucket, obj['Key'], size=obj.get('Size'))
+        return
+
+    kwargs = {'max_workers': max_workers, 'cache': cache}
+    if max_inflight_bytes:
+        kwargs['max_inflight_bytes'] = max_inflight_bytes
+    for obj, data in fetch_objects(s3_client, bucket, objects, **kwargs):
+        yield obj, pa.BufferReader(data)
+
+
+def iter_parquet_batches(s3_client, bucket, objects, batch_size, max_workers=1, max_inflight_bytes=None,
+                         as_arrow=False, cache=None, columns=None):
+    """
+    Yield (object summary, DataFrame) pairs of at most `batch_size` rows from
+    a list of S3 Parquet objects.
+
+    Objects are decoded row group by row group, so peak memory is bounded by
+    one row group plus one batch (plus the prefetch budget when
+    `max_workers` > 1) rather than by the size of the prefix. With `columns`,
+    only those column chunks are fetched and decoded.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket: Source bucket
+        objects: Iterable of {'Key': ..., 'Size': ...} dicts (list_objects_v2 shape)
+        batch_size: Maximum rows per yielded DataFrame
+        max_workers: Concurrent downloads (1 = lazy ranged reads)
+        max_inflight_bytes: Cap on prefetched bytes when max_workers > 1
+        as_arrow: Yield pyarrow RecordBatches instead of DataFrames
+        cache: Optional S3ObjectCache to read objects through
+        columns: Columns to read (those missing from a file are taken from its
+            key=value partition directories, or skipped; default: all)
+    """
+    sources = iter_parquet_sources(s3_client, bucket, objects, max_workers, max_inflight_bytes, cache)
+    for obj, source in sources:
+        # pre_buffer coalesces each row group's column chunks into few ranged GETs
+        parquet_file = pq.ParquetFile(source, pre_buffer=True)
+        logger.info(
+            f"Streaming s3://{bucket}/{obj['Key']} "
+            f"({parquet_file.metadata.num_rows} rows, {parquet_file.num_row_groups} row group(s))"
+        )
+        selected = projected_columns(parquet_file.schema_arrow, columns)
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=selected):
+            batch = add_partition_columns(batch, obj['Key'], columns)
+            yield obj, batch if as_arrow else batch.to_pandas()
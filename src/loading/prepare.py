@@ -0,0 +1,87 @@
+import logging
+
+import pandas as pd
+
+from database.schema import NATURAL_KEY
+from src.common import schema_registry
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_COLUMNS = [col.name for col in schema_registry.columns() if col.kind == 'timestamp']
+# Metric columns (DOUBLE PRECISION)
+CRITICAL_COLUMNS = [col.name for col in schema_registry.columns() if col.kind == 'double']
+
+
+def to_naive_utc(series):
+    """
+    Return a datetime64 column holding naive UTC timestamps.
+
+    Columns that are already naive datetime64 (what Parquet from the Glue job
+    decodes to) are returned untouched; only strings/objects are parsed (as
+    ISO 8601, with or without an offset) and only tz-aware columns are converted.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series, errors='coerce', utc=True, format='ISO8601')
+    if series.dt.tz is not None:
+        series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+    return series
+
+
+def prepare_data_for_insert(df):
+    """
+    Normalize timestamp columns and check critical metrics, column by column.
+
+    Timestamp columns are converted in place to naive UTC datetime64, so the
+    frame keeps its typed columns and is never copied as a whole. Missing
+    values stay as NaN/NaT; they are turned into NULLs when rows are
+    serialized (COPY's NULL marker, or rows_for_insert for execute_batch),
+    not by converting the frame to Python objects.
+
+    Row-level checks (NULLs, ranges, duplicates, freshness) are done
+    afterwards by data_quality.DataQualityValidator, followed by
+    drop_null_keys.
+    """
+    if df.empty:
+        return df
+
+    logger.info(f"SCHEMA CHECK - Columns found in S3: {df.columns.tolist()}")
+
+    # Convert Timestamps (only the columns that need it)
+    for col in TIMESTAMP_COLUMNS:
+        if col in df.columns:
+            df[col] = to_naive_utc(df[col])
+
+    logger.info("Data preparation complete (timestamps normalized to naive UTC)")
+    return df
+
+
+def drop_null_keys(df):
+    """
+    Drop rows with a NULL natural key column (including timestamps that
+    failed to parse).
+
+    Run after validation: with data-quality checks enabled the NotNull rules
+    have already quarantined these rows and nothing is left to drop, but with
+    checks disabled they would otherwise be loaded. NULLs are distinct in the
+    unique (coin_id, source_timestamp) index, so such rows would be inserted
+    again on every re-run.
+    """
+    key_columns = [col for col in NATURAL_KEY if col in df.columns]
+    if df.empty or not key_columns:
+        return df
+    null_keys = df[key_columns].isna().any(axis=1)
+    if null_keys.any():
+        logger.warning(f"Dropping {int(null_keys.sum())} row(s) with a NULL {'/'.join(key_columns)}")
+        df = df[~null_keys]
+    return df
+
+
+def rows_for_insert(df):
+    """
+    Yield plain row tuples with NaN/NaT replaced by None for psycopg2 parameters.
+
+    Only the slice being inserted is converted to objects, so callers should
+    pass one batch at a time.
+    """
+    values = df.astype(object).where(df.notna(), None)
+    return values.itertuples(index=False, name=None)
@@ -0,0 +1,209 @@
+"""
+On-disk read-through cache for immutable S3 objects.
+
+Entries are addressed by sha256(bucket, key, ETag), so a rewritten object
+(new ETag) never matches an old entry and nothing ever needs invalidating.
+Cached files are memory-mapped rather than read, and the least recently used
+entries are deleted once the cache outgrows its size cap.
+
+Re-running the loader or a local transform over the same prefix (debugging,
+backfill retries) then reads from local disk instead of issuing S3 GETs.
+
+Enabled by setting S3_CACHE_DIR; see default_cache().
+"""
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Cache directory ('' disables the cache)
+S3_CACHE_DIR = os.getenv('S3_CACHE_DIR', '')
+# Size cap; least recently used entries are evicted beyond it
+S3_CACHE_MAX_MB = int(os.getenv('S3_CACHE_MAX_MB', '10240'))
+# Chunk size for streaming a downloaded object to its cache file
+COPY_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+def _etag(obj):
+    """Normalized ETag of an object summary or get_object response (quotes stripped)."""
+    return (obj.get('ETag') or '').strip('"')
+
+
+class S3ObjectCache:
+    """
+    Content-addressed LRU cache of S3 objects on local disk.
+
+    Thread-safe, so it can be shared by fetch workers and parallel loaders.
+    Several processes may also share a directory: entries are written to a
+    temporary name and renamed into place, and recency is the file's mtime,
+    which every hit refreshes.
+    """
+
+    def __init__(self, directory, max_bytes):
+        """
+        :param directory: Cache directory (created if missing).
+        :param max_bytes: Size cap for all cached entries.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_hit = 0
+        self.bytes_downloaded = 0
+        self._lock = threading.Lock()
+        self._evicting = False
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def _path(self, bucket, key, etag):
+        digest = hashlib.sha256(f"{bucket}\0{key}\0{etag}".encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _entries(self):
+        """(path, size, mtime) of every complete entry."""
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def lookup(self, bucket, obj):
+        """
+        Path of the cached copy of an object summary, or None (also when it
+        has no ETag). A hit counts as a use for LRU purposes.
+        """
+        etag = _etag(obj)
+        if not etag:
+            return None
+        path = self._path(bucket, obj['Key'], etag)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def open(self, s3_client, bucket, obj):
+        """Memory-mapped pyarrow file over an object's contents, downloading it on a miss."""
+        path = self.lookup(bucket, obj)
+        if path is not None:
+            try:
+                mapped = pa.memory_map(path)
+            except FileNotFoundError:
+                # Evicted between the lookup and the open
+                mapped = None
+            if mapped is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.bytes_hit += obj.get('Size', 0)
+                return mapped
+
+        resp = s3_client.get_object(Bucket=bucket, Key=obj['Key'])
+        # Address by the ETag actually downloaded, in case the object changed since it was listed
+        etag = _etag(resp) or _etag(obj)
+        if not etag:
+            resp['Body'].close()
+            raise ValueError(f"s3://{bucket}/{obj['Key']} has no ETag to cache it under")
+        path = self._path(bucket, obj['Key'], etag)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        # Streamed to disk in chunks, so a miss never holds the whole object in memory
+        try:
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(resp['Body'], f, COPY_CHUNK_BYTES)
+                size = f.tell()
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        # Mapped before the rename, while eviction can't see it (it skips .tmp files);
+        # the mapping outlives the file's deletion
+        mapped = pa.memory_map(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.misses += 1
+            self.bytes_downloaded += size
+            self._size += size
+            evict = self._size > self.max_bytes and not self._evicting
+            if evict:
+                self._evicting = True
+        if evict:
+            self._evict()
+        return mapped
+
+    def _evict(self):
+        """
+        Delete least recently used entries until the cache is back under 90% of its cap.
+
+        Runs outside the lock (one evicting thread at a time), so fetch workers
+        keep going while the directory is scanned.
+        """
+        try:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            # Rescan rather than trust the running total, other processes may share the directory
+            size = sum(entry_size for _, entry_size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            evicted = 0
+            freed = 0
+            for path, entry_size, _ in entries:
+                if size - freed <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                freed += entry_size
+                evicted += 1
+            with self._lock:
+                self._size = size - freed
+        finally:
+            with self._lock:
+                self._evicting = False
+        if evicted:
+            logger.info(f"S3 cache: evicted {evicted} entr{'y' if evicted == 1 else 'ies'} ({(size - freed) / 2**20:.0f} MB kept)")
+
+    def read(self, s3_client, bucket, obj):
+        """
+        Returns:
+            pyarrow.Buffer: The object's contents, memory-mapped (zero-copy).
+        """
+        # The buffer keeps the mapping alive, so the file must not be closed here
+        return self.open(s3_client, bucket, obj).read_buffer()
+
+    def summary(self):
+        """Log hits, misses and the S3 traffic saved."""
+        requests = self.hits + self.misses
+        rate = self.hits / requests * 100 if requests else 0
+        logger.info(
+            f"S3 cache: {self.hits}/{requests} hit(s) ({rate:.0f}%), "
+            f"{self.bytes_hit / 2**20:.1f} MB served locally, {self.bytes_downloaded / 2**20:.1f} MB downloaded"
+        )
+
+    def stats(self):
+        return {
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'cache_bytes_hit': self.bytes_hit,
+            'cache_bytes_downloaded': self.bytes_downloaded,
+        }
+
+
+def default_cache():
+    """The cache configured by S3_CACHE_DIR / S3_CACHE_MAX_MB, or None when disabled."""
+    if not S3_CACHE_DIR:
+        return None
+    return S3ObjectCache(os.path.expanduser(S3_CACHE_DIR), S3_CACHE_MAX_MB * 1024 * 1024)
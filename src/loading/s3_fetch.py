@@ -0,0 +1,129 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def list_objects(s3_client, bucket, prefix, suffix=''):
+    """
+    Yield every object under an S3 prefix, following list_objects_v2 pagination.
+
+    A single list_objects_v2 call returns at most 1000 keys; the paginator
+    keeps requesting pages until the listing is exhausted.
+
+    Yields:
+        dict: Object summaries with at least 'Key', 'Size' and 'ETag'.
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if obj['Key'].endswith(suffix):
+                yield obj
+
+
+class ByteBudget:
+    """Blocking counter that caps the number of bytes downloaded but not yet consumed."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def acquire(self, nbytes):
+        """
+        Wait until `nbytes` fit in the budget. An object larger than the whole
+        budget is still admitted once nothing else is in flight.
+        """
+        with self._condition:
+            while (
+                not self.closed
+                and self.in_flight > 0
+                and self.in_flight + nbytes > self.max_bytes
+            ):
+                self._condition.wait()
+            self.in_flight += nbytes
+
+    def release(self, nbytes):
+        with self._condition:
+            self.in_flight -= nbytes
+            self._condition.notify_all()
+
+    def close(self):
+        """Wake up any waiter so a cancelled fetch can shut down."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+def _download(s3_client, bucket, key):
+    resp = s3_client.get_object(Bucket=bucket, Key=key)
+    return resp['Body'].read()
+
+
+def fetch_objects(s3_client, bucket, objects, max_workers=8, max_inflight_bytes=256 * 1024 * 1024, cache=None):
+    """
+    Download S3 objects concurrently and yield them in listing order.
+
+    Up to `max_workers` GETs run at once, and downloads are only started while
+    the bytes held by running and not-yet-consumed downloads stay below
+    `max_inflight_bytes`. An object's bytes count against the budget until
+    the consumer asks for the next object.
+
+    boto3 clients are thread-safe, so one client is shared by all workers.
+
+    With an S3ObjectCache (s3_cache.py), objects are read through it and
+    yielded as memory-mapped pyarrow Buffers instead of bytes.
+
+    Yields:
+        tuple: (object summary dict, object bytes)
+    """
+    budget = ByteBudget(max_inflight_bytes)
+    pending = queue.Queue()
+    stop = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='s3-fetch') as executor:
+
+        def submit_all():
+            try:
+                for obj in objects:
+                    size = obj.get('Size', 0)
+                    budget.acquire(size)
+                    if stop.is_set():
+                        budget.release(size)
+                        break
+                    if cache is not None:
+                        future = executor.submit(cache.read, s3_client, bucket, obj)
+                    else:
+                        future = executor.submit(_download, s3_client, bucket, obj['Key'])
+                    pending.put((obj, future))
+            except Exception as e:
+                pending.put(e)
+            finally:
+                pending.put(None)
+
+        submitter = threading.Thread(target=submit_all, name='s3-fetch-submitter', daemon=True)
+        submitter.start()
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                obj, future = item
+                try:
+                    yield obj, future.result()
+                finally:
+                    budget.release(obj.get('Size', 0))
+        finally:
+            # Stop scheduling new downloads and drop anything not yet started
+            stop.set()
+            budget.close()
+            submitter.join()
+            while not pending.empty():
+                item = pending.get_nowait()
+                if isinstance(item, tuple):
+                    item[1].cancel()
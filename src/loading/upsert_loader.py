@@ -0,0 +1,112 @@
+import logging
+import time
+
+from database.schema import NATURAL_KEY
+from src.loading.copy_loader import build_copy_sql, dataframe_to_csv_buffer, log_throughput
+
+logger = logging.getLogger(__name__)
+
+
+def staging_table_name(table_name):
+    return f"{table_name}_staging"
+
+
+def ensure_staging_table(cursor, table_name):
+    """
+    Create (once per session) a temp staging table shaped like the target.
+
+    ON COMMIT DELETE ROWS empties it at every commit; it is also truncated
+    before each chunk so several chunks can share one open transaction.
+    """
+    staging = staging_table_name(table_name)
+    cursor.execute(
+        f'CREATE TEMP TABLE IF NOT EXISTS "{staging}" '
+        f'(LIKE "{table_name}" INCLUDING DEFAULTS) ON COMMIT DELETE ROWS'
+    )
+    return staging
+
+
+def build_merge_sql(table_name, staging, columns, key_columns=NATURAL_KEY):
+    """
+    Build the INSERT ... ON CONFLICT statement that merges staging into the target.
+
+    DISTINCT ON keeps only the latest-loaded row per key within the chunk,
+    since ON CONFLICT cannot touch the same target row twice in one statement.
+    Rows whose values are unchanged are skipped to avoid dead tuples. load_date
+    is stamped at transform time, so it differs on every re-load; it is left
+    out of the change check and only rewritten along with a real change.
+    """
+    column_names = ','.join([f'"{col}"' for col in columns])
+    key_names = ','.join([f'"{col}"' for col in key_columns])
+    update_columns = [col for col in columns if col not in key_columns]
+    order_by = key_names + (', "load_date" DESC NULLS LAST' if 'load_date' in columns else '')
+
+    compare_columns = [col for col in update_columns if col != 'load_date']
+
+    if compare_columns:
+        assignments = ', '.join([f'"{col}" = EXCLUDED."{col}"' for col in update_columns])
+        target_values = ', '.join([f't."{col}"' for col in compare_columns])
+        new_values = ', '.join([f'EXCLUDED."{col}"' for col in compare_columns])
+        conflict_action = (
+            f'DO UPDATE SET {assignments} '
+            f'WHERE ({target_values}) IS DISTINCT FROM ({new_values})'
+        )
+    else:
+        conflict_action = 'DO NOTHING'
+
+    return (
+        f'INSERT INTO "{table_name}" AS t ({column_names}) '
+        f'SELECT DISTINCT ON ({key_names}) {column_names} FROM "{staging}" '
+        f'ORDER BY {order_by} '
+        f'ON CONFLICT ({key_names}) {conflict_action}'
+    )
+
+
+def upsert_dataframe(connection, df, table_name, commit_every=100000, commit=True):
+    """
+    Idempotently load a prepared DataFrame: COPY into a temp staging table,
+    then merge into the target on the natural key.
+
+    Re-loading rows that are already present updates them in place (or skips
+    them when unchanged) instead of appending duplicates. Requires the unique
+    index created by database.schema.ensure_schema.
+
+    Returns:
+        int: Number of rows inserted or updated.
+    """
+    if df.empty:
+        logger.warning("No data to upsert.")
+        return 0
+
+    columns = list(df.columns)
+    missing_keys = [col for col in NATURAL_KEY if col not in columns]
+    if missing_keys:
+        raise ValueError(f"Upsert requires natural key column(s) {missing_keys}")
+
+    chunk_size = commit_every if commit_every and commit_every > 0 else len(df)
+    cursor = connection.cursor()
+    try:
+        staging = ensure_staging_table(cursor, table_name)
+        copy_sql = build_copy_sql(staging, columns)
+        merge_sql = build_merge_sql(table_name, staging, columns)
+
+        rows_written = 0
+        start = time.perf_counter()
+        for offset in range(0, len(df), chunk_size):
+            chunk = df.iloc[offset:offset + chunk_size]
+            cursor.execute(f'TRUNCATE "{staging}"')
+            cursor.copy_expert(copy_sql, dataframe_to_csv_buffer(chunk))
+            cursor.execute(merge_sql)
+            rows_written += cursor.rowcount
+            if commit:
+                connection.commit()
+            logger.info(f"Merged {min(offset + chunk_size, len(df))}/{len(df)} rows ({rows_written} written)...")
+
+        log_throughput('upsert', len(df), time.perf_counter() - start)
+        return rows_written
+    except Exception as e:
+        connection.rollback()
+        logger.error(f"Upsert failed: {e}")
+        raise
+    finally:
+        cursor.close()
@@ -0,0 +1,420 @@
+"""
+Continuous micro-batch pipeline: CoinGecko -> transform -> fact_market_data.
+
+Runs the extract, the staging transform and the Postgres upsert in one
+process, with one thread per stage connected by bounded queues:
+
+    fetch --(snapshots)--> transform --(record batches)--> write
+      \\--(snapshots)--> archive (raw zone, S3)
+
+* Backpressure: a full queue blocks the stage feeding it, so a slow database
+  slows the fetcher down (missed poll ticks are skipped, never queued up)
+  instead of growing memory.
+* The writer drains whatever is queued into one transaction, so it catches
+  up after a stall with fewer, larger commits.
+* After every commit the checkpoint file records the newest snapshot loaded;
+  on restart the gap since then is reported. Ticks missed while the
+  pipeline was down were never fetched and cannot be recovered
+  (/coins/markets has no history).
+* Snapshots are archived to raw/dt=.../hour=.../ by RawZoneWriter off the
+  critical path, each written as its own object as soon as it is fetched
+  (compact_raw.py merges them later), so a crash loses at most the
+  snapshots still queued for the archive, not minutes of buffered data
+  that RDS already holds.
+
+Usage:
+    python src/pipeline/stream_pipeline.py
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import psycopg2
+import pyarrow as pa
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from database.connection import close_pool, get_connection, release_connection
+from database.partitions import PartitionManager
+from database.rollups import dirty_hours, ensure_rollup_tables, mark_dirty, refresh_rollups
+from database.schema import ensure_schema
+from src.extract.async_coingecko import create_session, fetch_markets_async
+from src.extract.raw_writer import RawZoneWriter
+from src.loading.arrow_copy import copy_record_batch, drop_null_key_rows, prepare_record_batch, timestamp_range
+from src.loading.data_quality import DataQualityValidator, QuarantineWriter
+from src.transformation.staging_transform import PARTITION_COLUMN, raw_arrow_schema, transform_arrow
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+TABLE_NAME = "fact_market_data"
+# Seconds between CoinGecko snapshots
+POLL_INTERVAL_SECONDS = float(os.getenv('STREAM_POLL_INTERVAL_SECONDS', '60'))
+# Comma-separated coin ids; when empty the top STREAM_TOP_N_COINS by market cap are tracked
+STREAM_COIN_IDS = [c for c in os.getenv('STREAM_COIN_IDS', 'bitcoin,ethereum,solana').split(',') if c]
+STREAM_TOP_N_COINS = int(os.getenv('STREAM_TOP_N_COINS', '250'))
+# Capacity (in snapshots) of each inter-stage queue
+STREAM_QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', '10'))
+# Most snapshots the writer folds into one transaction when it is behind
+STREAM_MAX_SNAPSHOTS_PER_COMMIT = int(os.getenv('STREAM_MAX_SNAPSHOTS_PER_COMMIT', '30'))
+STREAM_WRITE_RETRIES = int(os.getenv('STREAM_WRITE_RETRIES', '3'))
+STREAM_CHECKPOINT_PATH = os.getenv('STREAM_CHECKPOINT_PATH', '.stream_checkpoint.json')
+# Raw archive; set STREAM_ARCHIVE=false to skip it
+STREAM_ARCHIVE = os.getenv('STREAM_ARCHIVE', 'true').lower() == 'true'
+ARCHIVE_BUCKET = os.getenv('RAW_BUCKET', 'julian-crypto-s3-bucket')
+PARTITION_GRANULARITY = os.getenv('PARTITION_GRANULARITY', 'month')
+PARTITION_PREMAKE = int(os.getenv('PARTITION_PREMAKE', '2'))
+# Refresh the OHLCV rollups after every commit
+ROLLUPS_ENABLED = os.getenv('ROLLUPS_ENABLED', 'true').lower() == 'true'
+
+# Raw CoinGecko records from one poll, and the fact rows derived from them
+Snapshot = namedtuple('Snapshot', ['fetched_at', 'records'])
+FactBatch = namedtuple('FactBatch', ['fetched_at', 'batch'])
+
+_END = object()  # end-of-stream marker passed down the queues
+
+
+class Checkpoint:
+    """Newest snapshot committed to the database, persisted atomically to a JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    @property
+    def last_loaded_at(self):
+        value = self.state.get('last_loaded_at')
+        return datetime.fromisoformat(value) if value else None
+
+    def save(self, fetched_at, rows, snapshots):
+        self.state = {
+            'last_loaded_at': fetched_at.isoformat(),
+            'rows_loaded': self.state.get('rows_loaded', 0) + rows,
+            'snapshots_loaded': self.state.get('snapshots_loaded', 0) + snapshots,
+            'updated_at': datetime.now(timezone.utc).isoformat(),
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+class StreamPipeline:
+    """
+    Fetch, transform, write and archive stages running on their own threads.
+
+    stop() drains: the fetcher stops polling and everything already fetched
+    is still written and archived. A failing write stage aborts the run.
+    """
+
+    def __init__(self, connection, s3_client=None, table_name=TABLE_NAME, partitions=None,
+                 coin_ids=None, top_n=None, poll_interval=POLL_INTERVAL_SECONDS,
+                 queue_size=STREAM_QUEUE_SIZE, checkpoint_path=STREAM_CHECKPOINT_PATH):
+        self.connection = connection
+        self.table_name = table_name
+        self.partitions = partitions
+        self.coin_ids = coin_ids
+        self.top_n = top_n
+        self.poll_interval = poll_interval
+        self.checkpoint = Checkpoint(checkpoint_path)
+        # Flushed after every snapshot, like the Lambda extract (no size/age thresholds)
+        self.archive = (
+            RawZoneWriter(s3_client, ARCHIVE_BUCKET, max_records=0, max_bytes=0, max_age_seconds=0)
+            if s3_client is not None else None
+        )
+        # Rejected rows go to the quarantine prefix of the archive bucket (only counted without S3)
+        self.validator = DataQualityValidator(
+            quarantine=QuarantineWriter(s3_client, ARCHIVE_BUCKET) if s3_client is not None else None
+        )
+
+        self.transform_queue = queue.Queue(maxsize=queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        self.archive_queue = queue.Queue(maxsize=queue_size)
+        self.stopping = threading.Event()  # graceful: stop fetching, drain the rest
+        self.failed = threading.Event()    # abort: a stage raised
+        self.errors = []
+
+    # ------------------------------------------------------------------
+    # plumbing
+    # ------------------------------------------------------------------
+    def _put(self, target, item):
+        """Blocking put (backpressure) that gives up only if the run has failed."""
+        while not self.failed.is_set():
+            try:
+                target.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source):
+        while not self.failed.is_set():
+            try:
+                return source.get(timeout=1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _stage(self, name, target):
+        def run():
+            try:
+                target()
+            except Exception as e:
+                logger.exception(f"{name} stage failed: {e}")
+                self.errors.append(e)
+                self.failed.set()
+        return threading.Thread(target=run, name=name, daemon=True)
+
+    def stop(self):
+        self.stopping.set()
+
+    # ------------------------------------------------------------------
+    # stages
+    # ------------------------------------------------------------------
+    def _fetch_loop(self):
+        loop = asyncio.new_event_loop()
+        session = loop.run_until_complete(self._create_session())
+        try:
+            next_tick = time.monotonic()
+            while not self.stopping.is_set() and not self.failed.is_set():
+                fetched_at = datetime.now(timezone.utc)
+                try:
+                    records = loop.run_until_complete(
+                        fetch_markets_async(coin_ids=self.coin_ids, top_n=self.top_n, session=session)
+                    )
+                except Exception as e:
+                    # A failed poll is skipped; the next tick tries again
+                    logger.warning(f"Fetch failed, skipping this tick: {e}")
+                    records = None
+
+                if records:
+                    snapshot = Snapshot(fetched_at, records)
+                    if not self._put(self.transform_queue, snapshot):
+                        break
+                    if self.archive is not None and not self._put(self.archive_queue, snapshot):
+                        break
+
+                next_tick += self.poll_interval
+                now = time.monotonic()
+                if now > next_tick:
+                    skipped = int((now - next_tick) // self.poll_interval) + 1
+                    logger.warning(f"Pipeline is behind; skipping {skipped} poll tick(s)")
+                    next_tick += skipped * self.poll_interval
+                self.stopping.wait(max(0.0, next_tick - time.monotonic()))
+        finally:
+            loop.run_until_complete(session.close())
+            loop.close()
+            self._put(self.transform_queue, _END)
+            if self.archive is not None:
+                self._put(self.archive_queue, _END)
+
+    @staticmethod
+    async def _create_session():
+        return create_session()
+
+    def _transform_loop(self):
+        schema = raw_arrow_schema()
+        while True:
+            snapshot = self._get(self.transform_queue)
+            if snapshot is _END:
+                self._put(self.write_queue, _END)
+                return
+            stamp = snapshot.fetched_at.isoformat()
+            raw = pa.Table.from_pylist(
+                [{**record, 'ingestion_timestamp': stamp} for record in snapshot.records],
+                schema=schema,
+            )
+            facts = transform_arrow(raw).drop_columns([PARTITION_COLUMN]).combine_chunks()
+            for batch in facts.to_batches():
+                if not self._put(self.write_queue, FactBatch(snapshot.fetched_at, batch)):
+                    return
+
+    def _write_loop(self):
+        completed = False
+        try:
+            while True:
+                first = self._get(self.write_queue)
+                if first is _END:
+                    break
+                pending = [first]
+                done = False
+                # Fold any backlog into the same transaction
+                while len(pending) < STREAM_MAX_SNAPSHOTS_PER_COMMIT:
+                    try:
+                        item = self.write_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _END:
+                        done = True
+                        break
+                    pending.append(item)
+
+                self._write_with_retry(pending)
+                if done:
+                    break
+            completed = True
+        finally:
+            # Rows rejected by already validated batches are written even when a write fails
+            try:
+                self.validator.close()
+            except Exception as e:
+                if completed:
+                    raise
+                # Don't mask the write failure
+                logger.error(f"Writing quarantined rows failed: {e}")
+            self.validator.summary()
+
+    def _write_with_retry(self, pending):
+        table = pa.Table.from_batches([item.batch for item in pending]).combine_chunks()
+        # Validated once, outside the retry loop, so retries don't quarantine rows twice
+        batches = [drop_null_key_rows(self.validator.validate(prepare_record_batch(batch)))
+                   for batch in table.to_batches()]
+        batches = [batch for batch in batches if batch.num_rows]
+        for attempt in range(STREAM_WRITE_RETRIES + 1):
+            try:
+                rows = self._write(batches)
+                break
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                if attempt == STREAM_WRITE_RETRIES:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"Database write failed ({e}); reconnecting in {delay}s")
+                release_connection(self.connection)
+                time.sleep(delay)
+                self.connection = get_connection()
+
+        newest = max(item.fetched_at for item in pending)
+        oldest = min(item.fetched_at for item in pending)
+        self.checkpoint.save(newest, rows, len(pending))
+        lag = (datetime.now(timezone.utc) - oldest).total_seconds()
+        logger.info(f"Committed {rows} row(s) from {len(pending)} snapshot(s); oldest was {lag:.1f}s old")
+
+    def _write(self, batches):
+        """Upsert one transaction's worth of prepared batches (partitions, then data, one commit)."""
+        rows = 0
+        try:
+            for batch in batches:
+                if self.partitions:
+                    bounds = timestamp_range(batch)
+                    if bounds:
+                        self.partitions.ensure_range(self.connection, *bounds, commit=False)
+                if ROLLUPS_ENABLED:
+                    mark_dirty(self.connection, dirty_hours(batch), self.table_name, commit=False)
+                rows += copy_record_batch(self.connection, batch, self.table_name, method='upsert', commit=False)
+            self.connection.commit()
+        except Exception:
+            # The retry runs a new transaction, which must create the partitions again
+            if self.partitions:
+                self.partitions.discard_pending()
+            raise
+        if self.partitions:
+            self.partitions.mark_committed()
+        if ROLLUPS_ENABLED:
+            refresh_rollups(self.connection, self.table_name)
+        return rows
+
+    def _archive_loop(self):
+        while True:
+            snapshot = self._get(self.archive_queue)
+            if snapshot is _END:
+                break
+            try:
+                self.archive.add(snapshot.records, ingested_at=snapshot.fetched_at)
+                self.archive.flush()
+            except Exception as e:
+                # The buffer is kept and retried on the next flush; the database path is unaffected
+                logger.warning(f"Raw archive write failed, will retry: {e}")
+        self.archive.close()
+
+    # ------------------------------------------------------------------
+    def run(self):
+        """Run until stop() (drain) or a stage failure; returns True on a clean stop."""
+        last = self.checkpoint.last_loaded_at
+        if last is not None:
+            gap = (datetime.now(timezone.utc) - last).total_seconds()
+            logger.info(f"Last committed snapshot {last.isoformat()} ({gap:.0f}s ago); "
+                        f"ticks missed since then were not fetched and are not recovered")
+
+        stages = [
+            self._stage('fetch', self._fetch_loop),
+            self._stage('transform', self._transform_loop),
+            self._stage('write', self._write_loop),
+        ]
+        if self.archive is not None:
+            stages.append(self._stage('archive', self._archive_loop))
+        for stage in stages:
+            stage.start()
+        while any(stage.is_alive() for stage in stages):
+            if self.failed.is_set():
+                self.stopping.set()
+            for stage in stages:
+                stage.join(timeout=0.5)
+        return not self.errors
+
+
+def main():
+    logger.info("=" * 60)
+    logger.info("Starting streaming pipeline: CoinGecko -> fact_market_data")
+    logger.info("=" * 60)
+
+    db_connection = None
+    pipeline = None
+    try:
+        s3_client = None
+        if STREAM_ARCHIVE:
+            import boto3
+            s3_client = boto3.client('s3')
+
+        db_connection = get_connection()
+        partitioned = PARTITION_GRANULARITY != 'none'
+        ensure_schema(db_connection, table_name=TABLE_NAME,
+                      partition_granularity=PARTITION_GRANULARITY if partitioned else None)
+        partitions = (
+            PartitionManager(TABLE_NAME, PARTITION_GRANULARITY, premake=PARTITION_PREMAKE)
+            if partitioned else None
+        )
+        if ROLLUPS_ENABLED:
+            ensure_rollup_tables(db_connection, table_name=TABLE_NAME)
+
+        pipeline = StreamPipeline(
+            db_connection, s3_client=s3_client, partitions=partitions,
+            coin_ids=STREAM_COIN_IDS or None, top_n=None if STREAM_COIN_IDS else STREAM_TOP_N_COINS,
+        )
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: pipeline.stop())
+
+        ok = pipeline.run()
+        logger.info("Pipeline stopped" + ("" if ok else " after a stage failure"))
+        return 0 if ok else 1
+    except Exception as e:
+        logger.error(f"Streaming pipeline failed: {e}")
+        return 1
+    finally:
+        if pipeline is not None:
+            db_connection = pipeline.connection
+        release_connection(db_connection)
+        close_pool()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+Run the staging transform in-process with pyarrow, without Glue or Spark.
+
+Reads raw/dt=YYYY-MM-DD/ partitions (NDJSON, optionally gzip/zstd) from S3
+or a local directory and writes the processed zone in the layout the Glue
+job produces: <output>/dt=YYYY-MM-DD/part-*.parquet, sorted by
+(coin_id, source_timestamp), each written date replacing its previous files.
+With --register-partitions, dates written to S3 are added to the Glue Data
+Catalog table (src/glue/catalog.py) right after the write.
+
+Usage:
+    python src/transformation/local_transform.py --dates 2026-01-01 2026-01-02
+    python src/transformation/local_transform.py --raw ./raw --output ./processed
+"""
+import argparse
+import glob
+import io
+import logging
+import os
+import re
+import sys
+import time
+import uuid
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pajson
+import pyarrow.parquet as pq
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from src.common.instrumentation import RunMetrics, add, stage
+from src.extract.raw_writer import decompress
+from src.loading.s3_cache import default_cache
+from src.loading.s3_fetch import fetch_objects, list_objects
+from src.transformation.staging_transform import (
+    PARTITION_COLUMN,
+    SORT_COLUMNS,
+    raw_arrow_schema,
+    transform_arrow,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+# Configuration (defaults mirror the Glue job parameters)
+RAW_PATH = os.getenv('RAW_PATH', 's3://julian-crypto-s3-bucket/raw/')
+PROCESSED_PATH = os.getenv('PROCESSED_PATH', 's3://julian-crypto-s3-bucket/processed/fact_market_data/')
+TARGET_FILE_MB = float(os.getenv('TARGET_FILE_MB', '128'))
+ESTIMATED_ROW_BYTES = int(os.getenv('ESTIMATED_ROW_BYTES', '48'))
+ROW_GROUP_MB = float(os.getenv('ROW_GROUP_MB', '32'))
+COMPRESSION = os.getenv('COMPRESSION', 'snappy')
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', '8'))
+# Register written dt partitions in the Glue Data Catalog (s3:// outputs only)
+REGISTER_PARTITIONS = os.getenv('REGISTER_PARTITIONS', 'false').lower() == 'true'
+
+DT_RE = re.compile(r'dt=(\d{4}-\d{2}-\d{2})')
+
+
+def split_s3_path(path):
+    """'s3://bucket/prefix/' -> ('bucket', 'prefix/')"""
+    bucket, _, prefix = path[len('s3://'):].partition('/')
+    return bucket, prefix
+
+
+# ==============================================================================
+# EXTRACT
+# ==============================================================================
+
+def list_raw_files(raw_path, s3_client=None):
+    """Return {dt: [file]} for every raw object (S3) or file (local) under a dt= partition."""
+    if raw_path.startswith('s3://'):
+        bucket, prefix = split_s3_path(raw_path)
+        files = [(obj['Key'], obj) for obj in list_objects(s3_client, bucket, prefix)]
+    else:
+        paths = glob.glob(os.path.join(raw_path, '**', '*.json*'), recursive=True)
+        files = [(path, path) for path in paths]
+
+    by_date = {}
+    for name, handle in files:
+        match = DT_RE.search(name)
+        if match:
+            by_date.setdefault(match.group(1), []).append(handle)
+    return by_date
+
+
+def _read_local(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def read_raw_files(files, dt, raw_path, s3_client=None, cache=None):
+    """
+    Parse one date's raw NDJSON files into a single Arrow table with a dt
+    column. S3 objects are read through `cache` (an S3ObjectCache) when given.
+    """
+    parse_options = pajson.ParseOptions(
+        explicit_schema=raw_arrow_schema(),
+        unexpected_field_behavior='ignore',
+    )
+    if raw_path.startswith('s3://'):
+        bucket, _ = split_s3_path(raw_path)
+        bodies = ((obj['Key'], body) for obj, body in fetch_objects(s3_client, bucket, files, max_workers=FETCH_WORKERS,
+                                                                  cache=cache))
+    else:
+        bodies = ((path, _read_local(path)) for path in files)
+
+    tables = []
+    for key, body in bodies:
+        add('read', bytes=len(body))
+        data = decompress(body, key)
+        # bytes, or a memory-mapped pyarrow Buffer when read through the cache
+        if len(data):
+            tables.append(pajson.read_json(pa.BufferReader(data), parse_options=parse_options))
+    table = pa.concat_tables(tables) if tables else raw_arrow_schema().empty_table()
+    return table.append_column(PARTITION_COLUMN, pa.array([dt] * table.num_rows, type=pa.string()))
+
+
+# ==============================================================================
+# LOAD
+# ==============================================================================
+
+def parquet_parts(table, rows_per_file, row_group_rows, compression):
+    """Sort one date's rows and serialize them into Parquet files of at most rows_per_file rows."""
+    table = table.drop_columns([PARTITION_COLUMN])
+    # Spark's ascending sort puts NULLs first
+    indices = pc.sort_indices(table, sort_keys=[(col, 'ascending') for col in SORT_COLUMNS], null_placement='at_start')
+    table = table.take(indices)
+    for offset in range(0, max(table.num_rows, 1), rows_per_file):
+        buffer = io.BytesIO()
+        pq.write_table(
+            table.slice(offset, rows_per_file),
+            buffer,
+            compression=compression,
+            row_group_size=row_group_rows,
+            coerce_timestamps='us',
+        )
+        yield buffer.getvalue()
+
+
+def write_partition(table, dt, output_path, s3_client=None, rows_per_file=None, row_group_rows=None,
+                    compression=COMPRESSION):
+    """
+    Write one dt partition, then delete the files it replaces (overwrite semantics).
+    Raises if S3 reports any of those files as not deleted.
+
+    Returns:
+        int: Files written.
+    """
+    run_id = uuid.uuid4().hex[:12]
+    extension = '' if compression == 'none' else f'.{compression}'
+    parts = enumerate(parquet_parts(table, rows_per_file, row_group_rows, compression))
+    written = 0
+
+    if output_path.startswith('s3://'):
+        bucket, prefix = split_s3_path(output_path)
+        partition_prefix = f"{prefix.rstrip('/')}/{PARTITION_COLUMN}={dt}/"
+        previous = [obj['Key'] for obj in list_objects(s3_client, bucket, partition_prefix)]
+        for i, body in parts:
+            s3_client.put_object(Bucket=bucket, Key=f"{partition_prefix}part-{i:05d}-{run_id}{extension}.parquet", Body=body)
+            written += 1
+        for i in range(0, len(previous), 1000):
+            response = s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={'Objects': [{'Key': key} for key in previous[i:i + 1000]], 'Quiet': True},
+            )
+            # Quiet mode still lists the keys that could not be deleted
+            errors = response.get('Errors', [])
+            if errors:
+                details = ', '.join(f"{error['Key']} ({error.get('Code')})" for error in errors[:5])
+                raise RuntimeError(
+                    f"Could not delete {len(errors)} replaced file(s) of dt={dt}, which now holds "
+                    f"duplicate rows: {details}"
+                )
+    else:
+        directory = os.path.join(output_path, f"{PARTITION_COLUMN}={dt}")
+        os.makedirs(directory, exist_ok=True)
+        previous = [os.path.join(directory, name) for name in os.listdir(directory)]
+        for i, body in parts:
+            with open(os.path.join(directory, f"part-{i:05d}-{run_id}{extension}.parquet"), 'wb') as f:
+                f.write(body)
+            written += 1
+        for path in previous:
+            os.remove(path)
+    return written
+
+
+# ==============================================================================
+# RUN
+# ==============================================================================
+
+def run(raw_path, output_path, dates=None, s3_client=None, target_file_mb=TARGET_FILE_MB,
+        row_group_mb=ROW_GROUP_MB, compression=COMPRESSION, cache=None, glue_client=None):
+    """
+    Transform the given dates (default: every date found in raw).
+
+    With a Glue client and an s3:// output, the dates written are registered
+    as partitions of the processed table.
+
+    Returns:
+        int: Rows written.
+    """
+    rows_per_file = max(1, int(target_file_mb * 1024 * 1024) // ESTIMATED_ROW_BYTES)
+    row_group_rows = max(1, int(row_group_mb * 1024 * 1024) // ESTIMATED_ROW_BYTES)
+
+    raw_files = list_raw_files(raw_path, s3_client)
+    dates = sorted(dates or raw_files)
+    total_rows = 0
+    written_dates = []
+    for dt in dates:
+        if dt not in raw_files:
+            logger.warning(f"No raw files for dt={dt}; skipping")
+            continue
+        start = time.perf_counter()
+        with stage('read') as read:
+            raw_table = read_raw_files(raw_files[dt], dt, raw_path, s3_client, cache)
+            read.add(rows=raw_table.num_rows)
+        with stage('transform', rows=raw_table.num_rows):
+            fact_table = transform_arrow(raw_table)
+        with stage('write', rows=fact_table.num_rows):
+            files = write_partition(fact_table, dt, output_path, s3_client, rows_per_file, row_group_rows,
+                                    compression)
+        total_rows += fact_table.num_rows
+        if files:
+            written_dates.append(dt)
+        logger.info(
+            f"dt={dt}: {raw_table.num_rows} raw -> {fact_table.num_rows} rows in {files} file(s) "
+            f"({time.perf_counter() - start:.2f}s)"
+        )
+
+    if glue_client is not None and output_path.startswith('s3://') and written_dates:
+        from src.glue.catalog import register_processed_partitions
+        with stage('catalog'):
+            register_processed_partitions(glue_client, written_dates, output_path)
+    return total_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--raw', default=RAW_PATH, help='raw zone (s3:// URI or local directory)')
+    parser.add_argument('--output', default=PROCESSED_PATH, help='processed zone (s3:// URI or local directory)')
+    parser.add_argument('--dates', nargs='*', help='dt partitions to rebuild (default: all)')
+    parser.add_argument('--compression', default=COMPRESSION, choices=['snappy', 'zstd', 'gzip', 'none'])
+    parser.add_argument('--register-partitions', action='store_true', default=REGISTER_PARTITIONS,
+                        help='register written dates in the Glue Data Catalog (s3:// output only)')
+    args = parser.parse_args()
+
+    s3_client = None
+    if args.raw.startswith('s3://') or args.output.startswith('s3://'):
+        import boto3
+        s3_client = boto3.client('s3')
+    glue_client = None
+    if args.register_partitions and args.output.startswith('s3://'):
+        import boto3
+        glue_client = boto3.client('glue')
+    # Raw objects are immutable, so re-runs of the same dates can read them from S3_CACHE_DIR
+    cache = default_cache() if args.raw.startswith('s3://') else None
+
+    with RunMetrics('transform', dimensions={'engine': 'arrow'}) as metrics:
+        try:
+            rows = run(args.raw, args.output, args.dates, s3_client, compression=args.compression, cache=cache,
+                       glue_client=glue_client)
+        except Exception as e:
+            logger.error(f"Local transform failed: {e}")
+            metrics.report(status='error', error=str(e))
+            return 1
+        logger.info(f"Local transform complete: {rows} rows written")
+        if cache is not None:
+            cache.summary()
+        metrics.report(status='ok', rows=rows, **(cache.stats() if cache is not None else {}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Raw CoinGecko snapshot -> fact_market_data staging transform.
+
+One column mapping, two engines:
+
+* transform_spark(raw_df): PySpark, used by the Glue job.
+* transform_arrow(raw_table): pyarrow, in-process, for small batches and
+  local runs (see local_transform.py); no cluster or JVM needed.
+
+Both produce the same columns, types and rows. The columns come from the
+schema registry (src/common/schema_registry.py). Besides the registry the
+module has no imports from the rest of the repo, so Glue can ship both
+with --extra-py-files; pyspark and pyarrow are imported by the backend that
+needs them.
+"""
+from datetime import datetime, timezone
+
+try:
+    from src.common.schema_registry import column_names, source_mapping
+except ImportError:  # shipped flat to Glue with --extra-py-files
+    from schema_registry import column_names, source_mapping
+
+# (raw JSON field, fact column, type) in output order
+COLUMN_MAPPING = source_mapping()
+FACT_COLUMNS = column_names()
+# dt is the raw ingestion date partition (raw/dt=YYYY-MM-DD/)
+PARTITION_COLUMN = "dt"
+# Sort order inside each output file (narrow row-group min/max statistics)
+SORT_COLUMNS = ["coin_id", "source_timestamp"]
+
+
+# ==============================================================================
+# SPARK BACKEND
+# ==============================================================================
+
+def raw_spark_schema():
+    """Explicit read schema for raw JSON (types of the raw fields, timestamps as strings)."""
+    from pyspark.sql.types import DoubleType, StringType, StructField, StructType
+
+    types = {"string": StringType(), "double": DoubleType(), "timestamp": StringType()}
+    return StructType([StructField(raw, types[kind], True) for raw, _, kind in COLUMN_MAPPING])
+
+
+def transform_spark(raw_df):
+    """Flatten, rename, cast and filter a raw Spark DataFrame (with the dt partition column)."""
+    from pyspark.sql import functions as F
+    from pyspark.sql.types import DoubleType
+
+    columns = []
+    for raw, fact, kind in COLUMN_MAPPING:
+        if kind == "double":
+            columns.append(F.col(raw).cast(DoubleType()).alias(fact))
+        elif kind == "timestamp":
+            columns.append(F.to_timestamp(F.col(raw)).alias(fact))
+        else:
+            columns.append(F.col(raw).alias(fact))
+    columns.append(F.current_timestamp().alias("load_date"))
+    columns.append(F.col(PARTITION_COLUMN).cast("string").alias(PARTITION_COLUMN))
+
+    return raw_df.select(*columns).filter(F.col("coin_id").isNotNull())
+
+
+# ==============================================================================
+# ARROW BACKEND
+# ==============================================================================
+
+def raw_arrow_schema():
+    """pyarrow counterpart of raw_spark_schema (for pyarrow.json explicit_schema)."""
+    import pyarrow as pa
+
+    types = {"string": pa.string(), "double": pa.float64(), "timestamp": pa.string()}
+    return pa.schema([(raw, types[kind]) for raw, _, kind in COLUMN_MAPPING])
+
+
+def fact_arrow_schema(with_partition=True):
+    """Output schema; timestamps are UTC instants like Spark's TIMESTAMP_MICROS output."""
+    import pyarrow as pa
+
+    types = {"string": pa.string(), "double": pa.float64(), "timestamp": pa.timestamp("us", tz="UTC")}
+    fields = [(fact, types[kind]) for _, fact, kind in COLUMN_MAPPING]
+    fields.append(("load_date", pa.timestamp("us", tz="UTC")))
+    if with_partition:
+        fields.append((PARTITION_COLUMN, pa.string()))
+    return pa.schema(fields)
+
+
+def _parse_timestamps(array):
+    """
+    ISO-8601 strings -> timestamp[us, UTC], like Spark's to_timestamp with a
+    UTC session time zone: strings without an offset are taken as UTC and
+    unparseable values become NULL.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    target = pa.timestamp("us", tz="UTC")
+    try:
+        return pc.cast(array, target)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        pass
+    try:
+        return pc.assume_timezone(pc.cast(array, pa.timestamp("us")), "UTC")
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        import pandas as pd
+
+        parsed = pd.to_datetime(array.to_pandas(), errors="coerce", utc=True, format="ISO8601")
+        return pa.array(parsed, type=target)
+
+
+def transform_arrow(raw_table, load_date=None):
+    """
+    Flatten, rename, cast and filter a raw pyarrow Table.
+
+    Missing raw fields become NULL columns. `dt` is taken from the table when
+    present (set from the raw partition path), else derived from the UTC date
+    of source_timestamp.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    num_rows = raw_table.num_rows
+    schema = fact_arrow_schema()
+    arrays = []
+    for raw, fact, kind in COLUMN_MAPPING:
+        if raw not in raw_table.column_names:
+            arrays.append(pa.nulls(num_rows, schema.field(fact).type))
+            continue
+        column = raw_table.column(raw).combine_chunks()
+        if kind == "timestamp":
+            column = _parse_timestamps(pc.cast(column, pa.string()))
+        else:
+            column = pc.cast(column, schema.field(fact).type)
+        arrays.append(column)
+
+    load_date = load_date or datetime.now(timezone.utc)
+    arrays.append(pa.array([load_date] * num_rows, type=pa.timestamp("us", tz="UTC")))
+
+    if PARTITION_COLUMN in raw_table.column_names:
+        dt = pc.cast(raw_table.column(PARTITION_COLUMN).combine_chunks(), pa.string())
+    else:
+        dt = pc.strftime(arrays[FACT_COLUMNS.index("source_timestamp")], format="%Y-%m-%d")
+    arrays.append(dt)
+
+    table = pa.Table.from_arrays(arrays, schema=schema)
+    return table.filter(pc.is_valid(table.column("coin_id")))
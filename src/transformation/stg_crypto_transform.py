@@ -1,80 +1,248 @@
 import sys
+import boto3
 from awsglue.utils import getResolvedOptions
 from pyspark.context import SparkContext
 from awsglue.context import GlueContext
 from awsglue.job import Job
 from pyspark.sql import functions as F
-from pyspark.sql.types import (
-    StructType, StructField,
-    StringType, DoubleType
-)
+from pyspark.sql.utils import AnalysisException
+
+# Shared with the local engine and the other entry points; ship them with
+# --extra-py-files s3://<bucket>/scripts/staging_transform.py,s3://<bucket>/scripts/schema_registry.py,
+#                  s3://<bucket>/scripts/instrumentation.py
+# With REGISTER_PARTITIONS=true also add s3://<bucket>/scripts/catalog.py and
+# s3://<bucket>/scripts/creating_aws_glue_crawler.py (imported only then).
+from instrumentation import RunMetrics
+from staging_transform import PARTITION_COLUMN, SORT_COLUMNS, raw_spark_schema, transform_spark
+
+# Natural key of fact_market_data (database.schema.NATURAL_KEY)
+NATURAL_KEY = ["coin_id", "source_timestamp"]
 
 # ==============================================================================
 # JOB SETUP
 # ==============================================================================
-args = getResolvedOptions(sys.argv, ["JOB_NAME"])
+# Optional job parameters (pass as --KEY value)
+DEFAULT_ARGS = {
+    "RAW_PATH": "s3://julian-crypto-s3-bucket/raw/",
+    "PROCESSED_PATH": "s3://julian-crypto-s3-bucket/processed/fact_market_data/",
+    # incremental: append the rows of raw files that arrived since the last
+    #              committed run (requires --job-bookmark-option
+    #              job-bookmark-enable); existing part files are never rewritten
+    # full: rebuild the whole processed zone from all of raw
+    "MODE": "incremental",
+    # Output layout of the processed zone
+    "PARTITION_BY_COIN": "false",       # also partition by coin_id (only for few, large coins)
+    "TARGET_FILE_MB": "128",            # approximate size of each Parquet file
+    "ESTIMATED_ROW_BYTES": "48",        # compressed bytes per row, used to size files
+    "ROW_GROUP_MB": "32",               # smaller row groups -> finer min/max skipping
+    "COMPRESSION": "snappy",            # snappy, zstd, gzip or none
+    # Register the written partitions in the Glue Data Catalog; enable once
+    # creation_glue_datacatlog_db.py has created the table and the job role
+    # may call glue:BatchCreatePartition
+    "REGISTER_PARTITIONS": "false",
+    "GLUE_DATABASE": "crypto_db",
+}
+
+
+def resolve_args(argv, required, defaults):
+    """getResolvedOptions rejects keys missing from argv, so only resolve the optional ones supplied."""
+    present = [key for key in defaults if f"--{key}" in argv]
+    return {**defaults, **getResolvedOptions(argv, required + present)}
+
+
+args = resolve_args(sys.argv, ["JOB_NAME"], DEFAULT_ARGS)
+RAW_PATH = args["RAW_PATH"].rstrip("/") + "/"
+PROCESSED_PATH = args["PROCESSED_PATH"]
+MODE = args["MODE"].lower()
+if MODE not in ("incremental", "full"):
+    raise ValueError(f"Unknown MODE '{MODE}' (expected 'incremental' or 'full')")
+PARTITION_COLUMNS = [PARTITION_COLUMN] + (["coin_id"] if args["PARTITION_BY_COIN"].lower() == "true" else [])
+TARGET_FILE_BYTES = int(float(args["TARGET_FILE_MB"]) * 1024 * 1024)
+ROWS_PER_FILE = max(1, TARGET_FILE_BYTES // int(args["ESTIMATED_ROW_BYTES"]))
+ROW_GROUP_BYTES = int(float(args["ROW_GROUP_MB"]) * 1024 * 1024)
+COMPRESSION = args["COMPRESSION"].lower()
+REGISTER_PARTITIONS = args["REGISTER_PARTITIONS"].lower() == "true"
+WRITE_SORT_COLUMNS = PARTITION_COLUMNS + [c for c in SORT_COLUMNS if c not in PARTITION_COLUMNS]
 
 sc = SparkContext()
 glueContext = GlueContext(sc)
 spark = glueContext.spark_session
+# A full rebuild replaces everything under PROCESSED_PATH
+spark.conf.set("spark.sql.sources.partitionOverwriteMode", "static")
+# UTC-adjusted INT64 timestamps (not legacy INT96), same as the local engine writes
+spark.conf.set("spark.sql.parquet.outputTimestampType", "TIMESTAMP_MICROS")
 
 job = Job(glueContext)
 job.init(args["JOB_NAME"], args)
 
-# ==============================================================================
-# UPDATED SCHEMA (FLATTENED)
-# Fixed: Removed nested StructTypes because the source data is likely flat.
-# ==============================================================================
-json_schema = StructType([
-    StructField("id", StringType(), True),
-    StructField("symbol", StringType(), True),
-    StructField("ingestion_timestamp", StringType(), True),
-    StructField("current_price", DoubleType(), True),   # Changed to flat Double
-    StructField("market_cap", DoubleType(), True),      # Changed to flat Double
-    StructField("total_volume", DoubleType(), True)     # Changed to flat Double
-])
-
 # ==============================================================================
 # EXTRACT (S3 RAW)
 # ==============================================================================
-raw_df = spark.read \
-    .schema(json_schema) \
-    .json("s3://julian-crypto-s3-bucket/raw/")
+# Raw objects live under raw/dt=YYYY-MM-DD/hour=HH/, so Spark discovers dt and
+# hour as partition columns and filters on them prune whole directories.
 
-# ==============================================================================
-# TRANSFORM (FLATTENED MAPPING)
-# ==============================================================================
-flattened_df = raw_df.select(
-    F.col("id").alias("coin_id"),
-    F.col("symbol").alias("coin_symbol"),
-    F.col("current_price").alias("price_usd"),        # Mapping directly to flat field
-    F.col("market_cap").alias("market_cap_usd"),      # Mapping directly to flat field
-    F.col("total_volume").alias("volume_24h_usd"),    # Mapping directly to flat field
-    F.col("ingestion_timestamp").alias("source_timestamp")
-)
+def new_raw_files():
+    """
+    Raw files that arrived since the last committed run, as {file: dt}.
+
+    The job bookmark on this source (transformation_ctx) skips files already
+    processed, so only new files are scanned. The reader attaches each
+    record's file path as source_file (input_file_name() returns '' once
+    Glue groups small files into one task).
+
+    Raises if new records were read but the dt of their files can't be
+    resolved: returning no dates would let job.commit() advance the bookmark
+    past those files, and they would never be transformed.
+    """
+    new_files_df = glueContext.create_dynamic_frame.from_options(
+        connection_type="s3",
+        connection_options={"paths": [RAW_PATH], "recurse": True},
+        format="json",
+        format_options={"attachFilename": "source_file"},
+        transformation_ctx="raw_market_data",
+    ).toDF()
+    # A frame without new records has no columns at all
+    if not new_files_df.columns:
+        return {}
+    files = new_files_df \
+        .select("source_file") \
+        .distinct() \
+        .select("source_file", F.regexp_extract("source_file", r"dt=(\d{4}-\d{2}-\d{2})", 1).alias("dt")) \
+        .collect()
+    unresolved = sum(1 for row in files if not row.dt)
+    if unresolved:
+        raise RuntimeError(
+            f"Could not resolve the dt partition of {unresolved} new raw file(s) under {RAW_PATH}; "
+            "not committing the job bookmark"
+        )
+    return {row.source_file: row.dt for row in files}
+
+
+def read_raw(files=None):
+    """Read raw JSON: all of RAW_PATH, or only `files` (dt/hour still taken from their paths)."""
+    reader = spark.read.schema(raw_spark_schema())
+    if files is None:
+        return reader.json(RAW_PATH)
+    return reader.option("basePath", RAW_PATH).json(sorted(files))
+
+
+def without_processed_rows(final_df, dates):
+    """
+    Drop rows whose natural key is already in the processed zone for `dates`.
+
+    Makes appending idempotent: a run that failed after writing but before
+    job.commit() reads the same raw files again on retry, and this keeps it
+    from appending their rows twice. Only the key columns of the affected
+    dates are read.
+    """
+    try:
+        processed_df = spark.read.parquet(PROCESSED_PATH)
+    except AnalysisException:
+        # Nothing written yet
+        return final_df
+    existing = processed_df \
+        .where(F.col(PARTITION_COLUMN).cast("string").isin(dates)) \
+        .select(*NATURAL_KEY) \
+        .distinct() \
+        .alias("existing")
+    new = final_df.alias("new")
+    condition = [F.col(f"new.{col}").eqNullSafe(F.col(f"existing.{col}")) for col in NATURAL_KEY]
+    return new.join(existing, condition, "left_anti")
 
 # ==============================================================================
-# CLEAN + CAST
+# LOAD (S3 PROCESSED ZONE)
 # ==============================================================================
-final_df = flattened_df.select(
-    F.col("coin_id"),
-    F.col("coin_symbol"),
-    F.col("price_usd").cast(DoubleType()),
-    F.col("market_cap_usd").cast(DoubleType()),
-    F.col("volume_24h_usd").cast(DoubleType()),
-    F.to_timestamp("source_timestamp").alias("source_timestamp"),
-    F.current_timestamp().alias("load_date")
-).filter(F.col("coin_id").isNotNull())
 
+def write_processed(final_df, mode):
+    """
+    Write right-sized, sorted Parquet files; `mode` is "overwrite" for a full
+    rebuild and "append" for an incremental run.
 
-print("Sample of processed data:")
-final_df.show(5)
+    Repartitioning on the partition columns sends each output partition to a
+    single task, and maxRecordsPerFile then splits it into files of roughly
+    TARGET_FILE_MB, so a partition no longer becomes one tiny file per
+    shuffle task. Rows are sorted by (coin_id, source_timestamp) within each
+    file, which keeps the Parquet min/max statistics of every row group
+    narrow enough for readers to skip row groups on coin or time filters.
+    The sort keys start with the partition columns so Spark's writer does
+    not re-sort (and scramble) the data. Appends add one set of files per
+    run to each date; a full rebuild compacts them again.
+    """
+    final_df \
+        .repartition(*PARTITION_COLUMNS) \
+        .sortWithinPartitions(*WRITE_SORT_COLUMNS) \
+        .write \
+        .mode(mode) \
+        .partitionBy(*PARTITION_COLUMNS) \
+        .option("compression", COMPRESSION) \
+        .option("maxRecordsPerFile", ROWS_PER_FILE) \
+        .option("parquet.block.size", ROW_GROUP_BYTES) \
+        .parquet(PROCESSED_PATH)
+
+
+def register_partitions(dates):
+    """
+    Add the partitions just written to the Data Catalog, so queries see them
+    without a crawler run. Full mode rewrote every date, so the dates come
+    from listing the output; incremental mode appended to exactly `dates`. With
+    PARTITION_BY_COIN the coin_id values are listed under those dates.
+    """
+    from catalog import list_partitions, register_processed_partitions
+
+    partition_keys = tuple(PARTITION_COLUMNS)
+    if dates is None or len(partition_keys) > 1:
+        partitions = list_partitions(boto3.client("s3"), PROCESSED_PATH, partition_keys, dates)
+    else:
+        partitions = dates
+    register_processed_partitions(
+        boto3.client("glue"), partitions, PROCESSED_PATH, partition_keys, args["GLUE_DATABASE"]
+    )
 
 # ==============================================================================
-# LOAD (S3 PROCESSED ZONE)
+# RUN
 # ==============================================================================
-final_df.write \
-    .mode("overwrite") \
-    .parquet("s3://julian-crypto-s3-bucket/processed/fact_market_data/")
+# Stage times are wall-clock on the driver; Spark is lazy, so reading and
+# transforming the data is mostly accounted to "write".
+run = RunMetrics("transform", dimensions={"mode": MODE})
+affected_dates = None
+with run.stage("discover"):
+    if MODE == "full":
+        raw_df = read_raw()
+    else:
+        # Only the new raw files are transformed and their rows appended as new
+        # part files, so files already in the processed zone (and loaded into
+        # RDS by key + ETag, see load_manifest.py) are never rewritten.
+        new_files = new_raw_files()
+        affected_dates = sorted(set(new_files.values()))
+        print(f"{len(new_files)} new raw file(s) for dates {affected_dates}")
+        raw_df = read_raw(new_files) if new_files else None
+
+if raw_df is None:
+    print("No new raw data since the last run; nothing to do.")
+else:
+    with run.stage("transform"):
+        final_df = transform_spark(raw_df)
+        if affected_dates is not None:
+            final_df = without_processed_rows(final_df, affected_dates)
+        print("Sample of processed data:")
+        final_df.show(5)
+    with run.stage("write"):
+        write_processed(final_df, "overwrite" if MODE == "full" else "append")
+
+with run.stage("commit"):
+    job.commit()
 
-job.commit()
+# After the commit, so a catalog problem can't fail a run whose data is written
+# and make the next run redo it; missed partitions can be added with
+# creation_glue_datacatlog_db.py --backfill
+catalog_error = None
+if REGISTER_PARTITIONS and raw_df is not None:
+    with run.stage("catalog"):
+        try:
+            register_partitions(affected_dates)
+        except Exception as e:
+            catalog_error = str(e)
+            print(f"ERROR: Partition registration failed ({e}); "
+                  "run creation_glue_datacatlog_db.py --backfill to register them")
+# catalog_error in the run record is what to alert on
+run.report(status="ok", dates=affected_dates, catalog_error=catalog_error)
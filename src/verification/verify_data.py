@@ -1,45 +1,386 @@
-import psycopg2
+"""
+Query and verify fact_market_data in RDS.
+
+Subcommands:
+    recent      most recently loaded rows (the default)
+    range       rows in a source_timestamp range, optionally for some coins
+    agg         OHLCV candles for one coin (served from the rollups when they
+                line up), or a per-coin summary of a time range
+    reconcile   compare row counts and checksums per dt partition between
+                the processed Parquet in S3 and RDS
+
+Rows are streamed from named (server-side) cursors, FETCH_ROWS at a time,
+so large results never sit in memory. reconcile reads only Parquet footers
+and the two checksummed columns, never whole files, and aggregates the
+database side in SQL; it exits 1 on any mismatch.
+
+Usage:
+    python src/verification/verify_data.py recent --limit 20
+    python src/verification/verify_data.py range --start 2026-01-01 --end 2026-01-02 --coin bitcoin --format csv
+    python src/verification/verify_data.py agg --start 2026-01-01 --end 2026-02-01 --coin bitcoin --interval 1d
+    python src/verification/verify_data.py reconcile --dates 2026-01-01 2026-01-02
+"""
+import argparse
+import csv
+import itertools
 import os
+import re
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from tabulate import tabulate # to display the data in a table format
 
-# Database configuration
-DB_HOST = os.getenv('DB_HOST', 'crypto-etl-db.c87yis8u2wwc.us-east-1.rds.amazonaws.com')
-DB_NAME = os.getenv('DB_NAME', 'postgres')
-DB_USER = os.getenv('DB_USER', 'postgres')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
+# Make the repo-root packages (src/, database/) importable when run as a script
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
 
-def verify_rds_data():
-    conn = None
-    try:
-        # Establish connection
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
+from database.connection import close_pool, get_connection, release_connection
+from database.rollups import OHLCV_COLUMNS, ohlcv_query
+from database.schema import FACT_TABLE
+from src.loading.parquet_stream import S3ObjectFile
+from src.loading.s3_cache import default_cache
+from src.loading.s3_fetch import list_objects
+
+# Database configuration comes from DB_HOST, DB_NAME, DB_USER, DB_PASSWORD
+# (see database/connection.py)
+
+# Processed zone to reconcile against (same defaults as the loader)
+S3_BUCKET = os.getenv('S3_BUCKET', 'julian-crypto-s3-bucket')
+S3_PREFIX = os.getenv('S3_PREFIX', 'processed/fact_market_data/')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
+# Concurrent Parquet footer/column reads during reconcile
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', '8'))
+# Rows per round trip from a server-side cursor (and per printed table page)
+FETCH_ROWS = int(os.getenv('VERIFY_FETCH_ROWS', '10000'))
+# Relative tolerance for the price_usd sums, which differ in float summation order
+SUM_TOLERANCE = 1e-9
+
+DT_RE = re.compile(r'dt=(\d{4}-\d{2}-\d{2})')
+INTERVAL_RE = re.compile(r'^(\d+)([mhdw])$')
+INTERVAL_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+
+
+# ==============================================================================
+# ARGUMENTS AND OUTPUT
+# ==============================================================================
+
+def parse_timestamp(value):
+    """ISO date/datetime -> naive UTC datetime (offsets are converted to UTC)."""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def parse_interval(value):
+    """'15m', '4h', '1d', '1w' -> timedelta."""
+    match = INTERVAL_RE.match(value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid interval '{value}' (expected e.g. 5m, 1h, 1d, 1w)")
+    return timedelta(**{INTERVAL_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def stream_query(conn, query, params=None):
+    """
+    Run a query on a named (server-side) cursor.
+
+    Returns:
+        (list of column names, iterator of row tuples fetched FETCH_ROWS at a time)
+    """
+    cursor = conn.cursor(name=f"verify_{uuid.uuid4().hex[:12]}")
+    cursor.itersize = FETCH_ROWS
+    cursor.execute(query, params)
+    # A named cursor only has a description after its first fetch
+    first = cursor.fetchmany(FETCH_ROWS)
+    columns = [desc[0] for desc in cursor.description]
+
+    def rows():
+        try:
+            yield from first
+            yield from cursor
+        finally:
+            cursor.close()
+
+    return columns, rows()
+
+
+def print_rows(columns, rows, output_format='table', title=None):
+    """Print rows as grid tables of FETCH_ROWS rows each, or as CSV; returns the row count."""
+    count = 0
+    if output_format == 'csv':
+        writer = csv.writer(sys.stdout)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+
+    while True:
+        page = list(itertools.islice(rows, FETCH_ROWS))
+        if not page:
+            break
+        if title and count == 0:
+            print(f"\n--- {title} ---")
+        print(tabulate(page, headers=columns, tablefmt='grid'))
+        count += len(page)
+    if count == 0:
+        print("No rows.")
+    return count
+
+
+# ==============================================================================
+# QUERIES
+# ==============================================================================
+
+def recent(conn, args):
+    """Most recently loaded rows (served by the load_date DESC index)."""
+    where = "WHERE coin_id = ANY(%(coins)s)" if args.coin else ""
+    query = f"SELECT * FROM {FACT_TABLE} {where} ORDER BY load_date DESC LIMIT %(limit)s"
+    columns, rows = stream_query(conn, query, {'coins': args.coin, 'limit': args.limit})
+    print_rows(columns, rows, args.format, title=f"Recent Records in {FACT_TABLE}")
+
+
+def time_range(conn, args):
+    """Rows with source_timestamp in [start, end), in time order."""
+    conditions = ["source_timestamp >= %(start)s"]
+    if args.end:
+        conditions.append("source_timestamp < %(end)s")
+    if args.coin:
+        conditions.append("coin_id = ANY(%(coins)s)")
+    query = (
+        f"SELECT {', '.join(args.columns)} FROM {FACT_TABLE} WHERE {' AND '.join(conditions)} "
+        f"ORDER BY source_timestamp, coin_id"
+    )
+    if args.limit:
+        query += " LIMIT %(limit)s"
+    params = {'start': args.start, 'end': args.end, 'coins': args.coin, 'limit': args.limit}
+    columns, rows = stream_query(conn, query, params)
+    count = print_rows(columns, rows, args.format)
+    print(f"{count} row(s)", file=sys.stderr)
+
+
+def aggregate(conn, args):
+    """OHLCV candles for a single coin, else a per-coin summary of [start, end)."""
+    if args.coin and len(args.coin) == 1:
+        # Streamed: with an explicit --interval the candle count is not bounded by --max-points
+        query, params, _ = ohlcv_query(args.coin[0], args.start, args.end, interval=args.interval,
+                                       max_points=args.max_points, table_name=FACT_TABLE)
+        _, rows = stream_query(conn, query, params)
+        print_rows(OHLCV_COLUMNS, rows, args.format, title=f"OHLCV for {args.coin[0]}")
+        return
+
+    conditions = ["source_timestamp >= %(start)s", "source_timestamp < %(end)s"]
+    if args.coin:
+        conditions.append("coin_id = ANY(%(coins)s)")
+    query = f"""
+        SELECT coin_id, count(*) AS ticks,
+               min(source_timestamp) AS first_tick, max(source_timestamp) AS last_tick,
+               min(price_usd) AS min_price, avg(price_usd) AS avg_price, max(price_usd) AS max_price,
+               avg(volume_24h_usd) AS avg_volume_24h
+        FROM {FACT_TABLE}
+        WHERE {' AND '.join(conditions)}
+        GROUP BY coin_id
+        ORDER BY coin_id
+    """
+    columns, rows = stream_query(conn, query, {'start': args.start, 'end': args.end, 'coins': args.coin})
+    print_rows(columns, rows, args.format, title=f"Per-coin summary {args.start} .. {args.end}")
+
+
+# ==============================================================================
+# RECONCILIATION
+# ==============================================================================
+
+def parquet_checksums(s3_client, bucket, obj, counts_only=False, cache=None):
+    """
+    Row count of one Parquet object from its footer and, unless counts_only,
+    the sum of source_timestamp in epoch microseconds (exact) and of price_usd,
+    reading only those two columns' chunks.
+
+    Returns:
+        dict: rows, ts_checksum (int or None), price_sum (float or None)
+    """
+    path = cache.lookup(bucket, obj) if cache is not None else None
+    source = pa.memory_map(path) if path else S3ObjectFile(s3_client, bucket, obj['Key'], size=obj.get('Size'))
+    parquet_file = pq.ParquetFile(source, pre_buffer=True)
+    result = {'rows': parquet_file.metadata.num_rows, 'ts_checksum': None, 'price_sum': None}
+    if counts_only:
+        return result
+
+    ts_checksum = 0
+    price_sum = 0.0
+    for batch in parquet_file.iter_batches(columns=['source_timestamp', 'price_usd']):
+        ts = batch.column(0)
+        ts = pc.cast(ts, pa.timestamp('us', tz=ts.type.tz)).cast(pa.int64())
+        # decimal128 sums cannot overflow, unlike int64 over billions of microseconds
+        ts_sum = pc.sum(pc.cast(ts, pa.decimal128(38, 0))).as_py()
+        ts_checksum += int(ts_sum or 0)
+        price_sum += pc.sum(batch.column(1)).as_py() or 0.0
+    result.update(ts_checksum=ts_checksum, price_sum=price_sum)
+    return result
+
+
+def s3_partition_checksums(s3_client, bucket, prefix, dates=None, counts_only=False, workers=FETCH_WORKERS):
+    """Per-dt totals of parquet_checksums over every object under the prefix."""
+    objects = []
+    for obj in list_objects(s3_client, bucket, prefix, suffix='.parquet'):
+        match = DT_RE.search(obj['Key'])
+        if match and (not dates or match.group(1) in dates):
+            objects.append((match.group(1), obj))
+
+    cache = default_cache()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reconcile') as executor:
+        results = executor.map(
+            lambda item: (item[0], parquet_checksums(s3_client, bucket, item[1], counts_only, cache)), objects
         )
-        cursor = conn.cursor()
-
-        # Query the most recent 5 records
-        query = "SELECT * FROM fact_market_data ORDER BY load_date DESC LIMIT 5;"
-        cursor.execute(query)
-        
-        # Fetch results and column names
-        rows = cursor.fetchall()
-        colnames = [desc[0] for desc in cursor.description]
-
-        # Display as a clean table
-        if rows:
-            print("\n--- Recent Records in fact_market_data ---")
-            print(tabulate(rows, headers=colnames, tablefmt='grid'))
-        else:
-            print("The table is empty.")
+        totals = {}
+        for dt, result in results:
+            total = totals.setdefault(dt, {'files': 0, 'rows': 0, 'ts_checksum': 0, 'price_sum': 0.0})
+            total['files'] += 1
+            total['rows'] += result['rows']
+            if not counts_only:
+                total['ts_checksum'] += result['ts_checksum']
+                total['price_sum'] += result['price_sum']
+    return totals
+
+
+def db_partition_checksums(conn, start, end, counts_only=False):
+    """Per-UTC-date row count and checksums over [start, end), computed in the database."""
+    checksums = "" if counts_only else """,
+               sum((extract(epoch FROM source_timestamp) * 1000000)::bigint) AS ts_checksum,
+               sum(price_usd) AS price_sum"""
+    query = f"""
+        SELECT to_char(source_timestamp, 'YYYY-MM-DD') AS dt, count(*) AS row_count{checksums}
+        FROM {FACT_TABLE}
+        WHERE source_timestamp >= %s AND source_timestamp < %s
+        GROUP BY 1
+    """
+    _, rows = stream_query(conn, query, (start, end))
+    totals = {}
+    for row in rows:
+        totals[row[0]] = {
+            'rows': row[1],
+            'ts_checksum': int(row[2] or 0) if not counts_only else None,
+            'price_sum': float(row[3] or 0.0) if not counts_only else None,
+        }
+    return totals
+
+
+def reconcile(conn, args):
+    """
+    Compare S3 and RDS per dt partition.
+
+    Returns:
+        int: 0 if every partition matches, 1 otherwise.
+    """
+    import boto3
+
+    s3_client = boto3.client('s3', endpoint_url=S3_ENDPOINT_URL)
+    s3_totals = s3_partition_checksums(s3_client, args.bucket, args.prefix, set(args.dates or []),
+                                       args.counts_only, args.workers)
+    dates = sorted(set(s3_totals) | set(args.dates or []))
+    if not dates:
+        print(f"No Parquet partitions found under s3://{args.bucket}/{args.prefix}")
+        return 0
+    start = datetime.fromisoformat(dates[0])
+    end = datetime.fromisoformat(dates[-1]) + timedelta(days=1)
+    db_totals = db_partition_checksums(conn, start, end, args.counts_only)
 
+    table = []
+    mismatches = 0
+    for dt in dates:
+        s3 = s3_totals.get(dt, {'files': 0, 'rows': 0, 'ts_checksum': 0, 'price_sum': 0.0})
+        db = db_totals.get(dt, {'rows': 0, 'ts_checksum': 0, 'price_sum': 0.0})
+        ok = s3['rows'] == db['rows']
+        row = [dt, s3['files'], s3['rows'], db['rows'], db['rows'] - s3['rows']]
+        if not args.counts_only:
+            ts_ok = s3['ts_checksum'] == db['ts_checksum']
+            price_ok = abs(s3['price_sum'] - db['price_sum']) <= SUM_TOLERANCE * max(abs(s3['price_sum']), 1.0)
+            ok = ok and ts_ok and price_ok
+            row += ['ok' if ts_ok else 'DIFF', 'ok' if price_ok else 'DIFF']
+        row.append('OK' if ok else 'MISMATCH')
+        mismatches += not ok
+        table.append(row)
+
+    headers = ['dt', 'files', 's3_rows', 'db_rows', 'diff']
+    if not args.counts_only:
+        headers += ['ts_checksum', 'price_sum']
+    print(tabulate(table, headers=headers + ['status'], tablefmt='grid'))
+    # Rows rejected by the loader's data-quality rules are in S3 but not in RDS
+    print(f"{len(dates) - mismatches}/{len(dates)} partition(s) match")
+    return 1 if mismatches else 0
+
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command')
+
+    def add_output(sub):
+        sub.add_argument('--format', choices=['table', 'csv'], default='table')
+
+    sub = subparsers.add_parser('recent', help='most recently loaded rows')
+    sub.add_argument('--limit', type=int, default=5)
+    sub.add_argument('--coin', nargs='*', help='coin_id(s) to filter on')
+    add_output(sub)
+    sub.set_defaults(func=recent)
+
+    sub = subparsers.add_parser('range', help='rows in a source_timestamp range')
+    sub.add_argument('--start', type=parse_timestamp, required=True, help='inclusive, ISO date/time (UTC)')
+    sub.add_argument('--end', type=parse_timestamp, help='exclusive, ISO date/time (UTC)')
+    sub.add_argument('--coin', nargs='*', help='coin_id(s) to filter on')
+    sub.add_argument('--columns', nargs='*', default=['*'],
+                     choices=['*', 'coin_id', 'coin_symbol', 'price_usd', 'market_cap_usd', 'volume_24h_usd',
+                              'source_timestamp', 'load_date'])
+    sub.add_argument('--limit', type=int, help='maximum rows (default: all, streamed)')
+    add_output(sub)
+    sub.set_defaults(func=time_range)
+
+    sub = subparsers.add_parser('agg', help='OHLCV candles for one coin, or a per-coin summary')
+    sub.add_argument('--start', type=parse_timestamp, required=True)
+    sub.add_argument('--end', type=parse_timestamp, required=True)
+    sub.add_argument('--coin', nargs='*', help='one coin_id for candles; none or several for the summary')
+    sub.add_argument('--interval', type=parse_interval, help='candle width, e.g. 5m, 1h, 1d (default: from --max-points)')
+    sub.add_argument('--max-points', type=int, default=500)
+    add_output(sub)
+    sub.set_defaults(func=aggregate)
+
+    sub = subparsers.add_parser('reconcile', help='compare S3 Parquet and RDS per dt partition')
+    sub.add_argument('--bucket', default=S3_BUCKET)
+    sub.add_argument('--prefix', default=S3_PREFIX)
+    sub.add_argument('--dates', nargs='*', help='dt partitions to check (default: all in S3)')
+    sub.add_argument('--counts-only', action='store_true', help='compare footer row counts only')
+    sub.add_argument('--workers', type=int, default=FETCH_WORKERS)
+    sub.set_defaults(func=reconcile)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args(['recent'] + (argv if argv is not None else sys.argv[1:]))
+
+    conn = None
+    try:
+        # Borrow a connection from the shared pool
+        conn = get_connection()
+        return args.func(conn, args) or 0
     except Exception as e:
-        print(f"Error querying database: {e}")
+        print(f"Error querying database: {e}", file=sys.stderr)
+        return 1
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
+        close_pool()
 
 if __name__ == "__main__":
-    verify_rds_data()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Round trips of the binary COPY encoder (arrow_copy.encode_binary_copy).
+
+Payloads are decoded by a small reader of PostgreSQL's binary COPY format
+and compared with the input batch. With DB_PASSWORD set, a batch is also
+COPYed into a temp table and compared with the CSV COPY path.
+"""
+import io
+import os
+import struct
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.loading.arrow_copy import PGCOPY_HEADER, PGCOPY_TRAILER, encode_binary_copy
+from src.loading.copy_loader import build_copy_sql, dataframe_to_csv_buffer
+
+PG_EPOCH = datetime(2000, 1, 1)
+
+
+# ==============================================================================
+# DECODER
+# ==============================================================================
+
+def _decoder(arrow_type):
+    if pa.types.is_timestamp(arrow_type):
+        return lambda raw: PG_EPOCH + timedelta(microseconds=struct.unpack('>q', raw)[0])
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return lambda raw: raw.decode('utf-8')
+    formats = {pa.float64(): '>d', pa.float32(): '>f', pa.int64(): '>q', pa.int32(): '>i', pa.int16(): '>h',
+               pa.bool_(): '>?'}
+    return lambda raw: struct.unpack(formats[arrow_type], raw)[0]
+
+
+def decode_binary_copy(payload, schema):
+    """Rows of a binary COPY payload as lists of Python values (timestamps naive UTC)."""
+    assert payload.startswith(PGCOPY_HEADER) and payload.endswith(PGCOPY_TRAILER)
+    decoders = [_decoder(field.type) for field in schema]
+    position = len(PGCOPY_HEADER)
+    end = len(payload) - len(PGCOPY_TRAILER)
+    rows = []
+    while position < end:
+        (fields,) = struct.unpack_from('>h', payload, position)
+        assert fields == len(schema)
+        position += 2
+        row = []
+        for decode in decoders:
+            (length,) = struct.unpack_from('>i', payload, position)
+            position += 4
+            if length == -1:
+                row.append(None)
+                continue
+            row.append(decode(payload[position:position + length]))
+            position += length
+        rows.append(row)
+    assert position == end
+    return rows
+
+
+def expected_rows(batch):
+    """The batch as rows, with timestamps as naive UTC like PostgreSQL's TIMESTAMP."""
+    def naive(value):
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    columns = [[naive(value) for value in column.to_pylist()] for column in batch.columns]
+    return [list(row) for row in zip(*columns)]
+
+
+def round_trip(batch):
+    return decode_binary_copy(encode_binary_copy(batch), batch.schema)
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+UTC_TIMES = [datetime(2026, 1, 1, 12, 30, 15, 123456), datetime(1999, 12, 31, 23, 59, 59), None,
+             datetime(2026, 6, 30, 0, 0), datetime(2000, 1, 1)]
+
+
+def all_types_batch():
+    """Five rows over every supported type, with a NULL in each column."""
+    return pa.RecordBatch.from_pydict({
+        'f64': pa.array([1.5, None, -0.0, 1e300, float('inf')], pa.float64()),
+        'f32': pa.array([None, 2.5, -1.25, 0.0, 3.0], pa.float32()),
+        'i64': pa.array([2**62, None, -1, 0, -(2**63)], pa.int64()),
+        'i32': pa.array([None, 2**31 - 1, -(2**31), 7, 0], pa.int32()),
+        'i16': pa.array([1, -1, None, 2**15 - 1, -(2**15)], pa.int16()),
+        'flag': pa.array([True, False, None, True, False], pa.bool_()),
+        'text': pa.array(['bitcoin', '', None, 'ß∂ƒ ₿ 🚀', 'x' * 300], pa.string()),
+        'large_text': pa.array([None, 'ethereum', '', '日本語', 'a'], pa.large_string()),
+        'ts': pa.array(UTC_TIMES, pa.timestamp('us')),
+        'ts_utc': pa.array(UTC_TIMES, pa.timestamp('us', tz='UTC')),
+        'ts_ns': pa.array(UTC_TIMES, pa.timestamp('ns')),
+    })
+
+
+# ==============================================================================
+# ENCODER ROUND TRIPS
+# ==============================================================================
+
+def test_every_type_round_trips_with_nulls():
+    batch = all_types_batch()
+    assert round_trip(batch) == expected_rows(batch)
+
+
+def test_rows_of_nulls_and_empty_strings():
+    batch = pa.RecordBatch.from_pydict({
+        'text': pa.array([None, '', None], pa.string()),
+        'f64': pa.array([None, None, None], pa.float64()),
+        'ts': pa.nulls(3, pa.timestamp('us')),
+    })
+    assert round_trip(batch) == [[None, None, None], ['', None, None], [None, None, None]]
+
+
+def test_all_null_string_column_without_a_data_buffer():
+    batch = pa.RecordBatch.from_arrays([pa.nulls(2, pa.string())], names=['text'])
+    assert round_trip(batch) == [[None], [None]]
+
+
+def test_empty_batch_is_header_and_trailer_only():
+    batch = all_types_batch().slice(0, 0)
+    assert encode_binary_copy(batch) == PGCOPY_HEADER + PGCOPY_TRAILER
+
+
+@pytest.mark.parametrize('offset, length', [(1, 3), (2, 3), (4, 1)])
+def test_sliced_batches_round_trip(offset, length):
+    sliced = all_types_batch().slice(offset, length)
+    assert sliced.column(0).offset == offset
+    assert round_trip(sliced) == expected_rows(sliced)
+
+
+def test_tz_aware_timestamps_are_written_as_utc():
+    instant = datetime(2026, 3, 8, 6, 30, tzinfo=timezone.utc)
+    batch = pa.RecordBatch.from_pydict({
+        'ts_ny': pa.array([instant], pa.timestamp('us', tz='America/New_York')),
+        'ts_tokyo': pa.array([instant], pa.timestamp('ms', tz='Asia/Tokyo')),
+    })
+    assert round_trip(batch) == [[datetime(2026, 3, 8, 6, 30), datetime(2026, 3, 8, 6, 30)]]
+
+
+def test_unsupported_types_raise():
+    batch = pa.RecordBatch.from_pydict({'d': pa.array([1], pa.decimal128(5, 2))})
+    with pytest.raises(TypeError, match='decimal'):
+        encode_binary_copy(batch)
+
+
+# ==============================================================================
+# DATABASE ROUND TRIP (binary COPY vs CSV COPY)
+# ==============================================================================
+
+@pytest.fixture
+def connection():
+    if not os.getenv('DB_PASSWORD'):
+        pytest.skip('DB_PASSWORD is not set')
+    import psycopg2
+
+    from database.connection import get_connection_settings
+
+    conn = psycopg2.connect(**get_connection_settings())
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+FACT_COLUMNS_SQL = 'coin_id TEXT, price_usd DOUBLE PRECISION, qty BIGINT, source_timestamp TIMESTAMP'
+
+
+def test_binary_copy_matches_csv_copy(connection):
+    # The first row is sliced off, so every column starts at a non-zero offset
+    batch = pa.RecordBatch.from_pydict({
+        'coin_id': pa.array(['sliced-off', 'bitcoin', '', None, 'ß∂ƒ ₿ 🚀', 'dogecoin', 'x,"y"\nz'], pa.string()),
+        'price_usd': pa.array([9.0, 97000.123456789, None, 0.1, 1e-9, -0.0, 2.5], pa.float64()),
+        'qty': pa.array([9, 1, None, -(2**63), 2**63 - 1, 0, 5], pa.int64()),
+        'source_timestamp': pa.array(
+            [datetime(2020, 1, 1, tzinfo=timezone.utc),
+             datetime(2026, 1, 1, 12, 30, 15, 123456, tzinfo=timezone.utc), None,
+             datetime(1999, 12, 31, 23, 59, 59, tzinfo=timezone.utc), datetime(2000, 1, 1, tzinfo=timezone.utc),
+             datetime(2026, 6, 30, tzinfo=timezone.utc), datetime(1970, 1, 1, tzinfo=timezone.utc)],
+            pa.timestamp('us', tz='UTC'),
+        ),
+    }).slice(1)
+    columns = batch.schema.names
+    cursor = connection.cursor()
+    cursor.execute(f'CREATE TEMP TABLE copy_binary (row_id SERIAL, {FACT_COLUMNS_SQL})')
+    cursor.execute(f'CREATE TEMP TABLE copy_csv (row_id SERIAL, {FACT_COLUMNS_SQL})')
+
+    column_names = ','.join(f'"{col}"' for col in columns)
+    cursor.copy_expert(f'COPY copy_binary ({column_names}) FROM STDIN WITH (FORMAT binary)',
+                       io.BytesIO(encode_binary_copy(batch)))
+
+    frame = batch.to_pandas(types_mapper=pd.ArrowDtype)
+    frame['source_timestamp'] = frame['source_timestamp'].astype('datetime64[us, UTC]').dt.tz_localize(None)
+    cursor.copy_expert(build_copy_sql('copy_csv', columns), dataframe_to_csv_buffer(frame))
+
+    select = f'SELECT {column_names} FROM {{}} ORDER BY row_id'
+    cursor.execute(select.format('copy_binary'))
+    binary_rows = [list(row) for row in cursor.fetchall()]
+    cursor.execute(select.format('copy_csv'))
+    csv_rows = [list(row) for row in cursor.fetchall()]
+
+    assert binary_rows == expected_rows(batch)
+    assert binary_rows == csv_rows
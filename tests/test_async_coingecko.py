@@ -0,0 +1,168 @@
+"""
+fetch_markets against a local mock of CoinGecko's /coins/markets, served by
+aiohttp on a background thread with COINGECKO_BASE_URL pointed at it.
+"""
+import asyncio
+import importlib
+import threading
+import time
+
+import pytest
+from aiohttp import web
+
+from src.extract import async_coingecko
+
+PER_PAGE = async_coingecko.PER_PAGE
+
+
+class MockCoinGecko:
+    """
+    Serves /coins/markets pages and records every request as (monotonic time, query).
+
+    `failures` maps a page number to responses (status, headers) returned, in
+    order, before that page succeeds; `delays` maps a page (or, for ids
+    requests, the first id) to seconds slept before answering.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.failures = {}
+        self.delays = {}
+        self.url = None
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    async def markets(self, request):
+        query = dict(request.query)
+        self.requests.append((time.monotonic(), query))
+        page = int(query['page'])
+        pending = self.failures.get(page)
+        if pending:
+            status, headers = pending.pop(0)
+            return web.Response(status=status, headers=headers)
+        if 'ids' in query:
+            ids = query['ids'].split(',')
+            await asyncio.sleep(self.delays.get(ids[0], 0))
+        else:
+            await asyncio.sleep(self.delays.get(page, 0))
+            ids = [f"coin-{rank}" for rank in range((page - 1) * PER_PAGE + 1, page * PER_PAGE + 1)]
+        return web.json_response([{'id': coin_id, 'page': page} for coin_id in ids])
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get('/api/v3/coins/markets', self.markets)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}/api/v3"
+        self._started.set()
+        self._loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+        self._started.wait(5)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    server = MockCoinGecko()
+    server.start()
+    monkeypatch.setenv('COINGECKO_BASE_URL', server.url)
+    monkeypatch.delenv('COINGECKO_API_KEY', raising=False)
+    # The base URL is read at import time
+    module = importlib.reload(async_coingecko)
+    yield server, module
+    server.stop()
+    monkeypatch.undo()
+    importlib.reload(async_coingecko)
+
+
+def test_token_bucket_caps_request_rate(api):
+    server, module = api
+    # 10 pages at 300/min (5/s), bursting up to the concurrency of 2
+    module.fetch_markets(top_n=10 * PER_PAGE, requests_per_minute=300, concurrency=2)
+
+    times = sorted(at for at, _ in server.requests)
+    assert len(times) == 10
+    # After the burst of 2, the remaining 8 requests are spaced by 1/rate
+    assert times[-1] - times[0] >= 8 / 5 * 0.9
+    for window_start in times:
+        in_window = [at for at in times if window_start <= at < window_start + 1.0]
+        assert len(in_window) <= 5 + 2
+
+
+def test_retry_after_is_honoured_on_429(api):
+    server, module = api
+    server.failures[1] = [(429, {'Retry-After': '1'})]
+
+    records = module.fetch_markets(top_n=PER_PAGE, requests_per_minute=6000)
+
+    assert len(records) == PER_PAGE
+    (first, _), (second, _) = server.requests
+    assert second - first >= 0.95
+
+
+@pytest.mark.parametrize('status', [500, 502, 503, 504])
+def test_5xx_is_retried_with_backoff(api, monkeypatch, status):
+    server, module = api
+    server.failures[2] = [(status, {}), (status, {})]
+    delays = []
+    monkeypatch.setattr(module, '_retry_delay', lambda attempt, retry_after=None: delays.append(attempt) or 0.01)
+
+    records = module.fetch_markets(top_n=2 * PER_PAGE, requests_per_minute=6000)
+
+    assert len(records) == 2 * PER_PAGE
+    assert [query['page'] for _, query in server.requests].count('2') == 3
+    # Each retry backs off from the attempt that failed
+    assert delays == [0, 1]
+
+
+def test_5xx_gives_up_after_max_retries(api, monkeypatch):
+    server, module = api
+    monkeypatch.setattr(module, 'MAX_RETRIES', 2)
+    monkeypatch.setattr(module, '_retry_delay', lambda attempt, retry_after=None: 0.01)
+    server.failures[1] = [(503, {})] * 3
+
+    with pytest.raises(RuntimeError, match='failed after 3 attempts'):
+        module.fetch_markets(top_n=PER_PAGE, requests_per_minute=6000)
+
+
+def test_retry_delay_backs_off_exponentially_and_caps():
+    assert async_coingecko._retry_delay(0, '7') == 7
+    assert async_coingecko._retry_delay(0, '600') == 60
+    for attempt in range(8):
+        delay = async_coingecko._retry_delay(attempt)
+        assert min(60, 2 ** attempt) * 0.5 <= delay <= min(60, 2 ** attempt)
+
+
+def test_pages_keep_market_cap_order(api):
+    server, module = api
+    # Earlier pages answer last, so completion order is the reverse of page order
+    server.delays = {1: 0.3, 2: 0.2, 3: 0.1}
+
+    records = module.fetch_markets(top_n=2 * PER_PAGE + 10, requests_per_minute=6000, concurrency=3)
+
+    assert sorted(int(query['page']) for _, query in server.requests) == [1, 2, 3]
+    assert [record['id'] for record in records] == [f"coin-{rank}" for rank in range(1, 2 * PER_PAGE + 11)]
+
+
+def test_coin_ids_are_chunked_per_page_in_order(api):
+    server, module = api
+    coin_ids = [f"id-{i}" for i in range(2 * PER_PAGE + 1)]
+    server.delays = {'id-0': 0.2, f"id-{PER_PAGE}": 0.1}
+
+    records = module.fetch_markets(coin_ids=coin_ids, requests_per_minute=6000)
+
+    chunks = sorted((query['ids'].split(',') for _, query in server.requests), key=len, reverse=True)
+    assert [len(chunk) for chunk in chunks] == [PER_PAGE, PER_PAGE, 1]
+    assert all(query['page'] == '1' and query['per_page'] == str(PER_PAGE) for _, query in server.requests)
+    assert [record['id'] for record in records] == coin_ids
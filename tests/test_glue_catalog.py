@@ -0,0 +1,205 @@
+"""
+Crawler-free Glue Data Catalog registration (src/glue/catalog.py and
+GlueWrapper) against moto's Glue and S3.
+"""
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from src.common import schema_registry
+from src.glue import catalog
+from src.glue.creating_aws_glue_crawler import BATCH_CREATE_PARTITION_MAX, GlueWrapper
+
+BUCKET = 'catalog-test-bucket'
+RAW_PATH = f's3://{BUCKET}/raw/'
+PROCESSED_PATH = f's3://{BUCKET}/processed/fact_market_data/'
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    for name, value in (('AWS_ACCESS_KEY_ID', 'testing'), ('AWS_SECRET_ACCESS_KEY', 'testing'),
+                        ('AWS_SESSION_TOKEN', 'testing'), ('AWS_DEFAULT_REGION', 'us-east-1')):
+        monkeypatch.setenv(name, value)
+    with mock_aws():
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket=BUCKET)
+        yield boto3.client('glue'), s3
+
+
+class CountingGlue:
+    """Glue client proxy that counts batch_create_partition requests."""
+
+    def __init__(self, client):
+        self.client = client
+        self.batches = []
+
+    def batch_create_partition(self, **kwargs):
+        self.batches.append(len(kwargs['PartitionInputList']))
+        return self.client.batch_create_partition(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def partition_values(glue, table=catalog.PROCESSED_TABLE):
+    paginator = glue.get_paginator('get_partitions')
+    pages = paginator.paginate(DatabaseName=catalog.GLUE_DATABASE, TableName=table)
+    return sorted(tuple(partition['Values']) for page in pages for partition in page['Partitions'])
+
+
+def dates(count):
+    return [f"2026-{month:02d}-{day:02d}" for month in range(1, 13) for day in range(1, 29)][:count]
+
+
+# ==============================================================================
+# BOOTSTRAP
+# ==============================================================================
+
+def test_bootstrap_is_idempotent(aws):
+    glue, _ = aws
+
+    first = catalog.bootstrap_catalog(glue, RAW_PATH, PROCESSED_PATH)
+    second = catalog.bootstrap_catalog(glue, RAW_PATH, PROCESSED_PATH)
+
+    assert first == {catalog.GLUE_DATABASE: 'created', catalog.RAW_TABLE: 'created', catalog.PROCESSED_TABLE: 'created'}
+    assert set(second.values()) == {'unchanged'}
+    table = glue.get_table(DatabaseName=catalog.GLUE_DATABASE, Name=catalog.PROCESSED_TABLE)['Table']
+    assert [column['Name'] for column in table['StorageDescriptor']['Columns']] == schema_registry.column_names()
+    assert [key['Name'] for key in table['PartitionKeys']] == ['dt']
+    assert table['StorageDescriptor']['Location'] == PROCESSED_PATH
+
+
+def test_bootstrap_updates_tables_after_a_registry_change(aws, monkeypatch):
+    glue, _ = aws
+    catalog.bootstrap_catalog(glue, RAW_PATH, PROCESSED_PATH)
+    monkeypatch.setattr(schema_registry, 'SCHEMA_VERSION', 2)
+    monkeypatch.setattr(schema_registry, 'COLUMNS', schema_registry.COLUMNS + [
+        schema_registry.Column('price_change_pct_24h', 'price_change_percentage_24h', 'double', 'DOUBLE PRECISION', 2),
+    ])
+    monkeypatch.setattr(catalog, 'SCHEMA_VERSION', 2)
+
+    outcome = catalog.bootstrap_catalog(glue, RAW_PATH, PROCESSED_PATH)
+
+    assert outcome == {catalog.GLUE_DATABASE: 'unchanged', catalog.RAW_TABLE: 'updated', catalog.PROCESSED_TABLE: 'updated'}
+    table = glue.get_table(DatabaseName=catalog.GLUE_DATABASE, Name=catalog.PROCESSED_TABLE)['Table']
+    assert table['StorageDescriptor']['Columns'][-1] == {'Name': 'price_change_pct_24h', 'Type': 'double'}
+    assert table['Parameters']['schema_version'] == '2'
+
+
+def test_raw_table_uses_partition_projection(aws):
+    glue, _ = aws
+    catalog.bootstrap_catalog(glue, RAW_PATH, PROCESSED_PATH)
+
+    table = glue.get_table(DatabaseName=catalog.GLUE_DATABASE, Name=catalog.RAW_TABLE)['Table']
+
+    assert table['Parameters']['projection.enabled'] == 'true'
+    assert table['Parameters']['storage.location.template'] == RAW_PATH + 'dt=${dt}/hour=${hour}/'
+    assert partition_values(glue, catalog.RAW_TABLE) == []
+
+
+# ==============================================================================
+# PARTITIONS
+# ==============================================================================
+
+def test_batch_create_partition_chunks_and_skips_existing(aws):
+    glue, _ = aws
+    catalog.bootstrap_catalog(glue, RAW_PATH, PROCESSED_PATH)
+    table_input = catalog.processed_table_input(PROCESSED_PATH)
+    counting = CountingGlue(glue)
+    wrapper = GlueWrapper(counting)
+
+    created = wrapper.batch_create_partition(
+        catalog.GLUE_DATABASE, catalog.PROCESSED_TABLE, catalog.partition_inputs(table_input, [(dt,) for dt in dates(40)])
+    )
+    assert created == 40
+
+    # 250 partitions, the first 40 already registered and 10 listed twice
+    values = [(dt,) for dt in dates(250)] + [(dt,) for dt in dates(10)]
+    counting.batches.clear()
+    created = wrapper.batch_create_partition(
+        catalog.GLUE_DATABASE, catalog.PROCESSED_TABLE, catalog.partition_inputs(table_input, values)
+    )
+
+    assert created == 210
+    assert counting.batches == [BATCH_CREATE_PARTITION_MAX, BATCH_CREATE_PARTITION_MAX, 60]
+    assert partition_values(glue) == sorted((dt,) for dt in dates(250))
+
+
+def test_batch_create_partition_raises_on_other_partition_errors():
+    class FailingGlue:
+        def batch_create_partition(self, **kwargs):
+            values = [partition['Values'] for partition in kwargs['PartitionInputList']]
+            return {'Errors': [
+                {'PartitionValues': values[0], 'ErrorDetail': {'ErrorCode': 'AlreadyExistsException'}},
+                {'PartitionValues': values[1], 'ErrorDetail': {'ErrorCode': 'InternalServiceException',
+                                                               'ErrorMessage': 'try again'}},
+            ]}
+
+    partitions = [{'Values': [dt], 'StorageDescriptor': {}} for dt in dates(3)]
+    with pytest.raises(RuntimeError, match='InternalServiceException'):
+        GlueWrapper(FailingGlue()).batch_create_partition('db', 'table', partitions)
+
+
+def test_batch_create_partition_raises_for_a_missing_table(aws):
+    glue, _ = aws
+    table_input = catalog.processed_table_input(PROCESSED_PATH)
+
+    with pytest.raises(ClientError) as excinfo:
+        GlueWrapper(glue).batch_create_partition(
+            catalog.GLUE_DATABASE, catalog.PROCESSED_TABLE, catalog.partition_inputs(table_input, [('2026-01-01',)])
+        )
+    assert excinfo.value.response['Error']['Code'] == 'EntityNotFoundException'
+
+
+def test_register_processed_partitions_sets_locations(aws):
+    glue, _ = aws
+    catalog.bootstrap_catalog(glue, RAW_PATH, PROCESSED_PATH)
+
+    assert catalog.register_processed_partitions(glue, ['2026-01-02', '2026-01-01'], PROCESSED_PATH) == 2
+    assert catalog.register_processed_partitions(glue, ['2026-01-02'], PROCESSED_PATH) == 0
+
+    partition = glue.get_partition(DatabaseName=catalog.GLUE_DATABASE, TableName=catalog.PROCESSED_TABLE,
+                                   PartitionValues=['2026-01-01'])['Partition']
+    assert partition['StorageDescriptor']['Location'] == PROCESSED_PATH + 'dt=2026-01-01/'
+    assert partition_values(glue) == [('2026-01-01',), ('2026-01-02',)]
+
+
+# ==============================================================================
+# S3 LISTING
+# ==============================================================================
+
+def put_objects(s3, keys):
+    for key in keys:
+        s3.put_object(Bucket=BUCKET, Key=key, Body=b'x')
+
+
+def test_list_partitions_by_date(aws):
+    _, s3 = aws
+    put_objects(s3, [
+        'processed/fact_market_data/dt=2026-01-01/part-00000.parquet',
+        'processed/fact_market_data/dt=2026-01-01/part-00001.parquet',
+        'processed/fact_market_data/dt=2026-01-02/part-00000.parquet',
+        'processed/fact_market_data/_SUCCESS',
+        'processed/other/dt=2026-01-03/part-00000.parquet',
+    ])
+
+    assert catalog.list_partitions(s3, PROCESSED_PATH) == [('2026-01-01',), ('2026-01-02',)]
+    assert catalog.list_partitions(s3, PROCESSED_PATH, dates=['2026-01-02', '2026-01-05']) == [('2026-01-02',)]
+
+
+def test_list_partitions_by_date_and_coin(aws):
+    _, s3 = aws
+    put_objects(s3, [
+        'processed/fact_market_data/dt=2026-01-01/coin_id=bitcoin/part-00000.parquet',
+        'processed/fact_market_data/dt=2026-01-01/coin_id=ethereum/part-00000.parquet',
+        'processed/fact_market_data/dt=2026-01-02/coin_id=bitcoin/part-00000.parquet',
+    ])
+    keys = ('dt', 'coin_id')
+
+    assert catalog.list_partitions(s3, PROCESSED_PATH, keys) == [
+        ('2026-01-01', 'bitcoin'), ('2026-01-01', 'ethereum'), ('2026-01-02', 'bitcoin'),
+    ]
+    assert catalog.list_partitions(s3, PROCESSED_PATH, keys, dates=['2026-01-01']) == [
+        ('2026-01-01', 'bitcoin'), ('2026-01-01', 'ethereum'),
+    ]
@@ -0,0 +1,67 @@
+"""
+RunMetrics per-stage memory: peak_rss_mb is sampled while each stage runs,
+not the process high-water mark.
+"""
+import sys
+import time
+
+import pytest
+
+from src.common.instrumentation import RunMetrics, current_rss_mb
+
+pytestmark = pytest.mark.skipif(current_rss_mb() is None, reason='needs /proc/self/statm')
+
+SPIKE_MB = 200
+
+
+def allocate(mb, hold_seconds=0.0):
+    # Large allocations are mmapped, so freeing them returns the memory to the OS
+    block = bytearray(mb * 1024 * 1024)
+    for offset in range(0, len(block), 4096):
+        block[offset] = 1
+    time.sleep(hold_seconds)
+    del block
+
+
+def test_later_stage_does_not_inherit_an_earlier_peak():
+    run = RunMetrics('test')
+    with run.stage('big'):
+        allocate(SPIKE_MB)
+    with run.stage('small'):
+        allocate(1)
+
+    stages = run.as_dict()['stages']
+    assert stages['big']['peak_rss_mb'] - stages['small']['peak_rss_mb'] > SPIKE_MB * 0.8
+    if sys.platform.startswith('linux'):
+        # The process peak still includes the spike
+        assert run.as_dict()['peak_rss_mb'] >= stages['big']['peak_rss_mb'] - 1
+
+
+def test_sampler_catches_a_spike_freed_before_the_stage_ends():
+    run = RunMetrics('test', rss_sample_interval=0.01)
+    baseline = current_rss_mb()
+    with run.stage('spike'):
+        allocate(SPIKE_MB, hold_seconds=0.2)
+
+    stats = run.as_dict()['stages']['spike']
+    assert stats['peak_rss_mb'] - baseline > SPIKE_MB * 0.8
+    assert abs(stats['rss_delta_mb']) < SPIKE_MB * 0.2
+
+
+def test_sampler_thread_stops_when_no_stage_is_open():
+    run = RunMetrics('test', rss_sample_interval=0.01)
+    with run.stage('outer'):
+        with run.stage('inner'):
+            assert run._sampler is not None
+    time.sleep(0.1)
+
+    assert run._sampler is None
+    assert run._open_stages == {}
+
+
+def test_sampling_can_be_disabled():
+    run = RunMetrics('test', rss_sample_interval=0)
+    with run.stage('only-ends'):
+        assert run._sampler is None
+
+    assert run.as_dict()['stages']['only-ends']['peak_rss_mb'] is not None
@@ -0,0 +1,72 @@
+"""
+local_transform.write_partition overwrite semantics on moto's S3.
+"""
+import boto3
+import pyarrow as pa
+import pytest
+from moto import mock_aws
+
+from src.transformation.local_transform import write_partition
+from src.transformation.staging_transform import transform_arrow
+
+BUCKET = 'local-transform-bucket'
+OUTPUT = f's3://{BUCKET}/processed/fact_market_data/'
+PREFIX = 'processed/fact_market_data/dt=2026-01-01/'
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name, value in (('AWS_ACCESS_KEY_ID', 'testing'), ('AWS_SECRET_ACCESS_KEY', 'testing'),
+                        ('AWS_SESSION_TOKEN', 'testing'), ('AWS_DEFAULT_REGION', 'us-east-1')):
+        monkeypatch.setenv(name, value)
+    with mock_aws():
+        client = boto3.client('s3')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+class UndeletableS3:
+    """S3 client proxy whose delete_objects reports every key as not deleted."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def delete_objects(self, Bucket, Delete):
+        return {'Errors': [{'Key': obj['Key'], 'Code': 'AccessDenied', 'Message': 'Access Denied'}
+                           for obj in Delete['Objects']]}
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def fact_table(rows):
+    raw = pa.table({
+        'id': [f'coin-{i}' for i in range(rows)],
+        'current_price': [float(i + 1) for i in range(rows)],
+        'ingestion_timestamp': [f'2026-01-01T00:{i:02d}:00Z' for i in range(rows)],
+        'dt': ['2026-01-01'] * rows,
+    })
+    return transform_arrow(raw)
+
+
+def keys(s3):
+    return sorted(obj['Key'] for obj in s3.list_objects_v2(Bucket=BUCKET, Prefix=PREFIX).get('Contents', []))
+
+
+def test_write_partition_replaces_previous_files(s3):
+    write_partition(fact_table(5), '2026-01-01', OUTPUT, s3, rows_per_file=2, row_group_rows=2)
+    first = keys(s3)
+
+    written = write_partition(fact_table(3), '2026-01-01', OUTPUT, s3, rows_per_file=2, row_group_rows=2)
+
+    assert len(first) == 3
+    assert written == 2
+    assert len(keys(s3)) == 2
+    assert not set(first) & set(keys(s3))
+
+
+def test_write_partition_raises_when_replaced_files_remain(s3):
+    write_partition(fact_table(2), '2026-01-01', OUTPUT, s3, rows_per_file=10, row_group_rows=10)
+
+    with pytest.raises(RuntimeError, match=r'Could not delete 1 replaced file\(s\) of dt=2026-01-01.*AccessDenied'):
+        write_partition(fact_table(2), '2026-01-01', OUTPUT, UndeletableS3(s3), rows_per_file=10, row_group_rows=10)
@@ -0,0 +1,74 @@
+"""
+Rows with a NULL natural key: quarantined by the validator's NotNull rules
+when data-quality checks run, dropped by drop_null_keys / drop_null_key_rows
+when they don't.
+"""
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.loading.arrow_copy import drop_null_key_rows, prepare_record_batch
+from src.loading.data_quality import DataQualityValidator
+from src.loading.prepare import drop_null_keys, prepare_data_for_insert
+
+NOW = datetime(2026, 1, 2, tzinfo=timezone.utc)
+
+
+class ListQuarantine:
+    def __init__(self):
+        self.tables = []
+
+    def add(self, table):
+        self.tables.append(table)
+
+    def close(self):
+        pass
+
+
+def raw_frame():
+    return pd.DataFrame({
+        'coin_id': ['bitcoin', None, 'ethereum', 'solana'],
+        'price_usd': [100.0, 2.0, 3.0, 4.0],
+        'source_timestamp': ['2026-01-01T00:00:00Z', '2026-01-01T00:05:00Z', 'not a time', '2026-01-01T00:10:00Z'],
+    })
+
+
+def prepared(engine):
+    if engine == 'pandas':
+        return prepare_data_for_insert(raw_frame())
+    return prepare_record_batch(pa.RecordBatch.from_pandas(raw_frame(), preserve_index=False))
+
+
+def coin_ids(batch):
+    if isinstance(batch, pd.DataFrame):
+        return [None if pd.isna(value) else value for value in batch['coin_id']]
+    return batch.column('coin_id').to_pylist()
+
+
+def drop(batch):
+    return drop_null_keys(batch) if isinstance(batch, pd.DataFrame) else drop_null_key_rows(batch)
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'arrow'])
+def test_prepare_keeps_null_keys_for_the_validator(engine):
+    assert coin_ids(prepared(engine)) == ['bitcoin', None, 'ethereum', 'solana']
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'arrow'])
+def test_null_keys_are_quarantined_when_validating(engine):
+    quarantine = ListQuarantine()
+    validator = DataQualityValidator(quarantine=quarantine)
+
+    batch = drop(validator.validate(prepared(engine), now=NOW))
+
+    assert coin_ids(batch) == ['bitcoin', 'solana']
+    rejected = pa.concat_tables(quarantine.tables)
+    assert rejected.column('dq_failed_rules').to_pylist() == ['coin_id_not_null', 'source_timestamp_not_null']
+    assert validator.rule_stats['coin_id_not_null']['violations'] == 1
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'arrow'])
+def test_null_keys_are_dropped_without_a_validator(engine):
+    assert coin_ids(drop(prepared(engine))) == ['bitcoin', 'solana']
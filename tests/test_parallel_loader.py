@@ -0,0 +1,46 @@
+"""
+parallel_load failure handling, with the connection pool replaced by a
+stand-in so no database is needed.
+"""
+import contextlib
+import logging
+import threading
+
+import pytest
+
+from src.loading import parallel_loader
+
+
+@pytest.fixture(autouse=True)
+def no_pool(monkeypatch):
+    monkeypatch.setattr(parallel_loader, 'pooled_connection', contextlib.nullcontext)
+
+
+def test_all_shards_load():
+    objects = [{'Key': f"part-{i}"} for i in range(5)]
+
+    rows = parallel_loader.parallel_load(objects, lambda connection, obj, progress, stop: progress.add_rows(10) or 10, 3)
+
+    assert rows == 50
+
+
+def test_first_failure_in_submission_order_is_raised_and_all_are_logged(caplog):
+    objects = [{'Key': key} for key in ('a', 'b', 'c', 'd')]
+    d_failed = threading.Event()
+
+    def load_object(connection, obj, progress, stop_event):
+        if obj['Key'] == 'b':
+            # Fails after d, so d is the first failure to complete
+            d_failed.wait(5)
+            raise ValueError('b broke')
+        if obj['Key'] == 'd':
+            d_failed.set()
+            raise ValueError('d broke')
+        return 0
+
+    with caplog.at_level(logging.ERROR, logger=parallel_loader.__name__):
+        with pytest.raises(ValueError, match='b broke'):
+            parallel_loader.parallel_load(objects, load_object, 4)
+
+    failed = [record.getMessage() for record in caplog.records if record.getMessage().startswith('Shard')]
+    assert failed == ['Shard b failed: b broke', 'Shard d failed: d broke']
@@ -0,0 +1,217 @@
+"""
+Time partitioning (database/partitions.py): period math at day, month and
+year boundaries and, with DB_PASSWORD set, premake and retention against a
+range-partitioned table in a scratch PostgreSQL schema.
+"""
+import os
+from datetime import datetime
+
+import pytest
+
+from database.partitions import (
+    PartitionManager, apply_retention, list_partitions, next_period, partition_name, period_start, shift_periods,
+)
+
+
+# ==============================================================================
+# PERIOD MATH
+# ==============================================================================
+
+@pytest.mark.parametrize('ts, granularity, start', [
+    (datetime(2026, 1, 31, 23, 59, 59, 999999), 'day', datetime(2026, 1, 31)),
+    (datetime(2026, 2, 1), 'day', datetime(2026, 2, 1)),
+    (datetime(2024, 2, 29, 12), 'day', datetime(2024, 2, 29)),
+    (datetime(2026, 1, 31, 23, 59, 59, 999999), 'month', datetime(2026, 1, 1)),
+    (datetime(2026, 2, 1), 'month', datetime(2026, 2, 1)),
+    (datetime(2025, 12, 31, 23, 59), 'month', datetime(2025, 12, 1)),
+])
+def test_period_start(ts, granularity, start):
+    assert period_start(ts, granularity) == start
+
+
+def test_period_start_rejects_unknown_granularity():
+    # Only daily and monthly partitions exist; there is no weekly granularity
+    with pytest.raises(ValueError, match="Unknown partition granularity 'week'"):
+        period_start(datetime(2026, 1, 1), 'week')
+
+
+@pytest.mark.parametrize('start, granularity, following', [
+    (datetime(2026, 1, 31), 'day', datetime(2026, 2, 1)),
+    (datetime(2024, 2, 28), 'day', datetime(2024, 2, 29)),
+    (datetime(2025, 2, 28), 'day', datetime(2025, 3, 1)),
+    (datetime(2025, 12, 31), 'day', datetime(2026, 1, 1)),
+    (datetime(2026, 1, 1), 'month', datetime(2026, 2, 1)),
+    (datetime(2025, 12, 1), 'month', datetime(2026, 1, 1)),
+])
+def test_next_period(start, granularity, following):
+    assert next_period(start, granularity) == following
+
+
+@pytest.mark.parametrize('start, granularity, count, shifted', [
+    (datetime(2026, 1, 1), 'day', -1, datetime(2025, 12, 31)),
+    (datetime(2024, 3, 1), 'day', -1, datetime(2024, 2, 29)),
+    (datetime(2026, 1, 30), 'day', 2, datetime(2026, 2, 1)),
+    (datetime(2026, 1, 1), 'day', 0, datetime(2026, 1, 1)),
+    (datetime(2026, 1, 1), 'month', -1, datetime(2025, 12, 1)),
+    (datetime(2026, 3, 1), 'month', -14, datetime(2025, 1, 1)),
+    (datetime(2025, 11, 1), 'month', 2, datetime(2026, 1, 1)),
+    (datetime(2025, 12, 1), 'month', 13, datetime(2027, 1, 1)),
+    (datetime(2026, 1, 1), 'month', 0, datetime(2026, 1, 1)),
+])
+def test_shift_periods(start, granularity, count, shifted):
+    assert shift_periods(start, granularity, count) == shifted
+
+
+@pytest.mark.parametrize('granularity', ['day', 'month'])
+def test_shift_periods_agrees_with_next_period(granularity):
+    start = datetime(2023, 11, 1)
+    period = start
+    for count in range(1, 800):
+        period = next_period(period, granularity)
+        assert shift_periods(start, granularity, count) == period
+        assert shift_periods(period, granularity, -count) == start
+
+
+def test_partition_name():
+    assert partition_name('fact_market_data', datetime(2026, 1, 5), 'day') == 'fact_market_data_p20260105'
+    assert partition_name('fact_market_data', datetime(2026, 1, 1), 'month') == 'fact_market_data_p202601'
+
+
+def test_manager_rejects_unknown_granularity():
+    with pytest.raises(ValueError, match='week'):
+        PartitionManager('fact_market_data', granularity='week')
+
+
+# ==============================================================================
+# PREMAKE AND RETENTION (PostgreSQL)
+# ==============================================================================
+
+SCHEMA = 'partition_test'
+TABLE = 'ticks'
+
+
+@pytest.fixture
+def connection():
+    if not os.getenv('DB_PASSWORD'):
+        pytest.skip('DB_PASSWORD is not set')
+    import psycopg2
+
+    from database.connection import get_connection_settings
+
+    conn = psycopg2.connect(**get_connection_settings())
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+    cursor.execute(
+        f"CREATE TABLE {SCHEMA}.{TABLE} (coin_id VARCHAR(255), source_timestamp TIMESTAMP) "
+        f"PARTITION BY RANGE (source_timestamp)"
+    )
+    conn.commit()
+    cursor.close()
+    yield conn
+    conn.rollback()
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def partitions(conn):
+    cursor = conn.cursor()
+    try:
+        return list_partitions(cursor, TABLE, SCHEMA)
+    finally:
+        cursor.close()
+
+
+def tables(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = %s ORDER BY tablename", (SCHEMA,))
+    names = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return names
+
+
+def test_premake_provisions_periods_past_the_range(connection):
+    manager = PartitionManager(TABLE, granularity='month', premake=2, schema_name=SCHEMA)
+
+    created = manager.ensure_range(connection, datetime(2025, 11, 30, 23), datetime(2025, 12, 1, 0, 30))
+
+    assert created == 4
+    assert partitions(connection) == [
+        (f'{TABLE}_p202511', datetime(2025, 11, 1), datetime(2025, 12, 1)),
+        (f'{TABLE}_p202512', datetime(2025, 12, 1), datetime(2026, 1, 1)),
+        (f'{TABLE}_p202601', datetime(2026, 1, 1), datetime(2026, 2, 1)),
+        (f'{TABLE}_p202602', datetime(2026, 2, 1), datetime(2026, 3, 1)),
+    ]
+    # Ensured periods are remembered; only the new premake period is created
+    assert manager.ensure_range(connection, datetime(2025, 12, 15), datetime(2025, 12, 15)) == 0
+    assert manager.ensure_range(connection, datetime(2026, 1, 2), datetime(2026, 1, 2)) == 1
+    assert partitions(connection)[-1][0] == f'{TABLE}_p202603'
+
+
+def test_daily_premake_crosses_the_leap_day(connection):
+    manager = PartitionManager(TABLE, granularity='day', premake=1, schema_name=SCHEMA)
+
+    manager.ensure_range(connection, datetime(2024, 2, 28, 12), datetime(2024, 2, 29, 23, 59))
+
+    assert [name for name, _, _ in partitions(connection)] == [
+        f'{TABLE}_p20240228', f'{TABLE}_p20240229', f'{TABLE}_p20240301',
+    ]
+
+
+def test_pending_partitions_are_retried_after_a_rollback(connection):
+    manager = PartitionManager(TABLE, granularity='month', premake=0, schema_name=SCHEMA)
+
+    assert manager.ensure_range(connection, datetime(2026, 1, 5), datetime(2026, 1, 5), commit=False) == 1
+    connection.rollback()
+    manager.discard_pending()
+
+    assert partitions(connection) == []
+    assert manager.ensure_range(connection, datetime(2026, 1, 5), datetime(2026, 1, 5)) == 1
+
+
+@pytest.mark.parametrize('now, keep_periods, expired', [
+    # The window is the current month plus keep_periods - 1 before it
+    (datetime(2026, 3, 1), 2, ['p202512', 'p202601']),
+    (datetime(2026, 2, 28, 23, 59), 2, ['p202512']),
+    (datetime(2026, 3, 15), 1, ['p202512', 'p202601', 'p202602']),
+    (datetime(2026, 3, 15), 4, []),
+    (datetime(2026, 3, 15), 0, []),
+])
+def test_retention_cutoff(connection, now, keep_periods, expired):
+    manager = PartitionManager(TABLE, granularity='month', premake=0, schema_name=SCHEMA)
+    manager.ensure_range(connection, datetime(2025, 12, 1), datetime(2026, 3, 1))
+
+    detached = apply_retention(connection, TABLE, 'month', keep_periods, schema_name=SCHEMA, now=now)
+
+    assert detached == [f'{TABLE}_{suffix}' for suffix in expired]
+    remaining = [name for name, _, _ in partitions(connection)]
+    assert not set(detached) & set(remaining)
+    assert len(remaining) + len(detached) == 4
+
+
+def test_daily_retention_cutoff(connection):
+    manager = PartitionManager(TABLE, granularity='day', premake=0, schema_name=SCHEMA)
+    manager.ensure_range(connection, datetime(2025, 12, 30), datetime(2026, 1, 2))
+
+    detached = apply_retention(connection, TABLE, 'day', 2, action='drop', schema_name=SCHEMA,
+                               now=datetime(2026, 1, 2, 0, 0, 1))
+
+    assert detached == [f'{TABLE}_p20251230', f'{TABLE}_p20251231']
+    assert tables(connection) == [TABLE, f'{TABLE}_p20260101', f'{TABLE}_p20260102']
+
+
+def test_detached_partitions_get_the_first_free_suffix(connection):
+    now = datetime(2026, 3, 15)
+    for _ in range(3):
+        # Late data recreates the expired month, and retention detaches it again
+        manager = PartitionManager(TABLE, granularity='month', premake=0, schema_name=SCHEMA)
+        manager.ensure_range(connection, datetime(2026, 1, 10), datetime(2026, 1, 10))
+        assert apply_retention(connection, TABLE, 'month', 2, schema_name=SCHEMA, now=now) == [f'{TABLE}_p202601']
+
+    assert partitions(connection) == []
+    assert tables(connection) == [
+        TABLE, f'{TABLE}_p202601_detached', f'{TABLE}_p202601_detached_2', f'{TABLE}_p202601_detached_3',
+    ]
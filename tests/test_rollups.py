@@ -0,0 +1,233 @@
+"""
+OHLCV rollups (database/rollups.py): rollup level and range selection at
+interval and alignment edges and, with DB_PASSWORD set, refresh_rollups()
+on a scratch fact table in PostgreSQL.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from database import rollups
+from database.rollups import choose_rollup, ohlcv_query
+
+MINUTE = timedelta(minutes=1)
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+MIDNIGHT = datetime(2026, 1, 10)
+
+
+# ==============================================================================
+# choose_rollup
+# ==============================================================================
+
+@pytest.mark.parametrize('start, end, interval, level', [
+    # Day-aligned range: the coarsest level dividing the interval
+    (MIDNIGHT, MIDNIGHT + 7 * DAY, DAY, '1d'),
+    (MIDNIGHT, MIDNIGHT + 28 * DAY, 7 * DAY, '1d'),
+    (MIDNIGHT, MIDNIGHT + DAY, HOUR, '1h'),
+    (MIDNIGHT, MIDNIGHT + DAY, 4 * HOUR, '1h'),
+    (MIDNIGHT, MIDNIGHT + DAY, 5 * MINUTE, '1m'),
+    (MIDNIGHT, MIDNIGHT + DAY, 90 * MINUTE, '1m'),
+    # A range edge off the day boundary rules out 1d, off the hour rules out 1h
+    (MIDNIGHT + HOUR, MIDNIGHT + 3 * DAY, DAY, '1h'),
+    (MIDNIGHT, MIDNIGHT + 3 * DAY + HOUR, DAY, '1h'),
+    (MIDNIGHT + MINUTE, MIDNIGHT + DAY, HOUR, '1m'),
+    (MIDNIGHT, MIDNIGHT + DAY - MINUTE, DAY, '1m'),
+    # Nothing tiles seconds or sub-minute intervals
+    (MIDNIGHT + timedelta(seconds=30), MIDNIGHT + DAY, HOUR, None),
+    (MIDNIGHT, MIDNIGHT + DAY + timedelta(microseconds=1), HOUR, None),
+    (MIDNIGHT, MIDNIGHT + HOUR, timedelta(seconds=30), None),
+    (MIDNIGHT, MIDNIGHT + HOUR, timedelta(seconds=90), None),
+])
+def test_choose_rollup(start, end, interval, level):
+    assert choose_rollup(start, end, interval) == level
+
+
+def test_choose_rollup_uses_the_unix_epoch_for_alignment():
+    # 1970-01-01 is the reference, so midnight of any date is day-aligned
+    assert choose_rollup(datetime(1970, 1, 1), datetime(1970, 1, 2), DAY) == '1d'
+    assert choose_rollup(datetime(2024, 2, 29), datetime(2024, 3, 1), DAY) == '1d'
+
+
+# ==============================================================================
+# ohlcv_query
+# ==============================================================================
+
+def test_explicit_interval_keeps_the_range():
+    start, end = MIDNIGHT + 7 * MINUTE, MIDNIGHT + HOUR + 7 * MINUTE
+    _, params, level = ohlcv_query('bitcoin', start, end, interval=15 * MINUTE)
+
+    assert level == '1m'
+    assert (params['start'], params['end'], params['step']) == (start, end, 900.0)
+
+
+def test_explicit_interval_off_any_rollup_reads_ticks():
+    query, params, level = ohlcv_query('bitcoin', MIDNIGHT, MIDNIGHT + HOUR, interval=timedelta(seconds=20))
+
+    assert level is None
+    assert 'public.fact_market_data f' in query
+    assert params['step'] == 20.0
+
+
+@pytest.mark.parametrize('span, max_points, step', [
+    (DAY, 500, 5 * MINUTE),         # 1440 one-minute buckets are too many
+    (DAY, 1440, MINUTE),            # exactly max_points is allowed
+    (DAY, 1439, 5 * MINUTE),
+    (7 * DAY, 500, 30 * MINUTE),
+    (365 * DAY, 500, DAY),
+    (365 * DAY, 53, 7 * DAY),
+    (365 * DAY, 10, 30 * DAY),
+])
+def test_auto_interval_is_the_finest_step_within_max_points(span, max_points, step):
+    _, params, _ = ohlcv_query('bitcoin', MIDNIGHT, MIDNIGHT + span, max_points=max_points)
+    assert params['step'] == step.total_seconds()
+
+
+def test_auto_interval_beyond_the_coarsest_step_uses_it():
+    _, params, level = ohlcv_query('bitcoin', MIDNIGHT, MIDNIGHT + 10 * 365 * DAY, max_points=10)
+
+    assert params['step'] == rollups.CHART_INTERVALS[-1].total_seconds()
+    assert level == '1d'
+
+
+@pytest.mark.parametrize('start, end, expected_start, expected_end, level', [
+    # 5-minute steps snap both edges outwards to whole 5 minutes
+    (MIDNIGHT + timedelta(minutes=7, seconds=30), MIDNIGHT + timedelta(hours=20, minutes=1),
+     MIDNIGHT + 5 * MINUTE, MIDNIGHT + timedelta(hours=20, minutes=5), '1m'),
+    # Already aligned edges are kept
+    (MIDNIGHT + 5 * MINUTE, MIDNIGHT + 20 * HOUR, MIDNIGHT + 5 * MINUTE, MIDNIGHT + 20 * HOUR, '1m'),
+    # Daily steps snap to midnight
+    (MIDNIGHT + timedelta(hours=13), MIDNIGHT + 300 * DAY + HOUR,
+     MIDNIGHT, MIDNIGHT + 301 * DAY, '1d'),
+])
+def test_auto_interval_widens_the_range_to_whole_steps(start, end, expected_start, expected_end, level):
+    _, params, chosen = ohlcv_query('bitcoin', start, end)
+
+    assert (params['start'], params['end']) == (expected_start, expected_end)
+    assert chosen == level
+
+
+def test_weekly_steps_snap_to_days_not_weeks():
+    start = datetime(2026, 1, 7, 15)  # a Wednesday afternoon
+    _, params, level = ohlcv_query('bitcoin', start, start + 3 * 365 * DAY, max_points=200)
+
+    assert params['step'] == (7 * DAY).total_seconds()
+    assert params['start'] == datetime(2026, 1, 7)
+    assert level == '1d'
+
+
+# ==============================================================================
+# refresh_rollups (PostgreSQL)
+# ==============================================================================
+
+FACT = 'rollup_test_fact'
+
+
+@pytest.fixture
+def connection():
+    if not os.getenv('DB_PASSWORD'):
+        pytest.skip('DB_PASSWORD is not set')
+    import psycopg2
+
+    from database.connection import get_connection_settings
+
+    conn = psycopg2.connect(**get_connection_settings())
+    tables = [FACT, rollups.dirty_table(FACT)] + [rollups.rollup_table(FACT, level) for level, _ in rollups.LEVELS]
+
+    def drop():
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {', '.join(tables)}")
+        conn.commit()
+        cursor.close()
+
+    drop()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"CREATE TABLE {FACT} (coin_id VARCHAR(255), source_timestamp TIMESTAMP, price_usd DOUBLE PRECISION, "
+        f"market_cap_usd DOUBLE PRECISION, volume_24h_usd DOUBLE PRECISION)"
+    )
+    conn.commit()
+    cursor.close()
+    rollups.ensure_rollup_tables(conn, FACT)
+    yield conn
+    conn.rollback()
+    drop()
+    conn.close()
+
+
+def load(conn, ticks):
+    """Insert (coin_id, timestamp, price) ticks and queue their hours, like a loader batch."""
+    df = pd.DataFrame(ticks, columns=['coin_id', 'source_timestamp', 'price_usd'])
+    df['market_cap_usd'] = df['price_usd'] * 1000
+    df['volume_24h_usd'] = df['price_usd'] * 10
+    cursor = conn.cursor()
+    cursor.executemany(
+        f"INSERT INTO {FACT} VALUES (%s, %s, %s, %s, %s)",
+        [(row.coin_id, row.source_timestamp.to_pydatetime(), row.price_usd, row.market_cap_usd, row.volume_24h_usd)
+         for row in df.itertuples()],
+    )
+    cursor.close()
+    rollups.mark_dirty(conn, rollups.dirty_hours(df), FACT, commit=False)
+    conn.commit()
+    return rollups.refresh_rollups(conn, FACT)
+
+
+def buckets(conn, level):
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT coin_id, bucket_start, open_price, high_price, low_price, close_price, tick_count "
+        f"FROM {rollups.rollup_table(FACT, level)} ORDER BY coin_id, bucket_start"
+    )
+    rows = {(row[0], row[1]): row[2:] for row in cursor.fetchall()}
+    cursor.close()
+    return rows
+
+
+def test_late_ticks_update_their_own_buckets(connection):
+    day1, day2 = datetime(2026, 1, 10), datetime(2026, 1, 11)
+    assert load(connection, [
+        ('bitcoin', day1 + timedelta(hours=23, minutes=58, seconds=10), 100.0),
+        ('bitcoin', day1 + timedelta(hours=23, minutes=59, seconds=5), 101.0),
+        ('bitcoin', day2 + timedelta(minutes=1), 110.0),
+        ('bitcoin', day2 + timedelta(hours=1, minutes=30), 120.0),
+        ('ethereum', day1 + timedelta(hours=23, minutes=59), 10.0),
+    ]) == 4
+    before = {level: buckets(connection, level) for level in ('1m', '1h', '1d')}
+    assert before['1d'][('bitcoin', day1)] == (100.0, 101.0, 100.0, 101.0, 2)
+
+    # A late tick for yesterday's last minute, and an earlier one in its hour
+    assert load(connection, [
+        ('bitcoin', day1 + timedelta(hours=23, minutes=59, seconds=50), 99.0),
+        ('bitcoin', day1 + timedelta(hours=23, minutes=5), 105.0),
+    ]) == 1
+    after = {level: buckets(connection, level) for level in ('1m', '1h', '1d')}
+
+    assert after['1m'][('bitcoin', day1 + timedelta(hours=23, minutes=59))] == (101.0, 101.0, 99.0, 99.0, 2)
+    assert after['1m'][('bitcoin', day1 + timedelta(hours=23, minutes=5))] == (105.0, 105.0, 105.0, 105.0, 1)
+    assert after['1h'][('bitcoin', day1 + timedelta(hours=23))] == (105.0, 105.0, 99.0, 99.0, 4)
+    assert after['1d'][('bitcoin', day1)] == (105.0, 105.0, 99.0, 99.0, 4)
+
+    # Other days, hours and coins are untouched
+    for level in ('1m', '1h', '1d'):
+        unchanged = {key: row for key, row in before[level].items()
+                     if key[0] == 'ethereum' or key[1] >= day2}
+        assert unchanged and all(after[level][key] == row for key, row in unchanged.items())
+    assert after['1d'][('bitcoin', day2)] == (110.0, 120.0, 110.0, 120.0, 2)
+
+
+def test_hourly_query_reads_the_refreshed_rollup(connection):
+    day = datetime(2026, 1, 10)
+    ticks = [('bitcoin', day + timedelta(minutes=7 * i, seconds=13), 100.0 + (i * 37) % 11) for i in range(200)]
+    load(connection, ticks)
+
+    rows = rollups.query_ohlcv(connection, 'bitcoin', day, day + DAY, interval=HOUR, table_name=FACT)
+
+    frame = pd.DataFrame(ticks, columns=['coin_id', 'source_timestamp', 'price_usd'])
+    prices = frame.groupby(frame['source_timestamp'].dt.floor('h'))['price_usd']
+    expected = pd.DataFrame({'open': prices.first(), 'high': prices.max(), 'low': prices.min(),
+                             'close': prices.last()})
+    assert [row['bucket_start'] for row in rows] == list(expected.index.to_pydatetime())
+    assert [(row['open_price'], row['high_price'], row['low_price'], row['close_price']) for row in rows] == \
+        list(expected.itertuples(index=False, name=None))
@@ -0,0 +1,103 @@
+"""
+transform_spark and transform_arrow must produce the same processed zone:
+both engines run on one raw fixture and their Parquet output is compared.
+The Spark half needs pyspark (and a JVM) and is skipped without it.
+"""
+import json
+
+import pyarrow.parquet as pq
+import pytest
+
+from src.transformation.local_transform import read_raw_files, write_partition
+from src.transformation.staging_transform import (
+    PARTITION_COLUMN,
+    SORT_COLUMNS,
+    fact_arrow_schema,
+    raw_spark_schema,
+    transform_arrow,
+    transform_spark,
+)
+
+DT = '2026-01-01'
+
+RAW_RECORDS = [
+    # ISO timestamp with 'Z'
+    {'id': 'bitcoin', 'symbol': 'btc', 'current_price': 97000.5, 'market_cap': 1.9e12, 'total_volume': 3.1e10,
+     'ingestion_timestamp': '2026-01-01T00:05:00Z'},
+    # Offset and fractional seconds
+    {'id': 'ethereum', 'symbol': 'eth', 'current_price': 3400.25, 'market_cap': 4.1e11, 'total_volume': 1.2e10,
+     'ingestion_timestamp': '2026-01-01T02:10:00.123456+02:00'},
+    # No offset: taken as UTC
+    {'id': 'solana', 'symbol': 'sol', 'current_price': 180, 'market_cap': 8.5e10, 'total_volume': 3.0e9,
+     'ingestion_timestamp': '2026-01-01T00:15:00'},
+    # NULL and missing metrics
+    {'id': 'tiny-coin', 'symbol': 'tiny', 'current_price': 0.0001, 'market_cap': None,
+     'ingestion_timestamp': '2026-01-01T00:20:00Z'},
+    # NULL timestamp
+    {'id': 'dogecoin', 'symbol': 'doge', 'current_price': 0.3, 'market_cap': 4.4e10, 'total_volume': 1.0e9,
+     'ingestion_timestamp': None},
+    # NULL and missing ids are filtered out
+    {'id': None, 'symbol': 'bad', 'current_price': 1.0, 'ingestion_timestamp': '2026-01-01T00:25:00Z'},
+    {'symbol': 'noid', 'current_price': 2.0, 'ingestion_timestamp': '2026-01-01T00:30:00Z'},
+]
+
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    directory = tmp_path / 'raw' / f'{PARTITION_COLUMN}={DT}' / 'hour=00'
+    directory.mkdir(parents=True)
+    path = directory / 'snapshot.json'
+    path.write_text('\n'.join(json.dumps(record) for record in RAW_RECORDS) + '\n')
+    return tmp_path / 'raw', path
+
+
+@pytest.fixture(scope='module')
+def spark():
+    pytest.importorskip('pyspark')
+    from pyspark.sql import SparkSession
+
+    session = SparkSession.builder \
+        .master('local[1]') \
+        .config('spark.sql.session.timeZone', 'UTC') \
+        .config('spark.sql.parquet.outputTimestampType', 'TIMESTAMP_MICROS') \
+        .config('spark.ui.enabled', 'false') \
+        .getOrCreate()
+    yield session
+    session.stop()
+
+
+def arrow_output(raw_dir, tmp_path):
+    raw_path, path = raw_dir
+    fact_table = transform_arrow(read_raw_files([str(path)], DT, str(raw_path)))
+    output = tmp_path / 'arrow'
+    write_partition(fact_table, DT, str(output), rows_per_file=1000, row_group_rows=1000)
+    return pq.read_table(output / f'{PARTITION_COLUMN}={DT}', partitioning=None)
+
+
+def spark_output(spark, raw_dir, tmp_path):
+    raw_path, _ = raw_dir
+    raw_df = spark.read.schema(raw_spark_schema()).json(str(raw_path))
+    output = tmp_path / 'spark'
+    transform_spark(raw_df).write.partitionBy(PARTITION_COLUMN).parquet(str(output))
+    return pq.read_table(output / f'{PARTITION_COLUMN}={DT}', partitioning=None)
+
+
+def comparable_rows(table):
+    # load_date is the run time, so it differs between the engines by design
+    table = table.drop_columns(['load_date']).sort_by([(col, 'ascending') for col in SORT_COLUMNS])
+    return table.to_pylist()
+
+
+def test_arrow_output_matches_the_fact_schema(raw_dir, tmp_path):
+    table = arrow_output(raw_dir, tmp_path)
+
+    assert table.schema.remove_metadata() == fact_arrow_schema(with_partition=False)
+    assert sorted(table.column('coin_id').to_pylist()) == ['bitcoin', 'dogecoin', 'ethereum', 'solana', 'tiny-coin']
+
+
+def test_spark_and_arrow_engines_agree(spark, raw_dir, tmp_path):
+    arrow_table = arrow_output(raw_dir, tmp_path)
+    spark_table = spark_output(spark, raw_dir, tmp_path)
+
+    assert spark_table.schema.remove_metadata() == arrow_table.schema.remove_metadata()
+    assert comparable_rows(spark_table) == comparable_rows(arrow_table)